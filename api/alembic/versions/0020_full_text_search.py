@@ -0,0 +1,77 @@
+"""Full-text search over trade notes and daily journal entries
+
+Revision ID: 0020_full_text_search
+Revises: 0019_forex_futures_support
+Create Date: 2026-10-19
+
+Postgres: generated ``search_tsv`` tsvector columns with GIN indexes.
+SQLite: external-content FTS5 tables kept in sync by triggers.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0020_full_text_search'
+down_revision = '0019_forex_futures_support'
+branch_labels = None
+depends_on = None
+
+
+def _fts5_table(table: str, columns: list[str]) -> None:
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new_vals = ", ".join(f"new.{c}" for c in columns)
+    old_vals = ", ".join(f"old.{c}" for c in columns)
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', tokenize='unicode61')"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END"
+    )
+    # Index rows that existed before the migration
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            "ALTER TABLE trades ADD COLUMN search_tsv tsvector GENERATED ALWAYS AS ("
+            "to_tsvector('simple', coalesce(notes_md, '') || ' ' || coalesce(post_analysis_md, ''))"
+            ") STORED"
+        )
+        op.execute("CREATE INDEX ix_trades_search_tsv ON trades USING gin (search_tsv)")
+        op.execute(
+            "ALTER TABLE daily_journal ADD COLUMN search_tsv tsvector GENERATED ALWAYS AS ("
+            "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(notes_md, ''))"
+            ") STORED"
+        )
+        op.execute("CREATE INDEX ix_daily_journal_search_tsv ON daily_journal USING gin (search_tsv)")
+    elif dialect == 'sqlite':
+        _fts5_table('trades', ['notes_md', 'post_analysis_md'])
+        _fts5_table('daily_journal', ['title', 'notes_md'])
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_daily_journal_search_tsv")
+        op.execute("ALTER TABLE daily_journal DROP COLUMN IF EXISTS search_tsv")
+        op.execute("DROP INDEX IF EXISTS ix_trades_search_tsv")
+        op.execute("ALTER TABLE trades DROP COLUMN IF EXISTS search_tsv")
+    elif dialect == 'sqlite':
+        for table in ('daily_journal', 'trades'):
+            fts = f"{table}_fts"
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
@@ -0,0 +1,41 @@
+"""Indexes for substring/prefix matching on instrument symbols and account names
+
+Revision ID: 0021_trigram_name_indexes
+Revises: 0020_full_text_search
+Create Date: 2026-10-19
+
+Postgres: pg_trgm GIN indexes on lower(symbol) / lower(name) so the
+``contains`` filter (``lower(col) LIKE '%x%'``) can use an index.
+Every dialect: B-tree expression indexes on lower(...) serve the typeahead
+prefix range scan. The range is only a prefix match in byte order, so on
+Postgres they are built with COLLATE "C" (SQLite compares bytes already).
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0021_trigram_name_indexes'
+down_revision = '0020_full_text_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_instruments_symbol_trgm ON instruments USING gin (lower(symbol) gin_trgm_ops)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_accounts_name_trgm ON accounts USING gin (lower(name) gin_trgm_ops)")
+    # B-tree on lower(...) serves prefix ranges on every dialect, in byte order
+    collate = ' COLLATE "C"' if dialect == 'postgresql' else ''
+    op.execute(f"CREATE INDEX IF NOT EXISTS ix_instruments_symbol_lower ON instruments (lower(symbol){collate})")
+    op.execute(f"CREATE INDEX IF NOT EXISTS ix_accounts_user_name_lower ON accounts (user_id, lower(name){collate})")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    op.execute("DROP INDEX IF EXISTS ix_accounts_user_name_lower")
+    op.execute("DROP INDEX IF EXISTS ix_instruments_symbol_lower")
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_accounts_name_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_instruments_symbol_trgm")
@@ -0,0 +1,44 @@
+"""Report rendering job queue
+
+Revision ID: 0022_report_jobs
+Revises: 0021_trigram_name_indexes
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0022_report_jobs'
+down_revision = '0021_trigram_name_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'report_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=16), server_default='queued', nullable=False),
+        sa.Column('progress', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('stage', sa.String(length=64), nullable=True),
+        sa.Column('request_json', sa.Text(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('content_type', sa.String(length=64), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    )
+    op.create_index('idx_report_jobs_user_created', 'report_jobs', ['user_id', 'created_at'])
+    op.create_index('idx_report_jobs_status', 'report_jobs', ['status'])
+
+
+def downgrade():
+    op.drop_index('idx_report_jobs_status')
+    op.drop_index('idx_report_jobs_user_created')
+    op.drop_table('report_jobs')
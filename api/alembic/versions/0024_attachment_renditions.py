@@ -0,0 +1,26 @@
+"""Track generated image renditions on attachments
+
+Revision ID: 0024_attachment_renditions
+Revises: 0023_user_data_version
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0024_attachment_renditions'
+down_revision = '0023_user_data_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.add_column(sa.Column('renditions_json', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.drop_column('renditions_json')
@@ -0,0 +1,45 @@
+"""Cached per-account monthly trade summaries
+
+Revision ID: 0025_monthly_summaries
+Revises: 0024_attachment_renditions
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0025_monthly_summaries'
+down_revision = '0024_attachment_renditions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'monthly_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Integer(), nullable=False),
+        sa.Column('trade_count', sa.Integer(), nullable=False),
+        sa.Column('pnl_count', sa.Integer(), nullable=False),
+        sa.Column('win_count', sa.Integer(), nullable=False),
+        sa.Column('loss_count', sa.Integer(), nullable=False),
+        sa.Column('total_pnl', sa.Float(), nullable=False),
+        sa.Column('sum_wins', sa.Float(), nullable=False),
+        sa.Column('sum_losses', sa.Float(), nullable=False),
+        sa.Column('max_pnl', sa.Float(), nullable=True),
+        sa.Column('min_pnl', sa.Float(), nullable=True),
+        sa.Column('days_json', sa.Text(), nullable=False),
+        sa.Column('symbols_json', sa.Text(), nullable=False),
+        sa.Column('computed_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('account_id', 'year', 'month', name='uq_monthly_summaries_account_month'),
+    )
+
+
+def downgrade():
+    op.drop_table('monthly_summaries')
@@ -0,0 +1,46 @@
+"""Index of generated reports (report history)
+
+Revision ID: 0026_report_artifacts
+Revises: 0025_monthly_summaries
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0026_report_artifacts'
+down_revision = '0025_monthly_summaries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'report_artifacts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('report_type', sa.String(length=16), nullable=False),
+        sa.Column('period_json', sa.Text(), nullable=False),
+        sa.Column('params_hash', sa.String(length=64), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('content_type', sa.String(length=64), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('checksum', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('user_id', 'filename', name='uq_report_artifacts_user_filename'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('idx_report_artifacts_user_id', 'report_artifacts', ['user_id', 'id'])
+    with op.batch_alter_table('report_jobs') as batch_op:
+        batch_op.add_column(sa.Column('artifact_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('report_jobs') as batch_op:
+        batch_op.drop_column('artifact_id')
+    op.drop_index('idx_report_artifacts_user_id', table_name='report_artifacts')
+    op.drop_table('report_artifacts')
@@ -0,0 +1,38 @@
+"""Content-addressed attachment blobs
+
+Revision ID: 0027_attachment_blobs
+Revises: 0026_report_artifacts
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0027_attachment_blobs'
+down_revision = '0026_report_artifacts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'attachment_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('storage_path', sa.String(length=512), nullable=False),
+        sa.Column('thumb_path', sa.String(length=512), nullable=True),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('sha256'),
+    )
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.add_column(sa.Column('blob_sha256', sa.String(length=64), nullable=True))
+        batch_op.create_index('ix_attachments_blob_sha256', ['blob_sha256'])
+
+
+def downgrade():
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.drop_index('ix_attachments_blob_sha256')
+        batch_op.drop_column('blob_sha256')
+    op.drop_table('attachment_blobs')
@@ -0,0 +1,32 @@
+"""Storage deletion log
+
+Revision ID: 0028_file_deletions
+Revises: 0027_attachment_blobs
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0028_file_deletions'
+down_revision = '0027_attachment_blobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'file_deletions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(length=512), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    op.drop_table('file_deletions')
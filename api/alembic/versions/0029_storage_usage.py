@@ -0,0 +1,70 @@
+"""Storage usage counters
+
+Revision ID: 0029_storage_usage
+Revises: 0028_file_deletions
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0029_storage_usage'
+down_revision = '0028_file_deletions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.add_column(sa.Column('thumb_size_bytes', sa.Integer(), nullable=True))
+    with op.batch_alter_table('attachment_blobs') as batch_op:
+        batch_op.add_column(sa.Column('thumb_size_bytes', sa.Integer(), nullable=True))
+    op.create_table(
+        'storage_usage',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('files', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('bytes', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'account_id', 'kind', name='uq_storage_usage_user_account_kind'),
+    )
+
+    # Seed from existing rows. Thumbnail sizes were not recorded before this
+    # revision; the attachment sweep fills them in and recounts.
+    owned = (
+        "FROM attachments a "
+        "LEFT JOIN trades t ON t.id = a.trade_id "
+        "LEFT JOIN accounts acc ON acc.id = t.account_id "
+        "LEFT JOIN daily_journal j ON j.id = a.journal_id "
+    )
+    user = "COALESCE(acc.user_id, j.user_id)"
+    account = "COALESCE(t.account_id, j.account_id, 0)"
+    for kind, size, where in (
+        ("attachments", "a.size_bytes", ""),
+        ("thumbnails", "a.thumb_size_bytes", "AND a.thumb_path IS NOT NULL "),
+    ):
+        op.execute(
+            "INSERT INTO storage_usage (user_id, account_id, kind, files, bytes) "
+            f"SELECT {user}, {account}, '{kind}', COUNT(*), COALESCE(SUM({size}), 0) "
+            f"{owned}WHERE {user} IS NOT NULL {where}"
+            f"GROUP BY {user}, {account}"
+        )
+    op.execute(
+        "INSERT INTO storage_usage (user_id, account_id, kind, files, bytes) "
+        "SELECT user_id, 0, 'reports', COUNT(*), COALESCE(SUM(size_bytes), 0) "
+        "FROM report_artifacts GROUP BY user_id"
+    )
+
+
+def downgrade():
+    op.drop_table('storage_usage')
+    with op.batch_alter_table('attachment_blobs') as batch_op:
+        batch_op.drop_column('thumb_size_bytes')
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.drop_column('thumb_size_bytes')
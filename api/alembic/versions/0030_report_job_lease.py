@@ -0,0 +1,28 @@
+"""Report job worker id and heartbeat
+
+Revision ID: 0030_report_job_lease
+Revises: 0029_storage_usage
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0030_report_job_lease'
+down_revision = '0029_storage_usage'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('report_jobs') as batch_op:
+        batch_op.add_column(sa.Column('worker_id', sa.String(length=128), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('report_jobs') as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('worker_id')
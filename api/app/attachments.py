@@ -0,0 +1,439 @@
+"""
+Attachment operations shared by trades and journal days.
+
+Both routers own the same set of attachment endpoints; the only differences
+are the owning column (``trade_id`` or ``journal_id``), how ownership is
+checked and the URL prefix. Those are captured by an ``AttachmentOwner``
+and everything else lives here, written set-based:
+
+- uploads are streamed to disk in chunks while being hashed (blobs.py),
+  never read into memory whole;
+- reorder is one ``UPDATE ... SET sort_order = CASE id ...``;
+- batch delete is one DELETE (plus orphaned blob rows), with the files
+  unlinked in parallel after commit;
+- downloads look the attachment and its ownership up in one query and
+  answer conditional GETs (see http_cache.py).
+
+Set-based writes skip the data_version flush listener, so every write here
+bumps the user's version itself.
+"""
+
+import os
+from typing import List, NamedTuple, Optional
+
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import and_, case, func, or_, update
+from sqlalchemy.orm import Session
+
+from . import storage_reclaimer, storage_usage
+from .blobs import BlobTooLarge, StagedFile, acquire_blob, discard_staged, release_attachments, stage_fileobj
+from .data_version import bump_data_version
+from .http_cache import IMMUTABLE, REVALIDATE, content_etag, file_response
+from .image_jobs import schedule_image_processing
+from .models import Account, Attachment, DailyJournal, Trade
+from .renditions import RENDITION_SIZES, ensure_rendition, guess_image_mime
+from .schemas import AttachmentOut, AttachmentUpdate
+from .zipstream import iter_zip_files, unique_arcnames
+
+ALLOWED_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".pdf"}
+
+
+class AttachmentOwner(NamedTuple):
+    """The trade or journal day a set of attachments belongs to."""
+    column: object  # Attachment.trade_id or Attachment.journal_id
+    id: int
+    user_id: int
+    url_prefix: str  # e.g. "/trades/12"
+    zip_name: str
+
+
+def for_trade(trade_id: int, user_id: int) -> AttachmentOwner:
+    return AttachmentOwner(Attachment.trade_id, trade_id, user_id, f"/trades/{trade_id}", f"trade-{trade_id}-attachments.zip")
+
+
+def for_journal(journal_id: int, user_id: int) -> AttachmentOwner:
+    return AttachmentOwner(Attachment.journal_id, journal_id, user_id, f"/journal/{journal_id}", f"journal-{journal_id}-attachments.zip")
+
+
+def trade_owner(db: Session, trade_id: int, user_id: int) -> AttachmentOwner:
+    """Owner for a trade of ``user_id``'s; 404 otherwise."""
+    ok = db.query(Trade.id).join(Account, Account.id == Trade.account_id, isouter=True).\
+        filter(Trade.id == trade_id, Account.user_id == user_id).first()
+    if not ok:
+        raise HTTPException(404, detail="Trade not found")
+    return for_trade(trade_id, user_id)
+
+
+def journal_owner(db: Session, journal_id: int, user_id: int) -> AttachmentOwner:
+    """Owner for a journal day of ``user_id``'s; 404 otherwise."""
+    ok = db.query(DailyJournal.id).filter(DailyJournal.id == journal_id, DailyJournal.user_id == user_id).first()
+    if not ok:
+        raise HTTPException(404, detail="Journal not found")
+    return for_journal(journal_id, user_id)
+
+
+def to_out(owner: AttachmentOwner, a: Attachment) -> AttachmentOut:
+    return AttachmentOut(
+        id=a.id,
+        filename=a.filename,
+        mime_type=a.mime_type,
+        size_bytes=a.size_bytes,
+        timeframe=a.timeframe,
+        state=a.state,
+        view=a.view,
+        caption=a.caption,
+        reviewed=bool(a.reviewed),
+        thumb_available=bool(a.thumb_path),
+        thumb_url=(thumb_url(owner, a) if a.thumb_path else None),
+        preview_url=(rendition_url(owner, a, "preview") if a.thumb_path else None),
+        sort_order=a.sort_order,
+    )
+
+
+def _thumb_version(a: Attachment) -> Optional[str]:
+    return a.blob_sha256[:16] if a.blob_sha256 else None
+
+
+def thumb_url(owner: AttachmentOwner, a: Attachment) -> str:
+    """Thumbnail URL; blob-backed ones carry the content version so they can be cached as immutable."""
+    url = f"{owner.url_prefix}/attachments/{a.id}/thumb"
+    v = _thumb_version(a)
+    return f"{url}?v={v}" if v else url
+
+
+def _rendition_version(a: Attachment, size: str) -> Optional[str]:
+    # The pixel bound is configurable, so it is part of the version too
+    return f"{a.blob_sha256[:16]}-{RENDITION_SIZES[size]}" if a.blob_sha256 else None
+
+
+def rendition_url(owner: AttachmentOwner, a: Attachment, size: str) -> str:
+    """Rendition URL; like ``thumb_url`` it carries a version when the content is fixed by it."""
+    url = f"{owner.url_prefix}/attachments/{a.id}/rendition/{size}"
+    v = _rendition_version(a, size)
+    return f"{url}?v={v}" if v else url
+
+
+def _validate_ids(ids) -> List[int]:
+    if not isinstance(ids, list) or not all(isinstance(x, int) for x in ids):
+        raise HTTPException(400, detail="Body must be a list of attachment IDs")
+    return ids
+
+
+def list_attachments(db: Session, owner: AttachmentOwner) -> List[AttachmentOut]:
+    rows = (
+        db.query(Attachment)
+        .filter(owner.column == owner.id)
+        .order_by(Attachment.sort_order.asc(), Attachment.created_at.asc())
+        .all()
+    )
+    return [to_out(owner, a) for a in rows]
+
+
+BATCH_META_MAX_IDS = 1000
+
+# Columns AttachmentOut needs; batch reads skip storage paths and rendition JSON
+_META_COLUMNS = (
+    Attachment.id, Attachment.trade_id, Attachment.journal_id, Attachment.filename, Attachment.mime_type,
+    Attachment.size_bytes, Attachment.thumb_path, Attachment.blob_sha256, Attachment.sort_order,
+    Attachment.timeframe, Attachment.state, Attachment.view, Attachment.caption, Attachment.reviewed,
+)
+
+
+def batch_meta(db: Session, user_id: int, trade_ids: List[int], journal_ids: List[int], include_items: bool = True) -> dict:
+    """
+    Attachment metadata for many trades and journal days from one query:
+    ownership is checked by joins, both owner kinds are read together, and
+    only the columns the response needs are selected. With
+    ``include_items=False`` the query is a grouped count instead.
+    """
+    trade_ids = sorted(set(trade_ids))
+    journal_ids = sorted(set(journal_ids))
+    if len(trade_ids) + len(journal_ids) > BATCH_META_MAX_IDS:
+        raise HTTPException(400, detail=f"At most {BATCH_META_MAX_IDS} ids per request")
+    out = {"trades": {}, "journals": {}}
+    if not trade_ids and not journal_ids:
+        return out
+
+    owned = []
+    if trade_ids:
+        owned.append(and_(Attachment.trade_id.in_(trade_ids), Account.user_id == user_id))
+    if journal_ids:
+        owned.append(and_(Attachment.journal_id.in_(journal_ids), DailyJournal.user_id == user_id))
+
+    def scoped(q):
+        return (
+            q.outerjoin(Trade, Trade.id == Attachment.trade_id)
+            .outerjoin(Account, Account.id == Trade.account_id)
+            .outerjoin(DailyJournal, DailyJournal.id == Attachment.journal_id)
+            .filter(or_(*owned))
+        )
+
+    if not include_items:
+        rows = scoped(db.query(Attachment.trade_id, Attachment.journal_id, func.count(Attachment.id))).\
+            group_by(Attachment.trade_id, Attachment.journal_id).all()
+        for tid, jid, n in rows:
+            key, oid = ("trades", tid) if tid is not None else ("journals", jid)
+            out[key][oid] = {"count": n, "thumb_url": None, "items": []}
+        return out
+
+    rows = scoped(db.query(*_META_COLUMNS)).order_by(Attachment.sort_order.asc(), Attachment.created_at.asc()).all()
+    for r in rows:
+        if r.trade_id is not None:
+            key, owner = "trades", for_trade(r.trade_id, user_id)
+        else:
+            key, owner = "journals", for_journal(r.journal_id, user_id)
+        entry = out[key].setdefault(owner.id, {"count": 0, "thumb_url": None, "items": []})
+        item = to_out(owner, r)
+        entry["count"] += 1
+        entry["items"].append(item)
+        if entry["thumb_url"] is None:
+            entry["thumb_url"] = item.thumb_url
+    return out
+
+
+def get_attachment(db: Session, owner: AttachmentOwner, att_id: int) -> Attachment:
+    a = db.query(Attachment).filter(Attachment.id == att_id, owner.column == owner.id).first()
+    if not a:
+        raise HTTPException(404, detail="Attachment not found")
+    return a
+
+
+def upload(
+    db: Session,
+    owner: AttachmentOwner,
+    file: UploadFile,
+    base_dir: str,
+    max_mb: float,
+    timeframe: Optional[str] = None,
+    state: Optional[str] = None,
+    view: Optional[str] = None,
+    caption: Optional[str] = None,
+    reviewed: Optional[bool] = False,
+) -> AttachmentOut:
+    """
+    Store an upload and attach it to ``owner``. Blocking (streams the body to
+    disk and fsyncs), so call it from a sync endpoint, which FastAPI runs on
+    its threadpool.
+    """
+    name = file.filename or "file"
+    # Reject unsupported types before streaming the body; attach_staged re-derives the extension
+    check_extension(name)
+    try:
+        staged = stage_fileobj(file.file, base_dir, int(max_mb * 1024 * 1024))
+    except BlobTooLarge:
+        raise HTTPException(413, detail=f"File exceeds limit of {int(max_mb)} MB")
+    return attach_staged(
+        db, owner, staged, base_dir, name, file.content_type,
+        timeframe=timeframe, state=state, view=view, caption=caption, reviewed=reviewed,
+    )
+
+
+def check_extension(filename: str) -> str:
+    """The upload's lower-cased extension; 400 unless it is an accepted type."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in ALLOWED_EXTS:
+        raise HTTPException(400, detail="Unsupported file type")
+    return ext
+
+
+def attach_staged(
+    db: Session,
+    owner: AttachmentOwner,
+    staged: StagedFile,
+    base_dir: str,
+    filename: str,
+    mime_type: Optional[str],
+    timeframe: Optional[str] = None,
+    state: Optional[str] = None,
+    view: Optional[str] = None,
+    caption: Optional[str] = None,
+    reviewed: Optional[bool] = False,
+) -> AttachmentOut:
+    """Move a staged upload into the blob store and attach it to ``owner``; new images are queued for processing."""
+    try:
+        storage_usage.check_quota(db, owner.user_id, staged.size_bytes)
+        # Content-addressed: identical bytes are stored (and processed) once
+        blob = acquire_blob(db, base_dir, staged, check_extension(filename))
+    except BaseException:
+        discard_staged(staged.path)
+        raise
+
+    next_order = (db.query(func.max(Attachment.sort_order)).filter(owner.column == owner.id).scalar() or 0) + 1
+    a = Attachment(
+        user_id=None,
+        filename=filename,
+        mime_type=mime_type,
+        size_bytes=blob.size_bytes,
+        storage_path=blob.storage_path,
+        thumb_path=blob.thumb_path,
+        thumb_size_bytes=blob.thumb_size_bytes,
+        blob_sha256=blob.sha256,
+        sort_order=next_order,
+        timeframe=timeframe,
+        state=state,
+        view=view,
+        caption=caption,
+        reviewed=bool(reviewed),
+    )
+    setattr(a, owner.column.key, owner.id)
+    db.add(a)
+    usage = storage_usage.UsageDelta()
+    account_id = _owner_account_id(db, owner)
+    usage.add(owner.user_id, account_id, "attachments", 1, a.size_bytes)
+    if a.thumb_path:
+        usage.add(owner.user_id, account_id, "thumbnails", 1, a.thumb_size_bytes)
+    usage.apply(db)
+    db.commit(); db.refresh(a)
+    if blob.created:
+        schedule_image_processing(blob.sha256, blob.storage_path)
+    return to_out(owner, a)
+
+
+def _owner_account_id(db: Session, owner: AttachmentOwner) -> Optional[int]:
+    if owner.column is Attachment.trade_id:
+        return db.query(Trade.account_id).filter(Trade.id == owner.id).scalar()
+    return db.query(DailyJournal.account_id).filter(DailyJournal.id == owner.id).scalar()
+
+
+def owned_attachment(db: Session, owner: AttachmentOwner, att_id: int) -> Attachment:
+    """
+    The attachment, checking owner and user in the same query; for owners
+    built with ``for_trade``/``for_journal`` (no separate ownership lookup).
+    """
+    q = db.query(Attachment).filter(Attachment.id == att_id, owner.column == owner.id)
+    if owner.column is Attachment.trade_id:
+        q = q.join(Trade, Trade.id == Attachment.trade_id).join(Account, Account.id == Trade.account_id).\
+            filter(Account.user_id == owner.user_id)
+    else:
+        q = q.join(DailyJournal, DailyJournal.id == Attachment.journal_id).filter(DailyJournal.user_id == owner.user_id)
+    a = q.first()
+    if not a:
+        raise HTTPException(404, detail="Attachment not found")
+    return a
+
+
+def _stat(path: Optional[str]) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path) if path else None
+    except OSError:
+        return None
+
+
+def download(request: Request, db: Session, owner: AttachmentOwner, att_id: int) -> Response:
+    a = owned_attachment(db, owner, att_id)
+    st = _stat(a.storage_path)
+    if st is None:
+        raise HTTPException(404, detail="Attachment file not found")
+    return file_response(request, a.storage_path, a.mime_type, content_etag(a.blob_sha256, st), st, filename=a.filename)
+
+
+def thumb(request: Request, db: Session, owner: AttachmentOwner, att_id: int, v: Optional[str] = None) -> Response:
+    """
+    The upload-time thumbnail. A blob's thumbnail is written once and never
+    changes, so when the URL carries the blob version (``thumb_url`` does)
+    it is cacheable as immutable.
+    """
+    a = owned_attachment(db, owner, att_id)
+    st = _stat(a.thumb_path)
+    if st is None:
+        raise HTTPException(404, detail="Thumbnail not available")
+    versioned = bool(v) and v == _thumb_version(a)
+    return file_response(
+        request, a.thumb_path, guess_image_mime(a.thumb_path), content_etag(a.blob_sha256, st, "-thumb"), st,
+        filename=os.path.basename(a.thumb_path), cache_control=IMMUTABLE if versioned else REVALIDATE,
+    )
+
+
+def rendition(request: Request, db: Session, owner: AttachmentOwner, att_id: int, size: str, v: Optional[str] = None) -> Response:
+    """
+    A downscaled image, generated on first request. The path names no
+    content, so only a URL carrying the version from ``rendition_url`` is
+    cacheable as immutable; otherwise clients revalidate against the ETag.
+    """
+    if size not in RENDITION_SIZES:
+        raise HTTPException(400, detail=f"Unknown rendition size; expected one of {', '.join(RENDITION_SIZES)}")
+    a = owned_attachment(db, owner, att_id)
+    r = ensure_rendition(db, a, size)
+    st = _stat(r[0]) if r else None
+    if st is None:
+        raise HTTPException(404, detail="Rendition not available")
+    path, media = r
+    versioned = bool(v) and v == _rendition_version(a, size)
+    return file_response(
+        request, path, media, content_etag(a.blob_sha256, st, f"-{size}"), st,
+        cache_control=IMMUTABLE if versioned else REVALIDATE,
+    )
+
+
+def update_meta(db: Session, owner: AttachmentOwner, att_id: int, body: AttachmentUpdate) -> AttachmentOut:
+    a = get_attachment(db, owner, att_id)
+    if body.timeframe is not None:
+        a.timeframe = body.timeframe
+    if body.state is not None:
+        a.state = body.state
+    if body.view is not None:
+        a.view = body.view
+    if body.caption is not None:
+        a.caption = body.caption
+    if body.reviewed is not None:
+        a.reviewed = bool(body.reviewed)
+    db.commit(); db.refresh(a)
+    return to_out(owner, a)
+
+
+def reorder(db: Session, owner: AttachmentOwner, ids) -> dict:
+    """Set sort_order to each id's position in ``ids`` with a single UPDATE."""
+    ids = _validate_ids(ids)
+    if not ids:
+        return {"reordered": 0}
+    valid = db.query(func.count(Attachment.id)).filter(owner.column == owner.id, Attachment.id.in_(ids)).scalar()
+    if valid != len(set(ids)):
+        raise HTTPException(400, detail="One or more attachments invalid")
+    # A repeated id takes its last position, as with per-row updates
+    positions = {att_id: idx for idx, att_id in enumerate(ids)}
+    db.execute(
+        update(Attachment)
+        .where(owner.column == owner.id, Attachment.id.in_(positions))
+        .values(sort_order=case(positions, value=Attachment.id)),
+        execution_options={"synchronize_session": False},
+    )
+    bump_data_version(db, [owner.user_id])
+    db.commit()
+    return {"reordered": len(ids)}
+
+
+def delete(db: Session, owner: AttachmentOwner, att_id: int) -> None:
+    get_attachment(db, owner, att_id)
+    _finish_delete(db, owner, release_attachments(db, Attachment.id == att_id).files)
+
+
+def delete_many(db: Session, owner: AttachmentOwner, ids) -> int:
+    """Delete the owner's attachments among ``ids``; returns how many there were."""
+    ids = _validate_ids(ids)
+    if not ids:
+        return 0
+    released = release_attachments(db, owner.column == owner.id, Attachment.id.in_(ids))
+    _finish_delete(db, owner, released.files)
+    return released.count
+
+
+def _finish_delete(db: Session, owner: AttachmentOwner, files: List[str]) -> None:
+    storage_reclaimer.log_deletions(db, files)
+    bump_data_version(db, [owner.user_id])
+    db.commit()
+    storage_reclaimer.wake()
+
+
+def zip_response(db: Session, owner: AttachmentOwner, ids) -> StreamingResponse:
+    ids = _validate_ids(ids)
+    rows = db.query(Attachment).filter(owner.column == owner.id, Attachment.id.in_(ids)).all()
+    if not rows:
+        raise HTTPException(404, detail="No attachments found")
+
+    present = [a for a in rows if a.storage_path and os.path.exists(a.storage_path)]
+    names = unique_arcnames((a.filename for a in present), (f"att-{a.id}" for a in present))
+    files = [(name, a.storage_path) for name, a in zip(names, present)]
+
+    headers = {"Content-Disposition": f"attachment; filename={owner.zip_name}"}
+    return StreamingResponse(iter_zip_files(files), media_type="application/zip", headers=headers)
@@ -0,0 +1,193 @@
+"""
+Content-addressed attachment storage.
+
+Uploaded bytes are keyed by their SHA-256 and stored once under
+``{ATTACH_BASE_DIR}/blobs/{sha[:2]}/{sha}{ext}``. Every Attachment with the
+same content points at that file through ``blob_sha256`` and shares its
+thumbnail and renditions, so a screenshot attached to a trade, its journal
+day and a playbook answer is stored, normalised and thumbnailed once.
+
+References are counted from the ``attachments`` rows themselves (indexed
+``blob_sha256``) rather than a stored counter, so FK cascades can never
+leave a count wrong: a blob's files are removed when the last attachment
+pointing at it is deleted through ``release_attachments``.
+
+Uploads are streamed to a staging file (hashed on the way) and then renamed
+into place, so content is never held in memory whole.
+
+Attachments uploaded before the blob store keep their own files
+(``blob_sha256`` NULL) and are deleted exactly as before.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import Attachment, AttachmentBlob
+from .renditions import rendition_paths
+from .storage_usage import OWNER_ACCOUNT_ID, OWNER_USER_ID, UsageDelta, with_owner
+
+BLOBS_DIRNAME = "blobs"
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobTooLarge(ValueError):
+    """Upload exceeded the size limit while being staged."""
+
+
+class StagedFile(NamedTuple):
+    path: str
+    sha256: str
+    size_bytes: int
+
+
+class Released(NamedTuple):
+    count: int  # attachment rows deleted
+    files: List[str]  # to unlink after commit
+
+
+class BlobRef(NamedTuple):
+    sha256: str
+    storage_path: str
+    thumb_path: Optional[str]
+    size_bytes: int
+    thumb_size_bytes: Optional[int]
+    created: bool  # True if this upload stored new content (needs processing)
+
+
+def blob_path(base_dir: str, sha256: str, ext: str) -> str:
+    return os.path.join(base_dir, BLOBS_DIRNAME, sha256[:2], sha256 + ext.lower())
+
+
+def staging_dir(base_dir: str) -> str:
+    return os.path.join(base_dir, BLOBS_DIRNAME, "tmp")
+
+
+def stage_stream(chunks: Iterable[bytes], base_dir: str, max_bytes: Optional[int] = None) -> StagedFile:
+    """
+    Write chunks to a durable temp file beside the blob store, hashing as it
+    goes, so an upload is never held in memory whole. Raises BlobTooLarge
+    (and removes the temp file) once ``max_bytes`` is exceeded.
+    """
+    d = staging_dir(base_dir)
+    os.makedirs(d, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=d, suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise BlobTooLarge(f"exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        discard_staged(path)
+        raise
+    return StagedFile(path, digest.hexdigest(), size)
+
+
+def stage_fileobj(fileobj, base_dir: str, max_bytes: Optional[int] = None) -> StagedFile:
+    """``stage_stream`` over a readable binary file object."""
+    return stage_stream(iter(lambda: fileobj.read(CHUNK_SIZE), b""), base_dir, max_bytes)
+
+
+def discard_staged(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def acquire_blob(db: Session, base_dir: str, staged: StagedFile, ext: str) -> BlobRef:
+    """
+    Return the blob for a staged upload, moving the staged file into the
+    store if the content is new and discarding it otherwise.
+
+    Commits the blob row (not the caller's attachment) so concurrent uploads
+    of the same bytes agree on a single file.
+    """
+    sha = staged.sha256
+    blob = db.get(AttachmentBlob, sha)
+    if blob is not None:
+        if os.path.exists(blob.storage_path):
+            discard_staged(staged.path)
+        else:
+            os.replace(staged.path, blob.storage_path)  # repair a lost file
+        return BlobRef(sha, blob.storage_path, blob.thumb_path, blob.size_bytes, blob.thumb_size_bytes, False)
+
+    path = blob_path(base_dir, sha, ext)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(staged.path, path)
+    db.add(AttachmentBlob(sha256=sha, storage_path=path, size_bytes=staged.size_bytes))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Same bytes uploaded concurrently; theirs won, and the file is identical
+        db.rollback()
+        blob = db.get(AttachmentBlob, sha)
+        return BlobRef(sha, blob.storage_path, blob.thumb_path, blob.size_bytes, blob.thumb_size_bytes, False)
+    return BlobRef(sha, path, None, staged.size_bytes, None, True)
+
+
+def _attachment_files(att) -> Set[str]:
+    paths = {att.storage_path, att.thumb_path} | rendition_paths(att)
+    return {p for p in paths if p}
+
+
+def release_attachments(db: Session, *criteria) -> Released:
+    """
+    Delete the attachments matching ``criteria`` with a single DELETE and
+    drop blobs they were the last reference to.
+
+    Set-based, so the data_version flush listener does not see it: callers
+    bump the owner's version themselves. Storage usage counters are adjusted
+    here. Runs inside the caller's transaction; the returned file paths are
+    for the caller to log with ``storage_reclaimer.log_deletions`` before
+    committing.
+    """
+    rows = with_owner(db.query(
+        Attachment.id, Attachment.blob_sha256, Attachment.storage_path, Attachment.thumb_path,
+        Attachment.renditions_json, Attachment.size_bytes, Attachment.thumb_size_bytes,
+        OWNER_USER_ID, OWNER_ACCOUNT_ID,
+    )).filter(*criteria).all()
+    if not rows:
+        return Released(0, [])
+    # Default synchronisation also drops any of these already loaded in the session
+    db.execute(delete(Attachment).where(Attachment.id.in_([r.id for r in rows])))
+    usage = UsageDelta()
+    for r in rows:
+        usage.add_attachment(r, -1)
+    usage.apply(db)
+
+    files: Set[str] = set()
+    shas = {r.blob_sha256 for r in rows if r.blob_sha256}
+    for r in rows:
+        if not r.blob_sha256:
+            files |= _attachment_files(r)
+    if shas:
+        still_used = {
+            sha for (sha,) in db.query(Attachment.blob_sha256).filter(Attachment.blob_sha256.in_(shas)).distinct()
+        }
+        orphaned = shas - still_used
+        for r in rows:
+            if r.blob_sha256 in orphaned:
+                files |= _attachment_files(r)
+        if orphaned:
+            for path, thumb in db.query(AttachmentBlob.storage_path, AttachmentBlob.thumb_path).filter(AttachmentBlob.sha256.in_(orphaned)):
+                files |= {p for p in (path, thumb) if p}
+            db.execute(
+                delete(AttachmentBlob).where(AttachmentBlob.sha256.in_(orphaned)),
+                execution_options={"synchronize_session": False},
+            )
+    return Released(len(rows), sorted(files))
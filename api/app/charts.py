@@ -0,0 +1,229 @@
+"""
+Lightweight SVG charts for PDF reports.
+
+Emits SVG directly instead of going through a plotting library: series are
+downsampled to the plot's pixel width (min/max per bucket, so peaks and
+troughs survive) and written as compact path data. Charts are returned as
+``data:`` URIs for ``<img src>`` in the report templates.
+"""
+
+import calendar
+import math
+from datetime import date, datetime, timezone
+from typing import Callable, Iterable, List, Sequence, Tuple
+from urllib.parse import quote
+
+Point = Tuple[float, float]
+
+WIDTH = 800
+HEIGHT = 300
+_MARGIN_LEFT = 64
+_MARGIN_RIGHT = 12
+_MARGIN_TOP = 12
+_MARGIN_BOTTOM = 28
+
+_LINE = "#2563eb"
+_GAIN = "#16a34a"
+_LOSS = "#dc2626"
+_GRID = "#e5e7eb"
+_AXIS_TEXT = "#6b7280"
+
+
+def _ts(dt: datetime) -> float:
+    """Seconds since epoch, treating naive datetimes as UTC (as stored)."""
+    return float(calendar.timegm(dt.utctimetuple())) + dt.microsecond / 1e6
+
+
+def _date_label(x: float) -> str:
+    return datetime.fromtimestamp(x, timezone.utc).strftime("%m/%d")
+
+
+def _date_label_with_year(x: float) -> str:
+    return datetime.fromtimestamp(x, timezone.utc).strftime("%m/%y")
+
+
+def downsample_minmax(points: Sequence[Point], buckets: int) -> List[Point]:
+    """
+    Reduce a series to at most ~2 * buckets points, keeping each bucket's
+    minimum and maximum (in x order) plus the first and last points.
+    """
+    n = len(points)
+    if buckets <= 0 or n <= 2 * buckets + 2:
+        return list(points)
+    out = [points[0]]
+    size = (n - 2) / buckets
+    for b in range(buckets):
+        lo = 1 + int(b * size)
+        hi = 1 + int((b + 1) * size)
+        if hi <= lo:
+            continue
+        i_min = min(range(lo, hi), key=lambda i: points[i][1])
+        i_max = max(range(lo, hi), key=lambda i: points[i][1])
+        for i in sorted({i_min, i_max}):
+            out.append(points[i])
+    out.append(points[-1])
+    return out
+
+
+def _nice_step(span: float, target_ticks: int = 5) -> float:
+    if span <= 0:
+        return 1.0
+    raw = span / target_ticks
+    mag = 10 ** math.floor(math.log10(raw))
+    for m in (1, 2, 2.5, 5, 10):
+        if raw <= m * mag:
+            return m * mag
+    return 10 * mag
+
+
+def _fmt_money(v: float) -> str:
+    sign = "-" if v < 0 else ""
+    v = abs(v)
+    if v >= 10000:
+        return f"{sign}${v / 1000:,.0f}k"
+    if v >= 1000:
+        return f"{sign}${v / 1000:,.1f}k"
+    return f"{sign}${v:,.0f}"
+
+
+def _n(v: float) -> str:
+    """Compact coordinate: one decimal, no trailing zeros."""
+    s = f"{v:.1f}"
+    return s[:-2] if s.endswith(".0") else s
+
+
+class _Frame:
+    """Maps data coordinates to the plot area and draws axes/gridlines."""
+
+    def __init__(self, x_min: float, x_max: float, y_min: float, y_max: float):
+        y_min, y_max = min(y_min, 0.0), max(y_max, 0.0)  # always show the zero line
+        if y_max - y_min <= 0:
+            y_min, y_max = -1.0, 1.0
+        step = _nice_step(y_max - y_min)
+        self.y_lo = math.floor(y_min / step) * step
+        self.y_hi = math.ceil(y_max / step) * step
+        self.y_step = step
+        self.x_min = x_min
+        self.x_max = x_max if x_max > x_min else x_min + 1.0
+        self.left = _MARGIN_LEFT
+        self.right = WIDTH - _MARGIN_RIGHT
+        self.top = _MARGIN_TOP
+        self.bottom = HEIGHT - _MARGIN_BOTTOM
+
+    @property
+    def plot_width(self) -> int:
+        return int(self.right - self.left)
+
+    def x(self, v: float) -> float:
+        return self.left + (v - self.x_min) / (self.x_max - self.x_min) * (self.right - self.left)
+
+    def y(self, v: float) -> float:
+        return self.bottom - (v - self.y_lo) / (self.y_hi - self.y_lo) * (self.bottom - self.top)
+
+    def axes(self, x_label: Callable[[float], str], x_ticks: int = 6) -> List[str]:
+        parts = []
+        v = self.y_lo
+        while v <= self.y_hi + self.y_step / 2:
+            yy = _n(self.y(v))
+            parts.append(f'<path d="M{self.left} {yy}H{self.right}" stroke="{_GRID}"/>')
+            parts.append(f'<text x="{self.left - 6}" y="{yy}" text-anchor="end" dy="4">{_fmt_money(v)}</text>')
+            v += self.y_step
+        zero = _n(self.y(0))
+        parts.append(f'<path d="M{self.left} {zero}H{self.right}" stroke="#666" stroke-dasharray="4 3"/>')
+        for i in range(x_ticks):
+            xv = self.x_min + (self.x_max - self.x_min) * i / max(x_ticks - 1, 1)
+            anchor = "start" if i == 0 else ("end" if i == x_ticks - 1 else "middle")
+            parts.append(f'<text x="{_n(self.x(xv))}" y="{HEIGHT - 8}" text-anchor="{anchor}">{x_label(xv)}</text>')
+        return parts
+
+
+def _svg(parts: Iterable[str]) -> str:
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {HEIGHT}" width="{WIDTH}" height="{HEIGHT}" '
+        f'font-family="Helvetica, Arial, sans-serif" font-size="11" fill="{_AXIS_TEXT}">'
+        + "".join(parts)
+        + "</svg>"
+    )
+
+
+def svg_data_uri(svg: str) -> str:
+    """Percent-encoded data URI (smaller than base64 for SVG markup); "" for no chart."""
+    if not svg:
+        return ""
+    return "data:image/svg+xml;charset=utf-8," + quote(svg, safe="/:=,.-")
+
+
+def _label_fn(x_min: float, x_max: float) -> Callable[[float], str]:
+    # Spans over ~6 months show month/year rather than month/day
+    return _date_label_with_year if x_max - x_min > 183 * 86400 else _date_label
+
+
+def _polyline(frame: _Frame, points: Sequence[Point]) -> str:
+    return "M" + "L".join(f"{_n(frame.x(x))} {_n(frame.y(y))}" for x, y in points)
+
+
+def _area(frame: _Frame, points: Sequence[Point]) -> str:
+    zero = _n(frame.y(0))
+    first, last = points[0], points[-1]
+    return f"M{_n(frame.x(first[0]))} {zero}" + "L" + _polyline(frame, points)[1:] + f"L{_n(frame.x(last[0]))} {zero}Z"
+
+
+def equity_curve_svg(series: Sequence[Tuple[datetime, float]]) -> str:
+    """Cumulative P&L line with a light fill to zero."""
+    if not series:
+        return ""
+    points = [(_ts(t), v) for t, v in series]
+    frame = _Frame(points[0][0], points[-1][0], min(v for _, v in points), max(v for _, v in points))
+    pts = downsample_minmax(points, frame.plot_width)
+    parts = frame.axes(_label_fn(frame.x_min, frame.x_max))
+    parts.append(f'<path d="{_area(frame, pts)}" fill="{_LINE}" fill-opacity="0.1"/>')
+    parts.append(f'<path d="{_polyline(frame, pts)}" fill="none" stroke="{_LINE}" stroke-width="2" stroke-linejoin="round"/>')
+    return _svg(parts)
+
+
+def drawdown_svg(series: Sequence[Tuple[datetime, float]]) -> str:
+    """Underwater plot: distance below the running equity peak (starting from 0)."""
+    if not series:
+        return ""
+    points = []
+    peak = 0.0
+    for t, v in series:
+        peak = max(peak, v)
+        points.append((_ts(t), v - peak))
+    if all(v == 0 for _, v in points):
+        return ""
+    frame = _Frame(points[0][0], points[-1][0], min(v for _, v in points), 0.0)
+    pts = downsample_minmax(points, frame.plot_width)
+    parts = frame.axes(_label_fn(frame.x_min, frame.x_max))
+    parts.append(f'<path d="{_area(frame, pts)}" fill="{_LOSS}" fill-opacity="0.25" stroke="{_LOSS}" stroke-width="1"/>')
+    return _svg(parts)
+
+
+def daily_pnl_bars_svg(days: Sequence[Tuple[date, float]]) -> str:
+    """One bar per trading day, gains and losses each drawn as a single path."""
+    if not days:
+        return ""
+    days = sorted(days)
+    d0, d1 = days[0][0].toordinal(), days[-1][0].toordinal()
+    frame = _Frame(d0 - 0.5, d1 + 0.5, min(v for _, v in days), max(v for _, v in days))
+    slot = frame.plot_width / (d1 - d0 + 1)
+    bw = max(slot * 0.8, 0.6)
+    zero = frame.y(0)
+    gains, losses = [], []
+    for d, v in days:
+        if v == 0:
+            continue
+        x = frame.x(d.toordinal()) - bw / 2
+        h = frame.y(v) - zero
+        (gains if v > 0 else losses).append(f"M{_n(x)} {_n(zero)}h{_n(bw)}v{_n(h)}h{_n(-bw)}Z")
+
+    def label(x: float) -> str:
+        d = date.fromordinal(max(1, int(round(x))))
+        return d.strftime("%m/%y") if d1 - d0 > 183 else d.strftime("%m/%d")
+
+    parts = frame.axes(label, x_ticks=min(6, d1 - d0 + 1) if d1 > d0 else 1)
+    if gains:
+        parts.append(f'<path d="{"".join(gains)}" fill="{_GAIN}"/>')
+    if losses:
+        parts.append(f'<path d="{"".join(losses)}" fill="{_LOSS}"/>')
+    return _svg(parts)
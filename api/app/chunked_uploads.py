@@ -0,0 +1,256 @@
+"""
+Resumable chunked attachment uploads.
+
+Large evidence files (multi-page broker PDFs, big screenshots) are sent as a
+sequence of fixed-size chunks instead of one request body:
+
+1. init: the client declares filename, total size and optionally the
+   SHA-256; the server checks type and size limit up front and returns an
+   upload id and the chunk size.
+2. put chunk N (any order, retried freely): the body is read incrementally
+   and rejected as soon as it exceeds that chunk's expected length, then
+   written to its own file (temp file + rename, so a chunk is either whole
+   or absent). An ``X-Chunk-Sha256`` header, if sent, is verified.
+3. status: lists the chunks received so far, so an interrupted client
+   resumes by sending only the missing ones.
+4. finalize: the chunks are concatenated through ``blobs.stage_stream``
+   (hashed on the way, never held in memory), checked against the declared
+   size and digest, and attached exactly like a single-request upload,
+   including the background image pipeline.
+
+State lives on disk beside the blob store under
+``{ATTACH_BASE_DIR}/blobs/uploads/{upload_id}/`` (``manifest.json`` plus
+``{index}.chunk`` files), so it survives restarts and is shared by API
+workers on the same volume. Uploads not finalized within
+ATTACH_UPLOAD_TTL_HOURS are removed by the next init.
+"""
+
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import time
+from typing import Iterator, List, NamedTuple, Optional
+
+from fastapi import HTTPException, Request
+from sqlalchemy.orm import Session
+
+from .attachments import AttachmentOwner, attach_staged, check_extension
+from .blobs import BLOBS_DIRNAME, CHUNK_SIZE, BlobTooLarge, StagedFile, discard_staged, stage_stream
+from .schemas import AttachmentOut, ChunkedUploadOut
+from .storage_usage import check_quota
+
+# Largest file accepted through chunked upload (single requests keep ATTACH_MAX_MB)
+ATTACH_UPLOAD_MAX_MB = float(os.environ.get("ATTACH_UPLOAD_MAX_MB", "200"))
+ATTACH_UPLOAD_TTL_HOURS = float(os.environ.get("ATTACH_UPLOAD_TTL_HOURS", "24"))
+UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadManifest(NamedTuple):
+    upload_id: str
+    user_id: int
+    owner: str  # AttachmentOwner.url_prefix the upload was started for
+    filename: str
+    mime_type: Optional[str]
+    size_bytes: int
+    sha256: Optional[str]
+    chunk_size: int
+    created_at: float
+    meta: dict  # timeframe/state/view/caption/reviewed for the attachment
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, -(-self.size_bytes // self.chunk_size))
+
+    def chunk_length(self, index: int) -> int:
+        if index < 0 or index >= self.chunk_count:
+            raise HTTPException(400, detail=f"Chunk index out of range (0..{self.chunk_count - 1})")
+        if index < self.chunk_count - 1:
+            return self.chunk_size
+        return self.size_bytes - self.chunk_size * (self.chunk_count - 1)
+
+
+def uploads_dir(base_dir: str) -> str:
+    return os.path.join(base_dir, BLOBS_DIRNAME, "uploads")
+
+
+def _upload_dir(base_dir: str, upload_id: str) -> str:
+    return os.path.join(uploads_dir(base_dir), upload_id)
+
+
+def _chunk_path(base_dir: str, upload_id: str, index: int) -> str:
+    return os.path.join(_upload_dir(base_dir, upload_id), f"{index}.chunk")
+
+
+def _write_manifest(base_dir: str, m: UploadManifest) -> None:
+    path = os.path.join(_upload_dir(base_dir, m.upload_id), "manifest.json")
+    with open(path + ".part", "w") as f:
+        json.dump(m._asdict(), f)
+    os.replace(path + ".part", path)
+
+
+def sweep_stale_uploads(base_dir: str, now: Optional[float] = None) -> int:
+    """Remove upload directories older than the TTL; returns how many went."""
+    root = uploads_dir(base_dir)
+    cutoff = (now or time.time()) - ATTACH_UPLOAD_TTL_HOURS * 3600
+    removed = 0
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return 0
+    for e in entries:
+        try:
+            if e.is_dir() and e.stat().st_mtime < cutoff:
+                shutil.rmtree(e.path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def init_upload(
+    db: Session,
+    base_dir: str,
+    owner: AttachmentOwner,
+    filename: str,
+    size_bytes: int,
+    mime_type: Optional[str] = None,
+    sha256: Optional[str] = None,
+    meta: Optional[dict] = None,
+) -> UploadManifest:
+    check_extension(filename)
+    if size_bytes <= 0:
+        raise HTTPException(400, detail="size_bytes must be positive")
+    if size_bytes > int(ATTACH_UPLOAD_MAX_MB * 1024 * 1024):
+        raise HTTPException(413, detail=f"File exceeds limit of {int(ATTACH_UPLOAD_MAX_MB)} MB")
+    # Refuse up front rather than after the whole file has been sent
+    check_quota(db, owner.user_id, size_bytes)
+    if sha256 is not None:
+        sha256 = sha256.lower()
+        if not _SHA256_RE.match(sha256):
+            raise HTTPException(400, detail="sha256 must be 64 hex characters")
+    sweep_stale_uploads(base_dir)
+
+    m = UploadManifest(
+        upload_id=secrets.token_hex(16),
+        user_id=owner.user_id,
+        owner=owner.url_prefix,
+        filename=filename,
+        mime_type=mime_type,
+        size_bytes=size_bytes,
+        sha256=sha256,
+        chunk_size=UPLOAD_CHUNK_BYTES,
+        created_at=time.time(),
+        meta=meta or {},
+    )
+    os.makedirs(_upload_dir(base_dir, m.upload_id))
+    _write_manifest(base_dir, m)
+    return m
+
+
+def load_upload(base_dir: str, owner: AttachmentOwner, upload_id: str) -> UploadManifest:
+    """The upload's manifest; 404 if unknown, expired or started for another trade/journal/user."""
+    if not _UPLOAD_ID_RE.match(upload_id):
+        raise HTTPException(404, detail="Upload not found")
+    try:
+        with open(os.path.join(_upload_dir(base_dir, upload_id), "manifest.json")) as f:
+            m = UploadManifest(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        raise HTTPException(404, detail="Upload not found")
+    if m.user_id != owner.user_id or m.owner != owner.url_prefix:
+        raise HTTPException(404, detail="Upload not found")
+    return m
+
+
+def status_out(base_dir: str, m: UploadManifest) -> ChunkedUploadOut:
+    return ChunkedUploadOut(
+        upload_id=m.upload_id,
+        filename=m.filename,
+        size_bytes=m.size_bytes,
+        chunk_size=m.chunk_size,
+        chunk_count=m.chunk_count,
+        received=received_chunks(base_dir, m),
+    )
+
+
+def received_chunks(base_dir: str, m: UploadManifest) -> List[int]:
+    return [i for i in range(m.chunk_count) if os.path.exists(_chunk_path(base_dir, m.upload_id, i))]
+
+
+async def read_chunk_body(request: Request, expected: int) -> bytes:
+    """Read one chunk's request body, refusing it as soon as it is longer than ``expected``."""
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > expected:
+        raise HTTPException(413, detail=f"Chunk exceeds its expected {expected} bytes")
+    buf = bytearray()
+    async for part in request.stream():
+        buf += part
+        if len(buf) > expected:
+            raise HTTPException(413, detail=f"Chunk exceeds its expected {expected} bytes")
+    if len(buf) != expected:
+        raise HTTPException(400, detail=f"Chunk is {len(buf)} bytes; expected {expected}")
+    return bytes(buf)
+
+
+def write_chunk(base_dir: str, m: UploadManifest, index: int, data: bytes, sha256: Optional[str] = None) -> List[int]:
+    """Store chunk ``index`` (replacing any earlier copy); returns the received chunk indexes."""
+    if len(data) != m.chunk_length(index):
+        raise HTTPException(400, detail=f"Chunk is {len(data)} bytes; expected {m.chunk_length(index)}")
+    if sha256 is not None and hashlib.sha256(data).hexdigest() != sha256.lower():
+        raise HTTPException(400, detail="Chunk checksum mismatch")
+    path = _chunk_path(base_dir, m.upload_id, index)
+    tmp = f"{path}.{secrets.token_hex(4)}.part"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except FileNotFoundError:
+        # Aborted or finalized concurrently
+        raise HTTPException(404, detail="Upload not found")
+    return received_chunks(base_dir, m)
+
+
+def _iter_chunks(base_dir: str, m: UploadManifest) -> Iterator[bytes]:
+    for i in range(m.chunk_count):
+        with open(_chunk_path(base_dir, m.upload_id, i), "rb") as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                yield block
+
+
+def assemble(base_dir: str, m: UploadManifest) -> StagedFile:
+    """
+    Concatenate the chunks into a staged blob file, verifying total size and
+    (if declared) SHA-256. The upload's directory stays until ``discard_upload``.
+    """
+    missing = m.chunk_count - len(received_chunks(base_dir, m))
+    if missing:
+        raise HTTPException(409, detail=f"{missing} chunk(s) missing")
+    try:
+        staged = stage_stream(_iter_chunks(base_dir, m), base_dir, m.size_bytes)
+    except BlobTooLarge:
+        raise HTTPException(400, detail="Upload is larger than declared")
+    except FileNotFoundError:
+        raise HTTPException(404, detail="Upload not found")
+    if staged.size_bytes != m.size_bytes or (m.sha256 and staged.sha256 != m.sha256):
+        discard_staged(staged.path)
+        raise HTTPException(400, detail="Upload checksum mismatch")
+    return staged
+
+
+def finalize(db: Session, base_dir: str, owner: AttachmentOwner, m: UploadManifest) -> AttachmentOut:
+    """Assemble a complete upload and attach it like a single-request upload."""
+    staged = assemble(base_dir, m)
+    out = attach_staged(db, owner, staged, base_dir, m.filename, m.mime_type, **m.meta)
+    discard_upload(base_dir, m.upload_id)
+    return out
+
+
+def discard_upload(base_dir: str, upload_id: str) -> None:
+    shutil.rmtree(_upload_dir(base_dir, upload_id), ignore_errors=True)
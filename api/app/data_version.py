@@ -0,0 +1,81 @@
+"""
+Per-user data version.
+
+``users.data_version`` is bumped in the same transaction as any change to
+data that reports are built from (trades, accounts, journal entries and
+links, attachments, playbook responses, saved views). Report caching keys
+on it, so a cached PDF can never outlive the data it was rendered from.
+
+ORM writes are tracked automatically by a ``before_flush`` listener.
+Set-based ``query.update()`` / ``query.delete()`` bypass flush events, so
+callers doing bulk writes call ``bump_data_version`` themselves.
+"""
+
+from typing import Iterable, Set
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from .models import (
+    Account,
+    Attachment,
+    DailyJournal,
+    DailyJournalTradeLink,
+    PlaybookResponse,
+    SavedView,
+    Trade,
+    User,
+)
+
+_TRACKED = (Trade, Account, DailyJournal, DailyJournalTradeLink, Attachment, PlaybookResponse, SavedView)
+
+
+def bump_data_version(db: Session, user_ids: Iterable[int]) -> None:
+    """Increment data_version for the given users (no-op for an empty set)."""
+    ids = sorted({int(u) for u in user_ids if u is not None})
+    if not ids:
+        return
+    db.execute(
+        update(User).where(User.id.in_(ids)).values(data_version=User.data_version + 1),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def _owner_ids(session: Session, objs) -> Set[int]:
+    users: Set[int] = set()
+    account_ids: Set[int] = set()
+    trade_ids: Set[int] = set()
+    journal_ids: Set[int] = set()
+    for o in objs:
+        uid = getattr(o, "user_id", None)
+        if uid is not None:
+            users.add(uid)
+        elif isinstance(o, Trade):
+            if o.account_id is not None:
+                account_ids.add(o.account_id)
+        elif isinstance(o, (Attachment, DailyJournalTradeLink)):
+            if o.trade_id is not None:
+                trade_ids.add(o.trade_id)
+            if o.journal_id is not None:
+                journal_ids.add(o.journal_id)
+    conn = session.connection()
+    if trade_ids:
+        account_ids.update(r[0] for r in conn.execute(
+            select(Trade.account_id).where(Trade.id.in_(trade_ids))) if r[0] is not None)
+    if account_ids:
+        users.update(r[0] for r in conn.execute(
+            select(Account.user_id).where(Account.id.in_(account_ids))) if r[0] is not None)
+    if journal_ids:
+        users.update(r[0] for r in conn.execute(
+            select(DailyJournal.user_id).where(DailyJournal.id.in_(journal_ids))))
+    return users
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_on_flush(session: Session, flush_context, instances) -> None:
+    changed = [
+        o for o in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(o, _TRACKED) and (o not in session.dirty or session.is_modified(o))
+    ]
+    if changed:
+        bump_data_version(session, _owner_ids(session, changed))
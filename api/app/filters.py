@@ -8,6 +8,7 @@ The filter DSL supports nested AND/OR groups with various operators:
 - gte, lte, gt, lt: numeric/date comparisons
 - between: range queries
 - is_null, not_null: null checks
+- text: full-text match over trade notes/post-analysis (indexed, see search.py)
 """
 
 from typing import Dict, List, Any, Union
@@ -36,6 +37,8 @@ class FilterCompiler:
         "entry_price": Trade.entry_price,
         "exit_price": Trade.exit_price,
         "reviewed": Trade.reviewed,
+        "notes": Trade.notes_md,
+        "post_analysis": Trade.post_analysis_md,
 
         # Playbook fields (requires join)
         "playbook.grade": PlaybookResponse.computed_grade,
@@ -47,6 +50,10 @@ class FilterCompiler:
         "account.status": Account.status,
     }
 
+    # Fields that accept the 'text' operator. Both search the same indexed
+    # document (notes + post-analysis), so either name works in the DSL.
+    TEXT_SEARCH_FIELDS = {"notes", "post_analysis"}
+
     def __init__(self, user_id: int):
         """
         Initialize the filter compiler for a specific user.
@@ -58,6 +65,7 @@ class FilterCompiler:
         self._needs_account_join = False
         self._needs_instrument_join = False
         self._needs_playbook_join = False
+        self._dialect = ""
 
     def compile(self, filter_dsl: Dict[str, Any], base_query: Query) -> Query:
         """
@@ -82,6 +90,10 @@ class FilterCompiler:
         if not filter_dsl or "conditions" not in filter_dsl:
             return base_query
 
+        session = getattr(base_query, "session", None)
+        if session is not None and session.get_bind() is not None:
+            self._dialect = session.get_bind().dialect.name
+
         # First pass: check which joins are needed
         self._analyze_required_joins(filter_dsl)
 
@@ -96,6 +108,17 @@ class FilterCompiler:
 
         return query
 
+    def condition(self, filter_dsl: Dict[str, Any]) -> Any:
+        """
+        The WHERE expression the DSL compiles to, without applying it.
+
+        Returns None when the DSL constrains nothing (no conditions, or only
+        empty groups).
+        """
+        if not filter_dsl or "conditions" not in filter_dsl:
+            return None
+        return self._compile_group(filter_dsl)
+
     def _analyze_required_joins(self, filter_dsl: Dict[str, Any]) -> None:
         """Analyze filter DSL to determine which joins are needed"""
         conditions = filter_dsl.get("conditions", [])
@@ -206,6 +229,15 @@ class FilterCompiler:
                 return None
             return func.lower(column).contains(str(value).lower())
 
+        elif op == "text":
+            # Full-text match against the notes search index
+            if field_name not in self.TEXT_SEARCH_FIELDS:
+                raise ValueError(f"Operator 'text' is not supported for field: {field_name}")
+            if value is None:
+                return None
+            from .search import trade_text_clause
+            return trade_text_clause(self._dialect, str(value))
+
         elif op == "in":
             if not isinstance(value, list) or not value:
                 return None
@@ -0,0 +1,63 @@
+"""
+Conditional GET helpers for file downloads.
+
+Starlette's FileResponse answers Range and If-Range requests but ignores
+If-None-Match, so endpoints serving stored files go through
+``file_response``: it answers 304 when the client's cached copy is current
+and otherwise streams the file with an explicit ETag and Cache-Control
+(FileResponse then uses that ETag for If-Range too).
+"""
+
+import hashlib
+import os
+from typing import List, Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+# Revalidate on every use (cheap: a 304 carries no body)
+REVALIDATE = "private, no-cache"
+# For URLs whose content can never change
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def stat_etag(st: os.stat_result) -> str:
+    return '"' + hashlib.md5(f"{st.st_mtime}-{st.st_size}".encode(), usedforsecurity=False).hexdigest() + '"'
+
+
+def content_etag(sha256: Optional[str], st: os.stat_result, suffix: str = "") -> str:
+    """
+    Strong ETag from a content checksum, qualified by the file's size and
+    mtime so a file rewritten in place (e.g. an image normalised after upload)
+    never shares a tag with its earlier bytes. Falls back to ``stat_etag``.
+    """
+    if not sha256:
+        return stat_etag(st)
+    return f'"{sha256}{suffix}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def parse_if_none_match(value) -> List[str]:
+    if not value:
+        return []
+    return [t.strip().removeprefix("W/") for t in value.split(",")]
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    tags = parse_if_none_match(request.headers.get("if-none-match"))
+    return etag in tags or "*" in tags
+
+
+def file_response(
+    request: Request,
+    path: str,
+    media_type: Optional[str],
+    etag: str,
+    st: os.stat_result,
+    filename: Optional[str] = None,
+    cache_control: str = REVALIDATE,
+) -> Response:
+    """304 when If-None-Match matches, else a FileResponse (which answers Range requests itself)."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, filename=filename, stat_result=st, headers=headers)
@@ -0,0 +1,150 @@
+"""
+Background processing of uploaded attachment images.
+
+Uploads store the original bytes and return immediately; decoding,
+normalisation (mode conversion, EXIF stripping, JPEG re-encode) and
+thumbnailing then run on a bounded thread pool (ATTACH_IMAGE_WORKERS,
+default 2) instead of the event loop. Pillow releases the GIL while
+decoding and encoding, so the threads genuinely run in parallel.
+
+Work is per blob (see blobs.py): content uploaded before is never
+processed again. When processing finishes the blob's and its attachments'
+``thumb_path`` and sizes are updated (``thumb_available`` in the API
+reflects this) and their owners' storage usage is adjusted to match. Failures leave the original as
+uploaded and no thumbnail, exactly as a synchronous failure would have.
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from .db import engine
+from .models import Attachment, AttachmentBlob
+from .renditions import IMAGE_EXTS, RENDITION_SIZES
+from .storage_usage import OWNER_ACCOUNT_ID, OWNER_USER_ID, UsageDelta, with_owner
+
+ATTACH_IMAGE_WORKERS = max(1, int(os.environ.get("ATTACH_IMAGE_WORKERS", "2")))
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=ATTACH_IMAGE_WORKERS, thread_name_prefix="attach-img")
+        return _pool
+
+
+def store_original(path: str, content: bytes) -> None:
+    """Write upload bytes durably (temp file, fsync, rename) before the row is committed."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def process_image(path: str) -> Optional[str]:
+    """
+    Normalise a stored image in place and write its thumbnail under
+    ``thumbs/`` beside it. Returns the thumbnail path, or None if Pillow is
+    unavailable or the image cannot be decoded.
+    """
+    try:
+        from PIL import Image
+    except Exception:
+        return None
+
+    ext = os.path.splitext(path)[1].lower()
+    tmp = path + ".part"
+    try:
+        with Image.open(path) as src:
+            im = src.convert("RGB") if src.mode not in ("RGB", "RGBA") else src.copy()
+        # Re-saving without metadata strips EXIF (incl. GPS) from the original
+        save_params = {"quality": 92, "optimize": True} if ext in {".jpg", ".jpeg"} else {}
+        im.save(tmp, format=Image.registered_extensions().get(ext), **save_params)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[WARN] Could not normalise attachment image {path}: {e}")
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return None
+
+    try:
+        size = RENDITION_SIZES["thumb"]
+        im.thumbnail((size, size))
+        thumbs_dir = os.path.join(os.path.dirname(path), "thumbs")
+        os.makedirs(thumbs_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        # Prefer PNG if alpha channel present, else JPEG
+        if "A" in im.getbands():
+            thumb_path = os.path.join(thumbs_dir, stem + ".png")
+            im.save(thumb_path, format="PNG")
+        else:
+            thumb_path = os.path.join(thumbs_dir, stem + ".jpg")
+            im.convert("RGB").save(thumb_path, format="JPEG", quality=85, optimize=True)
+        return thumb_path
+    except Exception as e:
+        print(f"[WARN] Could not build thumbnail for {path}: {e}")
+        return None
+
+
+def run_image_job(sha256: str) -> None:
+    """Process one blob's image and record the result on it and its attachments (pool thread)."""
+    with Session(bind=engine) as db:
+        blob = db.get(AttachmentBlob, sha256)
+        if blob is None:
+            return
+        path = blob.storage_path
+    thumb_path = process_image(path)
+    if thumb_path is None:
+        return
+    try:
+        size = os.path.getsize(path)
+        thumb_size = os.path.getsize(thumb_path)
+    except OSError:
+        return
+    sizes = dict(thumb_path=thumb_path, size_bytes=size, thumb_size_bytes=thumb_size)
+    with Session(bind=engine) as db:
+        # Derivatives only: plain UPDATEs skip the data_version flush listener
+        n = db.execute(
+            update(AttachmentBlob).where(AttachmentBlob.sha256 == sha256).values(**sizes),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+        usage = UsageDelta()
+        for row in with_owner(db.query(
+            Attachment.size_bytes, Attachment.thumb_path, Attachment.thumb_size_bytes, OWNER_USER_ID, OWNER_ACCOUNT_ID,
+        )).filter(Attachment.blob_sha256 == sha256):
+            usage.add_attachment(row, -1)
+            usage.add(row.owner_user_id, row.owner_account_id, "attachments", 1, size)
+            usage.add(row.owner_user_id, row.owner_account_id, "thumbnails", 1, thumb_size)
+        db.execute(
+            update(Attachment).where(Attachment.blob_sha256 == sha256).values(**sizes),
+            execution_options={"synchronize_session": False},
+        )
+        usage.apply(db)
+        db.commit()
+    if not n:
+        # Released while we worked: our rename may have recreated the file
+        for p in (thumb_path, path):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+
+def schedule_image_processing(sha256: str, path: str) -> Optional[Future]:
+    """Queue post-upload processing for a newly stored blob; None unless it is an image."""
+    if os.path.splitext(path)[1].lower() not in IMAGE_EXTS:
+        return None
+    return _get_pool().submit(run_image_job, sha256)
@@ -1,5 +1,6 @@
 from fastapi import FastAPI, Depends
 import os
+import threading
 from alembic import command as alembic_command
 from alembic.config import Config as AlembicConfig
 import pathlib
@@ -18,7 +19,12 @@ from .routes_settings import router as settings_router
 from .routes_breaches import router as breaches_router
 from .routes_views import router as views_router
 from .routes_reports import router as reports_router
+from .routes_search import router as search_router
+from .routes_attachments import router as attachments_router
+from .routes_storage import router as storage_router
 from .deps import get_current_user
+from . import data_version  # noqa: F401  (registers the data-version flush listener)
+from . import monthly_summaries  # noqa: F401  (registers the summary invalidation flush listener)
 from .models import User
 from .version import get_version
 
@@ -57,6 +63,9 @@ app.include_router(settings_router)
 app.include_router(breaches_router)
 app.include_router(views_router)
 app.include_router(reports_router)
+app.include_router(search_router)
+app.include_router(attachments_router)
+app.include_router(storage_router)
 
 @app.get("/health")
 def health():
@@ -84,3 +93,31 @@ def _auto_migrate_dev():
         except Exception as e:
             # Don't crash app on migration error in dev; just log
             print(f"[alembic] startup migration skipped/failed: {e}")
+
+
+@app.on_event("startup")
+def _recover_report_jobs():
+    # Resubmit report jobs left queued by a previous process
+    try:
+        from .report_jobs import recover_jobs
+        recover_jobs()
+    except Exception as e:
+        print(f"[reports] job recovery skipped: {e}")
+
+
+@app.on_event("startup")
+def _warm_report_engine():
+    # Compile report templates and prime WeasyPrint off the request path
+    from .report_engine import warm_report_engine
+    threading.Thread(target=warm_report_engine, name="report-warmup", daemon=True).start()
+
+
+@app.on_event("startup")
+def _start_storage_reclaimer():
+    # Drain file deletions logged before the last shutdown; schedule the orphan sweep
+    try:
+        from .routes_trades import ATTACH_BASE_DIR
+        from .storage_reclaimer import start_background
+        start_background(ATTACH_BASE_DIR)
+    except Exception as e:
+        print(f"[storage] reclaimer not started: {e}")
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, DateTime, Date, func, Boolean, ForeignKey, UniqueConstraint, Float, Text, Index
-from sqlalchemy import Numeric, TIMESTAMP
+from sqlalchemy import BigInteger, Numeric, TIMESTAMP
 from sqlalchemy.orm import relationship
 from .db import Base
 
@@ -14,6 +14,7 @@ class User(Base):
         is_active (bool): Status of the user account.
         tz (str): User's timezone, default is "Australia/Sydney".
         created_at (datetime): Timestamp of account creation.
+        data_version (int): Bumped whenever the user's journal data changes (report cache key).
     """
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -22,6 +23,7 @@ class User(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     tz = Column(String(64), default="Australia/Sydney", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     saved_views = relationship("SavedView", back_populates="user", cascade="all, delete-orphan")
@@ -201,6 +203,9 @@ class Attachment(Base):
     size_bytes = Column(Integer, nullable=True)
     storage_path = Column(String(512), nullable=False)
     thumb_path = Column(String(512), nullable=True)
+    thumb_size_bytes = Column(Integer, nullable=True)
+    renditions_json = Column(Text, nullable=True)  # {size: {"path", "mime"}}, see renditions.py
+    blob_sha256 = Column(String(64), nullable=True, index=True)  # AttachmentBlob holding the file; NULL for pre-blob uploads
     sort_order = Column(Integer, nullable=False, default=0)
     timeframe = Column(String(8), nullable=True)   # M1, M5, H1, D1, etc.
     state = Column(String(16), nullable=True)      # marked/unmarked
@@ -374,3 +379,220 @@ class SavedView(Base):
         UniqueConstraint('user_id', 'name', name='unique_user_view_name'),
         Index('idx_saved_views_default', 'user_id', 'is_default'),
     )
+
+
+class AttachmentBlob(Base):
+    """
+    AttachmentBlob model for content-addressed attachment files.
+
+    Identical uploads share one stored file (and its thumbnail and
+    renditions). References are the Attachment rows whose ``blob_sha256``
+    matches; see blobs.py.
+
+    Attributes:
+        sha256 (str): Primary key; SHA-256 hex digest of the uploaded bytes.
+        storage_path (str): Stored (normalised) file.
+        thumb_path (str): Thumbnail once generated; None for non-images.
+        size_bytes (int): Size of the stored file.
+        thumb_size_bytes (int): Size of the thumbnail once generated.
+        created_at (datetime): When the content was first uploaded.
+    """
+    __tablename__ = "attachment_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    storage_path = Column(String(512), nullable=False)
+    thumb_path = Column(String(512), nullable=True)
+    size_bytes = Column(Integer, nullable=False)
+    thumb_size_bytes = Column(Integer, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
+class FileDeletion(Base):
+    """
+    FileDeletion model: the storage deletion log.
+
+    Requests that delete attachments record the files to remove here in the
+    same transaction; the background reclaimer (storage_reclaimer.py)
+    unlinks them afterwards and deletes the rows.
+
+    Attributes:
+        id (int): Primary key.
+        path (str): File to remove.
+        attempts (int): Failed unlink attempts so far.
+        last_error (str): Last unlink error, if any.
+        created_at (datetime): When the deletion was logged.
+    """
+    __tablename__ = "file_deletions"
+
+    id = Column(Integer, primary_key=True)
+    path = Column(String(512), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
+class StorageUsage(Base):
+    """
+    StorageUsage model: running storage counters per user, account and kind.
+
+    Adjusted in the same transaction as the rows they count (see
+    storage_usage.py) so usage and quotas never need a filesystem scan.
+
+    Attributes:
+        id (int): Primary key.
+        user_id (int): Foreign key to users table.
+        account_id (int): Account the files belong to; 0 when none (journal
+            days without an account, reports).
+        kind (str): attachments/thumbnails/reports.
+        files (int): Number of files.
+        bytes (int): Total size in bytes.
+        updated_at (datetime): Last adjustment.
+    """
+    __tablename__ = "storage_usage"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    account_id = Column(Integer, nullable=False, default=0)
+    kind = Column(String(16), nullable=False)
+    files = Column(Integer, nullable=False, default=0)
+    bytes = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "account_id", "kind", name="uq_storage_usage_user_account_kind"),
+    )
+
+
+class ReportJob(Base):
+    """
+    ReportJob model for queued PDF report renders.
+
+    Attributes:
+        id (int): Primary key.
+        user_id (int): Foreign key to users table.
+        status (str): queued/running/done/failed.
+        progress (int): Percent complete (0-100).
+        stage (str): Human-readable current step.
+        request_json (str): ReportGenerateRequest as JSON.
+        filename (str): Output file name in the user's reports directory once done.
+        artifact_id (int): ReportArtifact row for the output once done.
+        content_type (str): application/pdf or application/zip.
+        error (str): Failure message when status is failed.
+        created_at (datetime): Timestamp of submission.
+        started_at (datetime): Timestamp a worker picked the job up.
+        finished_at (datetime): Timestamp the job completed or failed.
+        worker_id (str): "host:pid" of the API process whose worker claimed the job.
+        heartbeat_at (datetime): Last sign of life from the worker while running.
+    """
+    __tablename__ = "report_jobs"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String(16), nullable=False, default="queued", server_default="queued")
+    progress = Column(Integer, nullable=False, default=0, server_default="0")
+    stage = Column(String(64), nullable=True)
+    request_json = Column(Text, nullable=False)
+    filename = Column(String(255), nullable=True)
+    artifact_id = Column(Integer, nullable=True)
+    content_type = Column(String(64), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    worker_id = Column(String(128), nullable=True)
+    heartbeat_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('idx_report_jobs_user_created', 'user_id', 'created_at'),
+        Index('idx_report_jobs_status', 'status'),
+    )
+
+
+class ReportArtifact(Base):
+    """
+    ReportArtifact model indexing a rendered report in the user's history.
+
+    One row per file in REPORTS_BASE_DIR/{user}/reports; re-rendering a
+    report with the same filename replaces its row (and id).
+
+    Attributes:
+        id (int): Primary key; stable handle for download and delete.
+        user_id (int): Foreign key to users table.
+        report_type (str): trade/daily/weekly/monthly/yearly/ytd/alltime.
+        period_json (str): The request's ReportPeriod (non-null fields) as JSON.
+        params_hash (str): SHA-256 of the full canonical ReportGenerateRequest.
+        filename (str): File name in the user's reports directory.
+        content_type (str): application/pdf or application/zip.
+        size_bytes (int): File size in bytes.
+        checksum (str): SHA-256 hex digest of the file contents.
+        created_at (datetime): When the report was generated.
+    """
+    __tablename__ = "report_artifacts"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    report_type = Column(String(16), nullable=False)
+    period_json = Column(Text, nullable=False, default="{}")
+    params_hash = Column(String(64), nullable=False)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(64), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    checksum = Column(String(64), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "filename", name="uq_report_artifacts_user_filename"),
+        Index("idx_report_artifacts_user_id", "user_id", "id"),
+        # Ids are handed out as download handles: never reuse a deleted one
+        {"sqlite_autoincrement": True},
+    )
+
+
+class MonthlySummary(Base):
+    """
+    MonthlySummary model caching per-account trade aggregates for a closed month.
+
+    Rows are computed on demand by monthly_summaries.py and deleted whenever a
+    trade in that account-month changes; yearly and all-time reports are
+    composed from them.
+
+    Attributes:
+        id (int): Primary key.
+        account_id (int): Foreign key to accounts table.
+        year (int): Calendar year (by trade open time, UTC).
+        month (int): Calendar month 1-12.
+        trade_count (int): Trades opened in the month.
+        pnl_count (int): Trades with a net P&L.
+        win_count (int): Trades with net P&L > 0.
+        loss_count (int): Trades with net P&L < 0.
+        total_pnl (float): Sum of net P&L.
+        sum_wins (float): Sum of positive net P&L.
+        sum_losses (float): Sum of negative net P&L.
+        max_pnl (float): Largest single-trade net P&L.
+        min_pnl (float): Smallest single-trade net P&L.
+        days_json (str): {"YYYY-MM-DD": [pnl, trade_count]} per trading day.
+        symbols_json (str): {symbol: [trade_count, pnl_count, win_count, pnl]}.
+        computed_at (datetime): When the row was computed.
+    """
+    __tablename__ = "monthly_summaries"
+
+    id = Column(Integer, primary_key=True)
+    account_id = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    trade_count = Column(Integer, nullable=False, default=0)
+    pnl_count = Column(Integer, nullable=False, default=0)
+    win_count = Column(Integer, nullable=False, default=0)
+    loss_count = Column(Integer, nullable=False, default=0)
+    total_pnl = Column(Float, nullable=False, default=0.0)
+    sum_wins = Column(Float, nullable=False, default=0.0)
+    sum_losses = Column(Float, nullable=False, default=0.0)
+    max_pnl = Column(Float, nullable=True)
+    min_pnl = Column(Float, nullable=True)
+    days_json = Column(Text, nullable=False, default="{}")
+    symbols_json = Column(Text, nullable=False, default="{}")
+    computed_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("account_id", "year", "month", name="uq_monthly_summaries_account_month"),
+    )
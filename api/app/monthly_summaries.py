@@ -0,0 +1,309 @@
+"""
+Per-account monthly trade summaries.
+
+Yearly, YTD and all-time reports are composed from additive month
+aggregates instead of loading every trade in range. Closed months are
+computed once and stored in ``monthly_summaries``; the current (partial)
+month is always aggregated live. A stored month is deleted whenever a trade
+in it is created, deleted, or has its P&L, open time, account or instrument
+changed: ORM writes are caught by a ``before_flush`` listener, and callers
+doing set-based trade writes call ``invalidate_trade_months`` themselves
+(the same split as data_version.py).
+"""
+
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, event, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from .models import Account, Instrument, MonthlySummary, Trade
+
+Month = Tuple[int, int]  # (year, month)
+MonthKey = Tuple[int, int, int]  # (account_id, year, month)
+
+# Trade columns a summary depends on
+_SUMMARY_FIELDS = ("net_pnl", "open_time_utc", "account_id", "instrument_id")
+
+
+class PeriodSummary:
+    """Additive trade aggregates for a period: one account-month, or several merged."""
+
+    def __init__(self):
+        self.trade_count = 0
+        self.pnl_count = 0
+        self.win_count = 0
+        self.loss_count = 0
+        self.total_pnl = 0.0
+        self.sum_wins = 0.0
+        self.sum_losses = 0.0
+        self.max_pnl: Optional[float] = None
+        self.min_pnl: Optional[float] = None
+        self.days: Dict[str, List[float]] = {}  # iso date -> [pnl, trade_count]
+        self.symbols: Dict[str, List[float]] = {}  # symbol -> [trade_count, pnl_count, win_count, pnl]
+
+    def add_trade(self, day: date, symbol: Optional[str], net_pnl: Optional[float]) -> None:
+        pnl = float(net_pnl) if net_pnl is not None else None
+        self.trade_count += 1
+        d = self.days.setdefault(day.isoformat(), [0.0, 0])
+        d[1] += 1
+        s = self.symbols.setdefault(symbol or "UNKNOWN", [0, 0, 0, 0.0])
+        s[0] += 1
+        if pnl is None:
+            return
+        self.pnl_count += 1
+        self.total_pnl += pnl
+        d[0] += pnl
+        s[1] += 1
+        s[3] += pnl
+        if pnl > 0:
+            self.win_count += 1
+            self.sum_wins += pnl
+            s[2] += 1
+        elif pnl < 0:
+            self.loss_count += 1
+            self.sum_losses += pnl
+        self.max_pnl = pnl if self.max_pnl is None else max(self.max_pnl, pnl)
+        self.min_pnl = pnl if self.min_pnl is None else min(self.min_pnl, pnl)
+
+    def merge(self, other: "PeriodSummary") -> "PeriodSummary":
+        self.trade_count += other.trade_count
+        self.pnl_count += other.pnl_count
+        self.win_count += other.win_count
+        self.loss_count += other.loss_count
+        self.total_pnl += other.total_pnl
+        self.sum_wins += other.sum_wins
+        self.sum_losses += other.sum_losses
+        if other.max_pnl is not None:
+            self.max_pnl = other.max_pnl if self.max_pnl is None else max(self.max_pnl, other.max_pnl)
+        if other.min_pnl is not None:
+            self.min_pnl = other.min_pnl if self.min_pnl is None else min(self.min_pnl, other.min_pnl)
+        for k, (pnl, n) in other.days.items():
+            d = self.days.setdefault(k, [0.0, 0])
+            d[0] += pnl
+            d[1] += n
+        for k, vals in other.symbols.items():
+            s = self.symbols.setdefault(k, [0, 0, 0, 0.0])
+            for i, v in enumerate(vals):
+                s[i] += v
+        return self
+
+    @classmethod
+    def merged(cls, parts: Iterable["PeriodSummary"]) -> "PeriodSummary":
+        out = cls()
+        for p in parts:
+            out.merge(p)
+        return out
+
+    def metrics(self) -> Dict[str, float]:
+        """Same keys and rounding as ReportGenerator.calculate_metrics."""
+        n = self.pnl_count
+        if n == 0:
+            return {
+                "total_pnl": 0.0,
+                "total_trades": self.trade_count,
+                "winning_trades": 0,
+                "losing_trades": 0,
+                "win_rate": 0.0,
+                "avg_win": 0.0,
+                "avg_loss": 0.0,
+                "profit_factor": 0.0,
+                "largest_win": 0.0,
+                "largest_loss": 0.0,
+                "avg_pnl_per_trade": 0.0,
+            }
+        sum_losses = abs(self.sum_losses)
+        return {
+            "total_pnl": round(self.total_pnl, 2),
+            "total_trades": n,
+            "winning_trades": self.win_count,
+            "losing_trades": self.loss_count,
+            "win_rate": round(self.win_count / n, 4),
+            "avg_win": round(self.sum_wins / self.win_count, 2) if self.win_count else 0.0,
+            "avg_loss": round(sum_losses / self.loss_count, 2) if self.loss_count else 0.0,
+            "profit_factor": round(self.sum_wins / sum_losses, 2) if sum_losses > 0 else 0.0,
+            "largest_win": round(self.max_pnl, 2),
+            "largest_loss": round(self.min_pnl, 2),
+            "avg_pnl_per_trade": round(self.total_pnl / n, 2),
+        }
+
+    def win_rate(self) -> float:
+        return round(self.win_count / self.pnl_count, 4) if self.pnl_count else 0.0
+
+    def daily_pnl(self) -> Dict[date, float]:
+        return {date.fromisoformat(k): v[0] for k, v in self.days.items()}
+
+    @classmethod
+    def from_row(cls, row: MonthlySummary) -> "PeriodSummary":
+        s = cls()
+        for f in ("trade_count", "pnl_count", "win_count", "loss_count", "total_pnl", "sum_wins", "sum_losses", "max_pnl", "min_pnl"):
+            setattr(s, f, getattr(row, f))
+        s.days = json.loads(row.days_json or "{}")
+        s.symbols = json.loads(row.symbols_json or "{}")
+        return s
+
+    def to_row(self, account_id: int, month: Month) -> MonthlySummary:
+        return MonthlySummary(
+            account_id=account_id, year=month[0], month=month[1],
+            trade_count=self.trade_count, pnl_count=self.pnl_count,
+            win_count=self.win_count, loss_count=self.loss_count,
+            total_pnl=self.total_pnl, sum_wins=self.sum_wins, sum_losses=self.sum_losses,
+            max_pnl=self.max_pnl, min_pnl=self.min_pnl,
+            days_json=json.dumps(self.days, separators=(",", ":")),
+            symbols_json=json.dumps(self.symbols, separators=(",", ":")),
+        )
+
+
+def month_bounds(month: Month) -> Tuple[date, date]:
+    start = date(month[0], month[1], 1)
+    nxt = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, nxt - timedelta(days=1)
+
+
+def iter_months(first: Month, last: Month) -> Iterator[Month]:
+    y, m = first
+    while (y, m) <= last:
+        yield (y, m)
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+
+
+def _aggregate_month(db: Session, account_ids: List[int], month: Month) -> Dict[int, PeriodSummary]:
+    """Aggregate one month's trades per account from a narrow column query."""
+    start, end = month_bounds(month)
+    rows = (
+        db.query(Trade.account_id, Trade.open_time_utc, Trade.net_pnl, Instrument.symbol)
+        .outerjoin(Instrument, Trade.instrument_id == Instrument.id)
+        .filter(
+            Trade.account_id.in_(account_ids),
+            func.date(Trade.open_time_utc) >= start,
+            func.date(Trade.open_time_utc) <= end,
+        )
+        .yield_per(2000)
+    )
+    out: Dict[int, PeriodSummary] = {a: PeriodSummary() for a in account_ids}
+    for account_id, open_time, net_pnl, symbol in rows:
+        out[account_id].add_trade(open_time.date(), symbol, net_pnl)
+    return out
+
+
+def load_month_summaries(
+    db: Session,
+    user_id: int,
+    first: Month,
+    last: Month,
+    account_ids: Optional[List[int]] = None,
+) -> Dict[MonthKey, PeriodSummary]:
+    """
+    Summaries for every (account, month) in [first, last] for the user's
+    accounts (optionally restricted to ``account_ids``).
+
+    Stored rows are used for closed months and missing ones are computed
+    and stored; the current month is aggregated live and future months are
+    empty.
+    """
+    q = db.query(Account.id).filter(Account.user_id == user_id)
+    if account_ids:
+        q = q.filter(Account.id.in_(account_ids))
+    accounts = [r[0] for r in q.all()]
+    out: Dict[MonthKey, PeriodSummary] = {}
+    if not accounts:
+        return out
+
+    today = datetime.utcnow().date()
+    months = list(iter_months(first, last))
+    closed = [m for m in months if month_bounds(m)[1] < today]
+
+    if closed:
+        ordinal = MonthlySummary.year * 12 + MonthlySummary.month
+        stored = db.query(MonthlySummary).filter(
+            MonthlySummary.account_id.in_(accounts),
+            ordinal >= closed[0][0] * 12 + closed[0][1],
+            ordinal <= closed[-1][0] * 12 + closed[-1][1],
+        ).all()
+        for row in stored:
+            out[(row.account_id, row.year, row.month)] = PeriodSummary.from_row(row)
+
+        new_rows = []
+        for m in closed:
+            missing = [a for a in accounts if (a, m[0], m[1]) not in out]
+            if not missing:
+                continue
+            for a, s in _aggregate_month(db, missing, m).items():
+                out[(a, m[0], m[1])] = s
+                new_rows.append(s.to_row(a, m))
+        if new_rows:
+            db.add_all(new_rows)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another render stored the same months first; ours are equivalent
+                db.rollback()
+
+    for m in months:
+        if m in closed:
+            continue
+        if month_bounds(m)[0] > today:
+            for a in accounts:
+                out[(a, m[0], m[1])] = PeriodSummary()
+        else:
+            for a, s in _aggregate_month(db, accounts, m).items():
+                out[(a, m[0], m[1])] = s
+    return out
+
+
+def invalidate_months(db: Session, keys: Iterable[MonthKey]) -> None:
+    """Delete stored summaries for the given (account_id, year, month) keys."""
+    keys = sorted({k for k in keys if k[0] is not None})
+    for i in range(0, len(keys), 300):
+        chunk = keys[i:i + 300]
+        db.execute(
+            delete(MonthlySummary).where(or_(*[
+                and_(MonthlySummary.account_id == a, MonthlySummary.year == y, MonthlySummary.month == m)
+                for a, y, m in chunk
+            ])),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def invalidate_trade_months(db: Session, trade_ids: Iterable[int]) -> None:
+    """Invalidate the months of existing trades; call before set-based trade writes."""
+    ids = list(trade_ids)
+    keys: Set[MonthKey] = set()
+    for i in range(0, len(ids), 900):
+        for account_id, open_time in db.execute(
+            select(Trade.account_id, Trade.open_time_utc).where(Trade.id.in_(ids[i:i + 900]))
+        ):
+            if open_time is not None:
+                keys.add((account_id, open_time.year, open_time.month))
+    invalidate_months(db, keys)
+
+
+def _trade_keys(trade: Trade, state: str) -> Set[MonthKey]:
+    """Account-months a trade's flush touches: its current one plus, if moved, the old one."""
+    keys: Set[MonthKey] = set()
+    if state == "dirty":
+        if not any(get_history(trade, f).has_changes() for f in _SUMMARY_FIELDS):
+            return keys
+        old_acct = get_history(trade, "account_id").deleted
+        old_time = get_history(trade, "open_time_utc").deleted
+        acct = old_acct[0] if old_acct else trade.account_id
+        t = old_time[0] if old_time else trade.open_time_utc
+        if acct is not None and t is not None:
+            keys.add((acct, t.year, t.month))
+    if trade.account_id is not None and trade.open_time_utc is not None:
+        keys.add((trade.account_id, trade.open_time_utc.year, trade.open_time_utc.month))
+    return keys
+
+
+@event.listens_for(Session, "before_flush")
+def _invalidate_on_flush(session: Session, flush_context, instances) -> None:
+    keys: Set[MonthKey] = set()
+    for state, objs in (("new", session.new), ("dirty", session.dirty), ("deleted", session.deleted)):
+        for o in objs:
+            if isinstance(o, Trade):
+                keys |= _trade_keys(o, state)
+    if keys:
+        invalidate_months(session, keys)
@@ -0,0 +1,192 @@
+"""
+Downscaled image renditions of attachments.
+
+Named sizes (RENDITION_SIZES) are generated lazily from the original upload
+and cached beside it under ``renditions/`` as ``{stem}.{size}.{ext}``; a
+rendition older than its original is regenerated. Generated renditions are
+recorded in ``Attachment.renditions_json``. The upload-time thumbnail
+(``thumb_path``) doubles as the "thumb" rendition.
+
+When Pillow is unavailable or the original cannot be decoded, callers get the
+original path back, so renditions are always an optimisation, never a
+requirement.
+"""
+
+import json
+import os
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .models import Attachment
+
+# Longest edge of images embedded in PDF reports (~A4 width at 200 dpi)
+REPORT_IMAGE_MAX_PX = int(os.environ.get("REPORT_IMAGE_MAX_PX", "1600"))
+
+# size name -> longest edge in pixels
+RENDITION_SIZES: Dict[str, int] = {
+    "thumb": int(os.environ.get("ATTACH_THUMB_SIZE", "256")),
+    "preview": 1024,
+    "print": REPORT_IMAGE_MAX_PX,
+}
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".webp"}
+
+_MIME_BY_EXT = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+}
+
+
+def guess_image_mime(path: str) -> str:
+    return _MIME_BY_EXT.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+
+def is_image_path(path: Optional[str]) -> bool:
+    return bool(path) and os.path.splitext(path)[1].lower() in IMAGE_EXTS
+
+
+def _is_fresh(path: str, src_path: str) -> bool:
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(src_path)
+    except OSError:
+        return False
+
+
+def _webp_supported() -> bool:
+    try:
+        from PIL import features
+        return bool(features.check("webp"))
+    except Exception:
+        return False
+
+
+def _target_ext(size: str, has_alpha: bool) -> str:
+    # Previews are for browsers: WebP handles both photos and alpha compactly.
+    # Print renditions go into PDFs, where WeasyPrint embeds JPEG as-is.
+    if size == "preview" and _webp_supported():
+        return ".webp"
+    return ".png" if has_alpha else ".jpg"
+
+
+def _rendition_dir(src_path: str) -> str:
+    return os.path.join(os.path.dirname(src_path), "renditions")
+
+
+def _rendition_stem(src_path: str, size: str) -> str:
+    return os.path.join(_rendition_dir(src_path), f"{os.path.splitext(os.path.basename(src_path))[0]}.{size}")
+
+
+def rendition_file(src_path: str, size: str) -> Tuple[str, str]:
+    """
+    Return (path, mime type) of the ``size`` rendition of an image file,
+    generating it if missing or stale.
+
+    Originals that already fit the size in a suitable format are returned
+    as-is rather than copied.
+    """
+    if size not in RENDITION_SIZES:
+        raise ValueError(f"Unknown rendition size: {size}")
+    max_px = RENDITION_SIZES[size]
+    stem = _rendition_stem(src_path, size)
+    for ext in (".jpg", ".png", ".webp"):
+        if _is_fresh(stem + ext, src_path):
+            return stem + ext, _MIME_BY_EXT[ext]
+
+    try:
+        from PIL import Image
+    except Exception:
+        return src_path, guess_image_mime(src_path)
+
+    try:
+        with Image.open(src_path) as im:
+            keep = {"JPEG", "WEBP"} if size == "preview" else {"JPEG"}
+            if im.format in keep and max(im.size) <= max_px:
+                return src_path, guess_image_mime(src_path)
+            im.draft("RGB", (max_px, max_px))  # cheap JPEG pre-scale
+            im.thumbnail((max_px, max_px))
+            has_alpha = "A" in im.getbands()
+            ext = _target_ext(size, has_alpha)
+            os.makedirs(_rendition_dir(src_path), exist_ok=True)
+            path = stem + ext
+            tmp = path + ".part"
+            if ext == ".webp":
+                im.save(tmp, format="WEBP", quality=80, method=4)
+            elif ext == ".png":
+                im.save(tmp, format="PNG", optimize=True)
+            else:
+                im.convert("RGB").save(tmp, format="JPEG", quality=85, optimize=True)
+            os.replace(tmp, path)
+            return path, _MIME_BY_EXT[ext]
+    except Exception as e:
+        print(f"[WARN] Failed to build {size} rendition for {src_path}: {e}")
+        return src_path, guess_image_mime(src_path)
+
+
+def print_rendition(src_path: str) -> Tuple[str, str]:
+    """Print-resolution rendition used for images embedded in PDF reports."""
+    return rendition_file(src_path, "print")
+
+
+def _tracked(att: Attachment) -> Dict[str, dict]:
+    try:
+        return json.loads(att.renditions_json or "{}")
+    except ValueError:
+        return {}
+
+
+def ensure_rendition(db: Session, att: Attachment, size: str) -> Optional[Tuple[str, str]]:
+    """
+    Return (path, mime type) of an attachment's ``size`` rendition, generating
+    and recording it on first use. None if the attachment is not an image or
+    its original is missing.
+    """
+    if size not in RENDITION_SIZES:
+        raise ValueError(f"Unknown rendition size: {size}")
+    if size == "thumb" and att.thumb_path and os.path.exists(att.thumb_path):
+        return att.thumb_path, guess_image_mime(att.thumb_path)
+    src = att.storage_path
+    if not is_image_path(src) or not os.path.exists(src):
+        return None
+
+    tracked = _tracked(att)
+    entry = tracked.get(size)
+    if entry and _is_fresh(entry["path"], src):
+        return entry["path"], entry["mime"]
+
+    path, mime = rendition_file(src, size)
+    if path != src:
+        tracked[size] = {"path": path, "mime": mime}
+        value = json.dumps(tracked, sort_keys=True)
+        # Bookkeeping only: a plain UPDATE skips the flush listener, so
+        # generating a rendition does not bump the owner's data_version
+        db.execute(
+            update(Attachment).where(Attachment.id == att.id).values(renditions_json=value),
+            execution_options={"synchronize_session": False},
+        )
+        db.commit()
+        set_committed_value(att, "renditions_json", value)
+    return path, mime
+
+
+def rendition_paths(att: Attachment) -> Set[str]:
+    """Every rendition file an attachment may have (tracked or not), excluding the original."""
+    paths = {e.get("path") for e in _tracked(att).values()}
+    if att.storage_path:
+        for size in RENDITION_SIZES:
+            stem = _rendition_stem(att.storage_path, size)
+            paths.update(stem + ext for ext in (".jpg", ".png", ".webp"))
+    return {p for p in paths if p and p != att.storage_path}
+
+
+def remove_renditions(att: Attachment) -> None:
+    """Delete an attachment's cached rendition files (tracked or not)."""
+    for p in rendition_paths(att):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
@@ -0,0 +1,226 @@
+"""
+Content-addressed cache of rendered reports.
+
+The key hashes everything a report's bytes depend on: type, period,
+account selection and separation mode, the saved view's filter JSON, theme,
+screenshot flag and the user's ``data_version`` (see data_version.py). Any
+write to the user's data bumps the version, so stale entries simply stop
+matching; they are pruned from the user's directory on their next store.
+Entries are evicted least-recently-used once the cache exceeds
+REPORT_CACHE_MAX_MB (0 disables caching). Stores keep a running total of
+the cache size, so the full scan of every user's cache runs only when that
+total passes the quota or is older than a few minutes.
+
+Entries live next to the report history:
+``REPORTS_BASE_DIR/{user}/reports/.cache/{data_version}-{sha256}.{pdf|zip}``
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .models import SavedView, User
+from .schemas import ReportGenerateRequest
+
+REPORT_CACHE_MAX_MB = float(os.environ.get("REPORT_CACHE_MAX_MB", "500"))
+
+# Bump when templates or rendering change so old entries stop matching
+CACHE_FORMAT = 3
+
+_EXT_TYPES = {".pdf": "application/pdf", ".zip": "application/zip"}
+
+# Cache size per REPORTS_BASE_DIR as this process last knew it: (bytes,
+# monotonic time of the scan). Stores adjust it; other processes' stores
+# are picked up by the rescan once it is older than _RESCAN_SECONDS.
+_RESCAN_SECONDS = 300
+_known_size: Dict[str, Tuple[int, float]] = {}
+_known_size_lock = threading.Lock()
+
+
+def _reports_base() -> str:
+    from .report_jobs import REPORTS_BASE_DIR
+    return REPORTS_BASE_DIR
+
+
+def cache_enabled() -> bool:
+    return REPORT_CACHE_MAX_MB > 0
+
+
+def cache_dir(user_id: int) -> str:
+    return os.path.join(_reports_base(), str(user_id), "reports", ".cache")
+
+
+def report_cache_key(db: Session, user_id: int, body: ReportGenerateRequest) -> Tuple[str, int]:
+    """
+    Returns:
+        (sha256 hex key, data_version the key was computed against)
+    """
+    version = db.query(User.data_version).filter(User.id == user_id).scalar() or 0
+    view_hash = None
+    if body.view_id:
+        filters_json = (
+            db.query(SavedView.filters_json)
+            .filter(SavedView.id == body.view_id, SavedView.user_id == user_id)
+            .scalar()
+        )
+        view_hash = hashlib.sha256((filters_json or "").encode("utf-8")).hexdigest()
+    parts = {
+        "format": CACHE_FORMAT,
+        "type": body.type,
+        "period": body.period.model_dump(exclude_none=True),
+        "account_ids": sorted(body.account_ids) if body.account_ids else None,
+        "separation": body.account_separation_mode,
+        "view": view_hash,
+        "theme": body.theme,
+        "screenshots": bool(body.include_screenshots),
+        "data_version": version,
+    }
+    if body.type in ("ytd", "alltime"):
+        # Period is relative to today
+        parts["today"] = date.today().isoformat()
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+    return digest, version
+
+
+def _entry_path(user_id: int, key: str, version: int, content_type: str) -> str:
+    ext = ".zip" if content_type == "application/zip" else ".pdf"
+    return os.path.join(cache_dir(user_id), f"{version}-{key}{ext}")
+
+
+def is_cached(user_id: int, key: str, version: int) -> bool:
+    if not cache_enabled():
+        return False
+    return any(os.path.exists(_entry_path(user_id, key, version, ct)) for ct in _EXT_TYPES.values())
+
+
+def get_cached(user_id: int, key: str, version: int) -> Optional[Tuple[bytes, str]]:
+    """Return (content, content_type) for a cache hit, refreshing its LRU timestamp."""
+    if not cache_enabled():
+        return None
+    for content_type in _EXT_TYPES.values():
+        path = _entry_path(user_id, key, version, content_type)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            continue
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return content, content_type
+    return None
+
+
+def put_cached(user_id: int, key: str, version: int, content: bytes, content_type: str) -> None:
+    """Store a rendered report, drop the user's stale-version entries and enforce the quota."""
+    if not cache_enabled():
+        return
+    path = _entry_path(user_id, key, version, content_type)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    replaced = _file_size(path)
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+    _after_store(user_id, version, len(content) - replaced)
+
+
+def put_cached_file(user_id: int, key: str, version: int, src_path: str, content_type: str) -> None:
+    """Like put_cached, but copies an already-written report file instead of holding it in memory."""
+    if not cache_enabled():
+        return
+    path = _entry_path(user_id, key, version, content_type)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    replaced = _file_size(path)
+    tmp = path + ".part"
+    shutil.copyfile(src_path, tmp)
+    os.replace(tmp, path)
+    _after_store(user_id, version, _file_size(path) - replaced)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _prune(user_id: int, version: int) -> int:
+    """Drop the user's entries for older data versions; returns bytes freed."""
+    d = cache_dir(user_id)
+    freed = 0
+    for name in os.listdir(d):
+        prefix = name.split("-", 1)[0]
+        if prefix.isdigit() and int(prefix) < version:
+            path = os.path.join(d, name)
+            size = _file_size(path)
+            try:
+                os.remove(path)
+                freed += size
+            except OSError:
+                pass
+    return freed
+
+
+def _after_store(user_id: int, version: int, added: int) -> None:
+    """Prune the writing user's stale entries; scan all users only when over quota or the total is stale."""
+    delta = added - _prune(user_id, version)
+    base = _reports_base()
+    with _known_size_lock:
+        known = _known_size.get(base)
+        if known is None or time.monotonic() - known[1] > _RESCAN_SECONDS:
+            rescan = True
+        else:
+            total = known[0] + delta
+            _known_size[base] = (total, known[1])
+            rescan = total > int(REPORT_CACHE_MAX_MB * 1024 * 1024)
+    if rescan:
+        evict_to_quota()
+
+
+def evict_to_quota(max_bytes: Optional[int] = None) -> int:
+    """
+    Delete least-recently-used entries across all users until under quota;
+    returns bytes freed. Scans every user's cache directory and resets the
+    running size total.
+    """
+    if max_bytes is None:
+        max_bytes = int(REPORT_CACHE_MAX_MB * 1024 * 1024)
+    base = _reports_base()
+    entries = []
+    try:
+        user_dirs = os.listdir(base)
+    except OSError:
+        return 0
+    for u in user_dirs:
+        d = os.path.join(base, u, "reports", ".cache")
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if e.is_file() and os.path.splitext(e.name)[1] in _EXT_TYPES:
+                        st = e.stat()
+                        entries.append((st.st_mtime, st.st_size, e.path))
+        except OSError:
+            continue
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            freed += size
+        except OSError:
+            pass
+    with _known_size_lock:
+        _known_size[base] = (total, time.monotonic())
+    return freed
@@ -0,0 +1,116 @@
+"""
+Process-wide report rendering engine.
+
+Holds what every report render shares and nothing request-specific: the
+Jinja environment with all report templates compiled up front, and the
+report stylesheet parsed by WeasyPrint once per process. Only the
+FontConfiguration is per rendering thread. Per-request state (DB session,
+user, attachment map) stays on ReportGenerator.
+
+The engine is built lazily on first use, or eagerly by ``warm_report_engine``
+at API startup and in report worker processes. WeasyPrint is imported only
+when a PDF is actually rendered, so the API still starts where its native
+libraries are missing.
+"""
+
+import os
+import threading
+from typing import Callable, Optional
+
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+# Use dynamic path that works in Docker (/app) and CI/local (repo root)
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "reports")
+STYLESHEET = "report.css"
+
+REPORT_ENGINE_WARMUP = os.environ.get("REPORT_ENGINE_WARMUP", "1") not in ("0", "false", "False")
+
+
+class ReportEngine:
+    """Compiled templates plus cached WeasyPrint stylesheet and font configuration."""
+
+    def __init__(self, templates_dir: str = TEMPLATES_DIR):
+        self.templates_dir = templates_dir
+        # auto_reload=False: compiled templates are never re-stat'ed or re-read
+        self.jinja_env = Environment(
+            loader=FileSystemLoader(templates_dir),
+            autoescape=select_autoescape(['html', 'xml']),
+            auto_reload=False,
+            cache_size=-1,
+        )
+        self._templates = {
+            name: self.jinja_env.get_template(name)
+            for name in self.jinja_env.list_templates(extensions=["html"])
+        }
+        # The parsed stylesheet is only read while rendering, so every thread
+        # shares it. FontConfiguration wraps fontconfig/Pango state that is not
+        # safe to share, so each rendering thread creates its own.
+        self._stylesheets = None
+        self._stylesheets_lock = threading.Lock()
+        self._local = threading.local()
+
+    def get_template(self, name: str) -> Template:
+        tpl = self._templates.get(name)
+        return tpl if tpl is not None else self.jinja_env.get_template(name)
+
+    def render(self, name: str, context: dict) -> str:
+        return self.get_template(name).render(context)
+
+    def _pdf_stylesheets(self) -> list:
+        if self._stylesheets is None:
+            with self._stylesheets_lock:
+                if self._stylesheets is None:
+                    from weasyprint import CSS
+
+                    # report.css declares no @font-face, so parsing it needs no FontConfiguration
+                    self._stylesheets = [CSS(filename=os.path.join(self.templates_dir, STYLESHEET))]
+        return self._stylesheets
+
+    def _font_config(self):
+        font_config = getattr(self._local, "font_config", None)
+        if font_config is None:
+            from weasyprint.text.fonts import FontConfiguration
+
+            font_config = self._local.font_config = FontConfiguration()
+        return font_config
+
+    def write_pdf(self, html_content: str, url_fetcher: Optional[Callable] = None) -> bytes:
+        """Render HTML to PDF with the shared stylesheet; nothing but the document is parsed."""
+        from weasyprint import HTML
+
+        kwargs = {"url_fetcher": url_fetcher} if url_fetcher else {}
+        return HTML(string=html_content, **kwargs).write_pdf(stylesheets=self._pdf_stylesheets(), font_config=self._font_config())
+
+    def warm(self) -> None:
+        """
+        Parse the shared stylesheet and lay out a one-line document to prime
+        the process's font and layout caches. Any thread can do this for the
+        others; each later render only adds its own FontConfiguration.
+        """
+        self.write_pdf('<html class="theme-light"><body><p>warm-up</p></body></html>')
+
+
+_engine: Optional[ReportEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_report_engine() -> ReportEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ReportEngine()
+    return _engine
+
+
+def warm_report_engine() -> None:
+    """
+    Build and warm the engine; never raises (startup must not fail because
+    WeasyPrint's native libraries are unavailable).
+    """
+    if not REPORT_ENGINE_WARMUP:
+        return
+    try:
+        get_report_engine().warm()
+    except Exception as e:
+        print(f"[WARN] Report engine warm-up skipped: {type(e).__name__}: {e}")
@@ -0,0 +1,597 @@
+"""
+Report rendering shared by the synchronous endpoint and the job queue.
+
+Queued jobs are rows in ``report_jobs``; rendering runs in a local process
+pool (REPORT_WORKERS, default 2) so WeasyPrint never pins an API worker.
+REPORT_WORKERS=0 renders in-process after the response is sent (dev/tests).
+Finished files land in the same REPORTS_BASE_DIR/{user}/reports history as
+synchronous renders, and every saved file is indexed in ``report_artifacts``
+so history listing, download and delete never scan the directory.
+
+A running job records the API process it was claimed for (``worker_id``,
+host:pid) and a ``heartbeat_at`` the worker refreshes while it renders, so a
+restarting API process only fails jobs whose worker is actually gone and
+leaves those of live sibling processes alone.
+"""
+
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .db import engine
+from .models import ReportArtifact, ReportJob
+from .report_cache import cache_enabled, get_cached, is_cached, put_cached, put_cached_file, report_cache_key
+from .report_engine import warm_report_engine
+from .schemas import ReportGenerateRequest
+from .storage_usage import UsageDelta
+
+REPORTS_BASE_DIR = os.environ.get("REPORTS_BASE_DIR", "/data/exports")
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", "2"))
+REPORT_JOB_HEARTBEAT_SECONDS = float(os.environ.get("REPORT_JOB_HEARTBEAT_SECONDS", "15"))
+# A running job whose heartbeat is older than this is presumed orphaned
+REPORT_JOB_LEASE_SECONDS = float(os.environ.get("REPORT_JOB_LEASE_SECONDS", "120"))
+
+# This API process; pool workers claim jobs on its behalf
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+# Extensions kept in (and served from) the history directory
+REPORT_EXTENSIONS = {".pdf": "application/pdf", ".zip": "application/zip"}
+
+ProgressFn = Callable[[int, str], None]
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def user_reports_dir(user_id: int) -> str:
+    return os.path.join(REPORTS_BASE_DIR, str(user_id), "reports")
+
+
+def validate_report_request(body: ReportGenerateRequest) -> None:
+    """Reject requests missing the period fields their type needs (400)."""
+    p = body.period
+    if body.type == "trade" and not p.trade_id:
+        raise HTTPException(status_code=400, detail="trade_id required for trade report")
+    if body.type == "daily" and not p.date:
+        raise HTTPException(status_code=400, detail="date required for daily report")
+    if body.type == "weekly" and (not p.year or not p.week):
+        raise HTTPException(status_code=400, detail="year and week required for weekly report")
+    if body.type == "monthly" and (not p.year or not p.month):
+        raise HTTPException(status_code=400, detail="year and month required for monthly report")
+    if body.type == "yearly" and not p.year:
+        raise HTTPException(status_code=400, detail="year required for yearly report")
+
+
+class RenderedReport(NamedTuple):
+    content: bytes
+    content_type: str
+    filename: str
+    cache_hit: bool = False
+
+
+def _report_basename(body: ReportGenerateRequest) -> str:
+    """History filename without extension (extension depends on PDF vs ZIP output)."""
+    p = body.period
+    if body.type == "trade":
+        return f"trade_report_{p.trade_id}"
+    if body.type == "daily":
+        return f"daily_report_{p.date}"
+    if body.type == "weekly":
+        return f"weekly_report_{p.year}_W{p.week}"
+    if body.type == "monthly":
+        return f"monthly_report_{p.year}_{p.month:02d}"
+    if body.type == "yearly":
+        return f"yearly_report_{p.year}"
+    if body.type == "ytd":
+        return f"ytd_report_{datetime.utcnow().year}"
+    if body.type == "alltime":
+        return f"alltime_report_{datetime.utcnow().strftime('%Y%m%d')}"
+    raise HTTPException(status_code=400, detail=f"Unsupported report type: {body.type}")
+
+
+def render_report(
+    db: Session,
+    user_id: int,
+    body: ReportGenerateRequest,
+    progress: Optional[ProgressFn] = None,
+    use_cache: bool = True,
+) -> RenderedReport:
+    """
+    Render a report, serving an identical earlier render from the report
+    cache when the user's data has not changed since.
+
+    Content is a ZIP for the "separate" account mode and a PDF otherwise.
+    """
+    validate_report_request(body)
+    basename = _report_basename(body)
+
+    cache_key = None
+    if use_cache and cache_enabled():
+        cache_key = report_cache_key(db, user_id, body)
+        hit = get_cached(user_id, *cache_key)
+        if hit is not None:
+            content, content_type = hit
+            if progress:
+                progress(90, "cached")
+            return RenderedReport(content, content_type, basename + _ext(content_type), True)
+
+    from .reports import ReportGenerator
+
+    if progress:
+        progress(10, "rendering")
+    generator = ReportGenerator(db, user_id)
+
+    if body.type == "trade":
+        content_bytes, content_type = generator.generate_trade_report(
+            body.period.trade_id,
+            body.theme,
+            body.include_screenshots
+        )
+
+    elif body.type == "daily":
+        report_date = datetime.strptime(body.period.date, "%Y-%m-%d").date()
+        content_bytes, content_type = generator.generate_daily_report(
+            report_date,
+            body.account_ids,
+            body.account_separation_mode,
+            body.view_id,
+            body.theme,
+            body.include_screenshots
+        )
+
+    elif body.type == "weekly":
+        content_bytes, content_type = generator.generate_weekly_report(
+            body.period.year,
+            body.period.week,
+            body.account_ids,
+            body.account_separation_mode,
+            body.view_id,
+            body.theme,
+            body.include_screenshots
+        )
+
+    elif body.type == "monthly":
+        content_bytes, content_type = generator.generate_monthly_report(
+            body.period.year,
+            body.period.month,
+            body.account_ids,
+            body.account_separation_mode,
+            body.view_id,
+            body.theme,
+            body.include_screenshots
+        )
+
+    elif body.type == "yearly":
+        content_bytes, content_type = generator.generate_yearly_report(
+            body.period.year,
+            body.account_ids,
+            body.account_separation_mode,
+            body.view_id,
+            body.theme
+        )
+
+    elif body.type == "ytd":
+        content_bytes, content_type = generator.generate_ytd_report(
+            body.account_ids,
+            body.account_separation_mode,
+            body.view_id,
+            body.theme
+        )
+
+    else:  # alltime
+        content_bytes, content_type = generator.generate_alltime_report(
+            body.account_ids,
+            body.account_separation_mode,
+            body.view_id,
+            body.theme
+        )
+
+    if progress:
+        progress(90, "saving")
+    if cache_key is not None:
+        try:
+            put_cached(user_id, *cache_key, content_bytes, content_type)
+        except OSError as e:
+            print(f"[WARN] Failed to store report in cache: {e}")
+    # Trade reports are always a single PDF
+    filename = basename + (".pdf" if body.type == "trade" else _ext(content_type))
+    return RenderedReport(content_bytes, content_type, filename)
+
+
+def _ext(content_type: str) -> str:
+    return ".zip" if content_type == "application/zip" else ".pdf"
+
+
+def params_hash(body: ReportGenerateRequest) -> str:
+    """SHA-256 of the canonical request, identifying renders with identical parameters."""
+    canonical = json.dumps(body.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def record_artifact(
+    user_id: int,
+    body: ReportGenerateRequest,
+    filename: str,
+    content_type: str,
+    size_bytes: int,
+    checksum: str,
+) -> int:
+    """
+    Index a saved history file; returns the artifact id. Replaces any row for
+    the same filename, since the file on disk was just overwritten.
+    """
+    period = json.dumps(body.period.model_dump(exclude_none=True), sort_keys=True)
+    with Session(bind=engine) as s:
+        for attempt in range(2):
+            same_file = s.query(ReportArtifact).filter(
+                ReportArtifact.user_id == user_id, ReportArtifact.filename == filename
+            )
+            usage = UsageDelta()
+            for (old_size,) in same_file.with_entities(ReportArtifact.size_bytes):
+                usage.add(user_id, 0, "reports", -1, -old_size)
+            usage.add(user_id, 0, "reports", 1, size_bytes)
+            same_file.delete(synchronize_session=False)
+            usage.apply(s)
+            row = ReportArtifact(
+                user_id=user_id, report_type=body.type, period_json=period,
+                params_hash=params_hash(body), filename=filename, content_type=content_type,
+                size_bytes=size_bytes, checksum=checksum,
+            )
+            s.add(row)
+            try:
+                s.commit()
+                return row.id
+            except IntegrityError:
+                # A concurrent render of the same report inserted first; replace it
+                s.rollback()
+                if attempt:
+                    raise
+
+
+def save_report(user_id: int, body: ReportGenerateRequest, filename: str, content: bytes, content_type: str) -> int:
+    """Write a rendered report into the user's history directory and index it; returns the artifact id."""
+    d = user_reports_dir(user_id)
+    os.makedirs(d, exist_ok=True)
+    path = os.path.join(d, filename)
+    # Write-then-rename so history/download never see a partial file
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return record_artifact(user_id, body, filename, content_type, len(content), hashlib.sha256(content).hexdigest())
+
+
+def artifact_path(artifact: ReportArtifact) -> str:
+    return os.path.join(user_reports_dir(artifact.user_id), artifact.filename)
+
+
+# Users whose pre-index history files have been imported (this process)
+_legacy_indexed: set = set()
+_LEGACY_MARKER = ".indexed"
+
+
+def index_legacy_reports(user_id: int) -> None:
+    """
+    One-off import of history files written before ``report_artifacts``
+    existed. A marker file records that the directory has been imported, so
+    it is scanned at most once per user.
+    """
+    if user_id in _legacy_indexed:
+        return
+    d = user_reports_dir(user_id)
+    marker = os.path.join(d, _LEGACY_MARKER)
+    if not os.path.isdir(d) or os.path.exists(marker):
+        _legacy_indexed.add(user_id)
+        return
+    with Session(bind=engine) as s:
+        known = {r[0] for r in s.query(ReportArtifact.filename).filter(ReportArtifact.user_id == user_id)}
+        usage = UsageDelta()
+        for entry in os.scandir(d):
+            content_type = REPORT_EXTENSIONS.get(os.path.splitext(entry.name)[1])
+            if content_type is None or entry.name in known or not entry.is_file():
+                continue
+            digest = hashlib.sha256()
+            try:
+                with open(entry.path, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(block)
+                st = entry.stat()
+            except OSError as e:
+                print(f"[WARN] Could not index report file {entry.name}: {e}")
+                continue
+            s.add(ReportArtifact(
+                user_id=user_id,
+                report_type=entry.name.split("_report_")[0] if "_report_" in entry.name else "unknown",
+                period_json="{}", params_hash="", filename=entry.name, content_type=content_type,
+                size_bytes=st.st_size, checksum=digest.hexdigest(),
+                created_at=datetime.fromtimestamp(st.st_mtime, timezone.utc),
+            ))
+            usage.add(user_id, 0, "reports", 1, st.st_size)
+        usage.apply(s)
+        try:
+            s.commit()
+        except IntegrityError:
+            s.rollback()  # a concurrent request imported them
+    try:
+        open(marker, "w").close()
+    except OSError:
+        pass
+    _legacy_indexed.add(user_id)
+
+
+class StreamedReport(NamedTuple):
+    chunks: Iterator[bytes]
+    content_type: str
+    filename: str
+
+
+# Separate-mode report types whose per-account ZIP can be streamed
+STREAMABLE_SEPARATE_TYPES = ("daily", "weekly", "monthly")
+
+
+def stream_separate_report(db: Session, user_id: int, body: ReportGenerateRequest) -> Optional[StreamedReport]:
+    """
+    Start a streamed "separate"-mode render: per-account PDFs are rendered in
+    parallel and each is added to the ZIP as soon as it finishes, while the
+    archive is teed into the history file and, once complete, the cache.
+
+    Returns None when the request is not streamable (other modes/types, or
+    a cache hit), in which case the caller falls back to render_report.
+    Account lookup and validation happen here, before any bytes are sent.
+    """
+    if body.account_separation_mode != "separate" or body.type not in STREAMABLE_SEPARATE_TYPES:
+        return None
+    validate_report_request(body)
+
+    cache_key = None
+    if cache_enabled():
+        cache_key = report_cache_key(db, user_id, body)
+        if is_cached(user_id, *cache_key):
+            return None
+
+    from .reports import ReportGenerator, iter_separate_account_zip
+
+    accounts = ReportGenerator(db, user_id).separate_account_targets(body.account_ids)
+    p = body.period
+    params = {
+        "year": p.year,
+        "month": p.month,
+        "week": p.week,
+        "report_date": datetime.strptime(p.date, "%Y-%m-%d").date() if p.date else None,
+        "view_id": body.view_id,
+        "theme": body.theme,
+        "include_screenshots": body.include_screenshots,
+    }
+    filename = _report_basename(body) + ".zip"
+    content_type = "application/zip"
+
+    def chunks() -> Iterator[bytes]:
+        path = os.path.join(user_reports_dir(user_id), filename)
+        tmp = path + ".part"
+        # The file must be closed before it is renamed, so the stack is closed early in the finally
+        with contextlib.ExitStack() as stack:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                f = stack.enter_context(open(tmp, "wb"))
+            except OSError as e:
+                print(f"[ERROR] Failed to save report to disk: {e}")
+                f = None
+            complete = False
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                for chunk in iter_separate_account_zip(user_id, report_type=body.type, accounts=accounts, params=params):
+                    if f is not None:
+                        f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+                complete = True
+            finally:
+                if f is not None:
+                    stack.close()
+                    if complete:
+                        os.replace(tmp, path)
+                        try:
+                            record_artifact(user_id, body, filename, content_type, size, digest.hexdigest())
+                        except Exception as e:
+                            print(f"[ERROR] Failed to index report: {e}")
+                        if cache_key is not None:
+                            try:
+                                put_cached_file(user_id, *cache_key, path, content_type)
+                            except OSError as e:
+                                print(f"[WARN] Failed to store report in cache: {e}")
+                    else:
+                        try:
+                            os.remove(tmp)
+                        except OSError:
+                            pass
+
+    return StreamedReport(chunks(), content_type, filename)
+
+
+# --- Queue ---
+
+def _set_job(job_id: int, **fields) -> None:
+    with Session(bind=engine) as s:
+        s.query(ReportJob).filter(ReportJob.id == job_id).update(fields, synchronize_session=False)
+        s.commit()
+
+
+def _heartbeat(job_id: int, stop: threading.Event) -> None:
+    while not stop.wait(REPORT_JOB_HEARTBEAT_SECONDS):
+        try:
+            _set_job(job_id, heartbeat_at=datetime.now(timezone.utc))
+        except Exception as e:
+            print(f"[WARN] Report job {job_id} heartbeat failed: {type(e).__name__}: {e}")
+
+
+def run_job(job_id: int, worker_id: str = WORKER_ID) -> None:
+    """
+    Render one queued job. Runs in a pool worker process (or inline when
+    REPORT_WORKERS=0); ``worker_id`` is the API process it runs for.
+    """
+    with Session(bind=engine) as db:
+        # Claim atomically so a resubmitted job is never rendered twice
+        now = datetime.now(timezone.utc)
+        claimed = db.query(ReportJob).filter(ReportJob.id == job_id, ReportJob.status == "queued").update(
+            {"status": "running", "progress": 5, "stage": "starting", "started_at": now,
+             "worker_id": worker_id, "heartbeat_at": now},
+            synchronize_session=False,
+        )
+        db.commit()
+        if not claimed:
+            return
+        job = db.get(ReportJob, job_id)
+        user_id = job.user_id
+        body = ReportGenerateRequest.model_validate_json(job.request_json)
+
+        def progress(pct: int, stage: str) -> None:
+            _set_job(job_id, progress=pct, stage=stage, heartbeat_at=datetime.now(timezone.utc))
+
+        stop = threading.Event()
+        threading.Thread(target=_heartbeat, args=(job_id, stop), name=f"report-job-{job_id}", daemon=True).start()
+        try:
+            content, content_type, filename, _ = render_report(db, user_id, body, progress)
+            artifact_id = save_report(user_id, body, filename, content, content_type)
+        except Exception as e:
+            db.rollback()
+            msg = e.detail if isinstance(e, HTTPException) else f"{type(e).__name__}: {e}"
+            print(f"[ERROR] Report job {job_id} failed: {msg}")
+            _set_job(job_id, status="failed", stage="failed", error=str(msg),
+                     finished_at=datetime.now(timezone.utc))
+            return
+        finally:
+            stop.set()
+    _set_job(job_id, status="done", progress=100, stage="done", filename=filename,
+             artifact_id=artifact_id, content_type=content_type, finished_at=datetime.now(timezone.utc))
+
+
+def _init_worker() -> None:
+    """Pool initializer: job workers render separate-mode accounts inline, then warm the engine."""
+    from .reports import render_accounts_inline
+
+    render_accounts_inline()
+    warm_report_engine()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: workers open their own DB connections instead of inheriting the parent's pool
+            _executor = ProcessPoolExecutor(
+                max_workers=REPORT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def _on_job_future_done(job_id: int, fut) -> None:
+    exc = fut.exception()
+    if exc is None:
+        return
+    global _executor
+    print(f"[ERROR] Report worker crashed on job {job_id}: {exc}")
+    _set_job(job_id, status="failed", stage="failed", error=f"worker crashed: {exc}",
+             finished_at=datetime.now(timezone.utc))
+    # A broken pool cannot accept new work; rebuild it on next submit
+    with _executor_lock:
+        if _executor is not None and getattr(_executor, "_broken", False):
+            _executor = None
+
+
+def enqueue_job(db: Session, user_id: int, body: ReportGenerateRequest, background_tasks=None) -> ReportJob:
+    """
+    Persist a job and hand it to the worker pool.
+
+    With REPORT_WORKERS=0 the job runs via ``background_tasks`` after the
+    response is sent (or immediately if none is given).
+    """
+    validate_report_request(body)
+    job = ReportJob(user_id=user_id, status="queued", progress=0, stage="queued",
+                    request_json=body.model_dump_json())
+    db.add(job); db.commit(); db.refresh(job)
+    _dispatch(job.id, background_tasks)
+    return job
+
+
+def _dispatch(job_id: int, background_tasks=None) -> None:
+    if REPORT_WORKERS <= 0:
+        if background_tasks is not None:
+            background_tasks.add_task(run_job, job_id)
+        else:
+            run_job(job_id)
+        return
+    fut = _get_executor().submit(run_job, job_id, WORKER_ID)
+    fut.add_done_callback(lambda f: _on_job_future_done(job_id, f))
+
+
+def recover_jobs() -> None:
+    """
+    Re-dispatch jobs orphaned by a restart. Queued jobs are resubmitted (the
+    claim in ``run_job`` keeps a job from rendering twice). A running job is
+    marked failed only when its worker is gone: it was claimed for an earlier
+    process with this host:pid, or its heartbeat is older than
+    REPORT_JOB_LEASE_SECONDS. Jobs rendering for other live API processes
+    are left alone.
+    """
+    expired = datetime.now(timezone.utc) - timedelta(seconds=REPORT_JOB_LEASE_SECONDS)
+    orphaned = or_(
+        ReportJob.worker_id == WORKER_ID,
+        ReportJob.heartbeat_at < expired,
+        # Claimed before heartbeats were recorded
+        ReportJob.heartbeat_at.is_(None) & (func.coalesce(ReportJob.started_at, ReportJob.created_at) < expired),
+    )
+    with Session(bind=engine) as db:
+        db.query(ReportJob).filter(ReportJob.status == "running", orphaned).update(
+            {"status": "failed", "stage": "failed", "error": "interrupted by server restart",
+             "finished_at": datetime.now(timezone.utc)},
+            synchronize_session=False,
+        )
+        db.commit()
+        queued = [r[0] for r in db.query(ReportJob.id).filter(ReportJob.status == "queued").all()]
+    for job_id in queued:
+        _dispatch(job_id)
+
+
+def _job_download_url(job: ReportJob) -> Optional[str]:
+    if job.status != "done":
+        return None
+    if job.artifact_id:
+        return f"/api/reports/history/{job.artifact_id}/download"
+    return f"/api/reports/download/{job.filename}" if job.filename else None
+
+
+def job_to_dict(job: ReportJob) -> dict:
+    req = json.loads(job.request_json or "{}")
+    return {
+        "id": job.id,
+        "status": job.status,
+        "progress": job.progress,
+        "stage": job.stage,
+        "report_type": req.get("type"),
+        "filename": job.filename,
+        "content_type": job.content_type,
+        "artifact_id": job.artifact_id,
+        "download_url": _job_download_url(job),
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
@@ -7,17 +7,29 @@ Supports trade, daily, weekly, monthly, yearly, YTD, and all-time reports.
 Updated: 2025-01-25 - Fixed WeasyPrint PDF generation API call
 """
 
-from typing import List, Optional, Dict, Any, Tuple
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 from datetime import datetime, date, timedelta
 from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 import calendar
+import multiprocessing
+import os
+import threading
+import zipfile
 
-from weasyprint import HTML
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from weasyprint import default_url_fetcher
 
 from .models import Trade, User, DailyJournal, PlaybookResponse, Attachment, SavedView, Account
+from . import charts
+from .monthly_summaries import PeriodSummary, load_month_summaries, month_bounds
+from .renditions import print_rendition
+from .report_engine import get_report_engine, warm_report_engine
+from .zipstream import iter_zip
+
+# Scheme for attachment images in report HTML (see ReportGenerator._url_fetcher)
+ATTACHMENT_URL_SCHEME = "attachment:"
 
 
 class ReportGenerator:
@@ -34,16 +46,12 @@ class ReportGenerator:
         self.db = db
         self.user_id = user_id
 
-        # Set up Jinja2 environment for templates
-        # Use dynamic path that works in Docker (/app) and CI/local (repo root)
-        import os
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        templates_dir = os.path.join(base_dir, "templates", "reports")
+        # Shared, precompiled templates and stylesheet (see report_engine.py)
+        self.engine = get_report_engine()
+        self.jinja_env = self.engine.jinja_env
 
-        self.jinja_env = Environment(
-            loader=FileSystemLoader(templates_dir),
-            autoescape=select_autoescape(['html', 'xml'])
-        )
+        # attachment id -> original file, for images referenced from report HTML
+        self._attachment_files: Dict[int, str] = {}
 
     def generate_trade_report(
         self,
@@ -203,12 +211,11 @@ class ReportGenerator:
             'include_screenshots': include_screenshots,
         }
 
-        template = self.jinja_env.get_template('trade.html')
+        template = self.engine.get_template('trade.html')
         html_content = template.render(context)
 
         # Convert to PDF
-        html = HTML(string=html_content)
-        pdf_bytes = html.write_pdf()
+        pdf_bytes = self._write_pdf(html_content)
 
         return (pdf_bytes, "application/pdf")
 
@@ -281,12 +288,11 @@ class ReportGenerator:
             'account_groups': account_groups,
         }
 
-        template = self.jinja_env.get_template('daily.html')
+        template = self.engine.get_template('daily.html')
         html_content = template.render(context)
 
         # Convert to PDF
-        html = HTML(string=html_content)
-        pdf_bytes = html.write_pdf()
+        pdf_bytes = self._write_pdf(html_content)
 
         return (pdf_bytes, "application/pdf")
 
@@ -338,8 +344,8 @@ class ReportGenerator:
         # Calculate metrics
         metrics = self.calculate_metrics(trades)
 
-        # Generate equity chart
-        equity_chart = self.generate_equity_chart_svg(trades) if trades else None
+        # Generate charts (equity, drawdown, daily P&L)
+        chart_context = self._chart_context(trades)
 
         # Group trades by account if in grouped mode
         account_groups = None
@@ -369,7 +375,7 @@ class ReportGenerator:
             'end_date': week_end.strftime('%Y-%m-%d'),
             'trades': trades,
             'metrics': metrics,
-            'equity_chart': equity_chart,
+            **chart_context,
             'daily_breakdown': daily_breakdown,
             'generated_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC'),
             'theme': theme,
@@ -378,12 +384,11 @@ class ReportGenerator:
             'account_groups': account_groups,
         }
 
-        template = self.jinja_env.get_template('weekly.html')
+        template = self.engine.get_template('weekly.html')
         html_content = template.render(context)
 
         # Convert to PDF
-        html = HTML(string=html_content)
-        pdf_bytes = html.write_pdf()
+        pdf_bytes = self._write_pdf(html_content)
 
         return (pdf_bytes, "application/pdf")
 
@@ -457,8 +462,8 @@ class ReportGenerator:
         # Calculate metrics
         metrics = self.calculate_metrics(trades)
 
-        # Generate equity chart SVG
-        equity_chart_svg = self.generate_equity_chart_svg(trades)
+        # Generate charts (equity, drawdown, daily P&L)
+        chart_context = self._chart_context(trades)
 
         # Generate calendar HTML
         calendar_html = self.generate_calendar_html(year, month, trades)
@@ -493,7 +498,7 @@ class ReportGenerator:
             'month_name': self._get_month_name(month),
             'generated_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC'),
             'metrics': metrics,
-            'equity_chart': equity_chart_svg,
+            **chart_context,
             'calendar_html': calendar_html,
             'trades': trades,
             'theme': theme,
@@ -504,12 +509,11 @@ class ReportGenerator:
         }
 
         # Render HTML from Jinja2 template
-        template = self.jinja_env.get_template('monthly.html')
+        template = self.engine.get_template('monthly.html')
         html_content = template.render(context)
 
         # Convert HTML to PDF using WeasyPrint
-        html = HTML(string=html_content)
-        pdf_bytes = html.write_pdf()
+        pdf_bytes = self._write_pdf(html_content)
 
         return (pdf_bytes, "application/pdf")
 
@@ -534,37 +538,30 @@ class ReportGenerator:
         Returns:
             PDF bytes
         """
-        # Fetch trades for the year
-        year_start = date(year, 1, 1)
-        year_end = date(year, 12, 31)
-        trades = self._fetch_trades_for_period(year_start, year_end, account_ids, view_id)
+        # Compose the year from per-account monthly summaries
+        summaries = self._period_summaries((year, 1), (year, 12), account_ids, view_id)
+        total = PeriodSummary.merged(summaries.values())
 
         # Calculate metrics
-        metrics = self.calculate_metrics(trades)
+        metrics = total.metrics()
 
-        # Generate equity chart
-        equity_chart = self.generate_equity_chart_svg(trades) if trades else None
+        # Generate charts (equity, drawdown, daily P&L) at daily resolution
+        chart_context = self._chart_context_from_daily(total.daily_pnl())
 
-        # Group trades by account if in grouped mode
+        # Per-account metrics if in grouped mode
         account_groups = None
         if account_separation_mode == "grouped":
-            account_groups = self._group_trades_by_account(trades)
+            account_groups = self._summary_account_groups(summaries)
 
-        # Group trades by month
+        # Monthly breakdown
         monthly_breakdown = []
         for month in range(1, 13):
-            month_start = date(year, month, 1)
-            next_month = month_start.replace(day=28) + timedelta(days=4)
-            month_end = next_month - timedelta(days=next_month.day)
-
-            month_trades = [t for t in trades if month_start <= t.open_time_utc.date() <= month_end]
-            month_metrics = self.calculate_metrics(month_trades)
-
+            month_summary = PeriodSummary.merged(s for (_, _, m), s in summaries.items() if m == month)
             monthly_breakdown.append({
-                'name': month_start.strftime('%B'),
-                'trade_count': len(month_trades),
-                'win_rate': month_metrics['win_rate'],
-                'pnl': month_metrics['total_pnl']
+                'name': date(year, month, 1).strftime('%B'),
+                'trade_count': month_summary.trade_count,
+                'win_rate': month_summary.win_rate(),
+                'pnl': month_summary.metrics()['total_pnl']
             })
 
         # Calculate best/worst months
@@ -575,9 +572,8 @@ class ReportGenerator:
         # Render template
         context = {
             'year': year,
-            'trades': trades,
             'metrics': metrics,
-            'equity_chart': equity_chart,
+            **chart_context,
             'monthly_breakdown': monthly_breakdown,
             'generated_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC'),
             'theme': theme,
@@ -585,12 +581,11 @@ class ReportGenerator:
             'account_groups': account_groups,
         }
 
-        template = self.jinja_env.get_template('yearly.html')
+        template = self.engine.get_template('yearly.html')
         html_content = template.render(context)
 
         # Convert to PDF
-        html = HTML(string=html_content)
-        pdf_bytes = html.write_pdf()
+        pdf_bytes = self._write_pdf(html_content)
 
         return (pdf_bytes, "application/pdf")
 
@@ -642,7 +637,6 @@ class ReportGenerator:
         Returns:
             PDF bytes
         """
-        # Fetch ALL trades for user (no date filter, just use a very wide range)
         # Get first and last trade dates
         from sqlalchemy import func as sqlfunc
 
@@ -666,73 +660,60 @@ class ReportGenerator:
             start_date = result.first_trade.date()
             end_date = result.last_trade.date()
 
-        # Fetch all trades
-        trades = self._fetch_trades_for_period(start_date, end_date, account_ids, view_id)
+        # Compose the full range from per-account monthly summaries
+        summaries = self._period_summaries(
+            (start_date.year, start_date.month), (end_date.year, end_date.month), account_ids, view_id
+        )
+        total = PeriodSummary.merged(summaries.values())
 
         # Calculate metrics
-        metrics = self.calculate_metrics(trades)
+        metrics = total.metrics()
 
-        # Generate equity chart
-        equity_chart = self.generate_equity_chart_svg(trades) if trades else None
-
-        # Calculate days traded
-        unique_days = set(t.open_time_utc.date() for t in trades)
-        metrics['days_traded'] = len(unique_days)
-
-        # Calculate winning/losing days
-        daily_pnls = {}
-        for trade in trades:
-            day = trade.open_time_utc.date()
-            daily_pnls[day] = daily_pnls.get(day, 0) + (trade.net_pnl or 0)
+        # Generate charts (equity, drawdown, daily P&L) at daily resolution
+        daily_pnls = total.daily_pnl()
+        chart_context = self._chart_context_from_daily(daily_pnls)
 
+        # Calculate days traded and winning/losing days
+        metrics['days_traded'] = len(daily_pnls)
         metrics['winning_days'] = sum(1 for pnl in daily_pnls.values() if pnl > 0)
         metrics['losing_days'] = sum(1 for pnl in daily_pnls.values() if pnl < 0)
 
         # Top performing symbols
-        from collections import defaultdict
-        symbol_stats = defaultdict(lambda: {'trades': [], 'pnl': 0})
-        for trade in trades:
-            symbol_stats[trade.symbol]['trades'].append(trade)
-            symbol_stats[trade.symbol]['pnl'] += trade.net_pnl or 0
-
         top_symbols = []
-        for symbol, data in sorted(symbol_stats.items(), key=lambda x: x[1]['pnl'], reverse=True)[:10]:
-            symbol_metrics = self.calculate_metrics(data['trades'])
+        for symbol, (trade_count, pnl_count, win_count, pnl) in sorted(
+            total.symbols.items(), key=lambda x: x[1][3], reverse=True
+        )[:10]:
             top_symbols.append({
                 'symbol': symbol,
-                'trade_count': len(data['trades']),
-                'win_rate': symbol_metrics['win_rate'],
-                'pnl': data['pnl']
+                'trade_count': trade_count,
+                'win_rate': round(win_count / pnl_count, 4) if pnl_count else 0.0,
+                'pnl': pnl
             })
 
         # Yearly breakdown
-        yearly_stats = defaultdict(list)
-        for trade in trades:
-            yearly_stats[trade.open_time_utc.year].append(trade)
-
         yearly_breakdown = []
-        for year in sorted(yearly_stats.keys()):
-            year_trades = yearly_stats[year]
-            year_metrics = self.calculate_metrics(year_trades)
+        for year in sorted({y for (_, y, _) in summaries}):
+            year_summary = PeriodSummary.merged(s for (_, y, _), s in summaries.items() if y == year)
+            if not year_summary.trade_count:
+                continue
             yearly_breakdown.append({
                 'year': year,
-                'trade_count': len(year_trades),
-                'win_rate': year_metrics['win_rate'],
-                'pnl': year_metrics['total_pnl']
+                'trade_count': year_summary.trade_count,
+                'win_rate': year_summary.win_rate(),
+                'pnl': year_summary.metrics()['total_pnl']
             })
 
-        # Group trades by account if in grouped mode
+        # Per-account metrics if in grouped mode
         account_groups = None
         if account_separation_mode == "grouped":
-            account_groups = self._group_trades_by_account(trades)
+            account_groups = self._summary_account_groups(summaries)
 
         # Render template
         context = {
             'start_date': start_date.strftime('%Y-%m-%d'),
             'end_date': end_date.strftime('%Y-%m-%d'),
-            'trades': trades,
             'metrics': metrics,
-            'equity_chart': equity_chart,
+            **chart_context,
             'top_symbols': top_symbols,
             'yearly_breakdown': yearly_breakdown,
             'generated_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC'),
@@ -741,12 +722,11 @@ class ReportGenerator:
             'account_groups': account_groups,
         }
 
-        template = self.jinja_env.get_template('alltime.html')
+        template = self.engine.get_template('alltime.html')
         html_content = template.render(context)
 
         # Convert to PDF
-        html = HTML(string=html_content)
-        pdf_bytes = html.write_pdf()
+        pdf_bytes = self._write_pdf(html_content)
 
         return (pdf_bytes, "application/pdf")
 
@@ -779,69 +759,23 @@ class ReportGenerator:
         Returns:
             Tuple of (zip_bytes, "application/zip")
         """
-        import io
-        import zipfile
+        accounts = self.separate_account_targets(account_ids)
+        params = {
+            "year": year, "month": month, "week": week, "report_date": report_date,
+            "view_id": view_id, "theme": theme, "include_screenshots": include_screenshots,
+        }
+        return (b"".join(iter_separate_account_zip(self.user_id, report_type, accounts, params)), "application/zip")
 
-        # Get all accounts for the user (filter by account_ids if provided)
-        query = self.db.query(Account).filter(Account.user_id == self.user_id)
+    def separate_account_targets(self, account_ids: Optional[List[int]] = None) -> List[Tuple[int, str]]:
+        """(id, name) of the accounts a "separate" report covers; raises ValueError if none."""
+        query = self.db.query(Account.id, Account.name).filter(Account.user_id == self.user_id)
         if account_ids:
             query = query.filter(Account.id.in_(account_ids))
-        accounts = query.all()
+        accounts = [(r[0], r[1]) for r in query.order_by(Account.id).all()]
 
         if not accounts:
             raise ValueError("No accounts found for the specified filters")
-
-        # Create ZIP file in memory
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for account in accounts:
-                # Generate report for this specific account
-                if report_type == "monthly":
-                    pdf_bytes, _ = self.generate_monthly_report(
-                        year=year,
-                        month=month,
-                        account_ids=[account.id],
-                        account_separation_mode="combined",  # Use combined mode for individual account
-                        view_id=view_id,
-                        theme=theme,
-                        include_screenshots=include_screenshots
-                    )
-                    filename = f"{account.name}_{year}_{month:02d}_monthly.pdf"
-
-                elif report_type == "weekly":
-                    pdf_bytes, _ = self.generate_weekly_report(
-                        year=year,
-                        week=week,
-                        account_ids=[account.id],
-                        account_separation_mode="combined",
-                        view_id=view_id,
-                        theme=theme,
-                        include_screenshots=include_screenshots
-                    )
-                    filename = f"{account.name}_{year}_W{week:02d}_weekly.pdf"
-
-                elif report_type == "daily":
-                    pdf_bytes, _ = self.generate_daily_report(
-                        report_date=report_date,
-                        account_ids=[account.id],
-                        account_separation_mode="combined",
-                        view_id=view_id,
-                        theme=theme,
-                        include_screenshots=include_screenshots
-                    )
-                    filename = f"{account.name}_{report_date.strftime('%Y-%m-%d')}_daily.pdf"
-
-                else:
-                    raise ValueError(f"Unsupported report type for separate mode: {report_type}")
-
-                # Sanitize filename (remove invalid characters)
-                filename = "".join(c for c in filename if c.isalnum() or c in (' ', '.', '_', '-')).rstrip()
-
-                # Add PDF to ZIP
-                zip_file.writestr(filename, pdf_bytes)
-
-        zip_buffer.seek(0)
-        return (zip_buffer.getvalue(), "application/zip")
+        return accounts
 
     # ========== Helper Methods ==========
 
@@ -1010,72 +944,98 @@ class ReportGenerator:
             "avg_pnl_per_trade": round(total_pnl / total_trades, 2) if total_trades > 0 else 0.0,
         }
 
+    def _equity_series(self, trades: List[Trade]) -> List[Tuple[datetime, float]]:
+        """Cumulative P&L after each trade, in the order given (by open_time_utc)."""
+        series = []
+        cumulative_pnl = 0.0
+        for trade in trades:
+            if trade.net_pnl is not None and trade.open_time_utc:
+                cumulative_pnl += float(trade.net_pnl)
+                series.append((trade.open_time_utc, cumulative_pnl))
+        return series
+
     def generate_equity_chart_svg(self, trades: List[Trade]) -> str:
         """
-        Generate equity curve as SVG using matplotlib.
+        Generate equity curve as an SVG data URI.
 
         Args:
             trades: List of Trade objects sorted by open_time_utc
 
         Returns:
-            SVG string with data URI for embedding in HTML
+            SVG data URI for embedding in HTML, or "" when there is nothing to plot
         """
-        # Import matplotlib here to avoid import errors during testing
-        try:
-            import matplotlib
-            matplotlib.use('Agg')  # Use non-interactive backend
-            import matplotlib.pyplot as plt
-            import matplotlib.dates as mdates
-            import io
-            import base64
-        except ImportError:
-            # Return empty string if matplotlib not available
-            return ""
+        return charts.svg_data_uri(charts.equity_curve_svg(self._equity_series(trades)))
+
+    def generate_drawdown_chart_svg(self, trades: List[Trade]) -> str:
+        """Underwater (drawdown from running peak) chart as an SVG data URI."""
+        return charts.svg_data_uri(charts.drawdown_svg(self._equity_series(trades)))
 
+    def generate_daily_pnl_chart_svg(self, trades: List[Trade]) -> str:
+        """Daily P&L bar chart as an SVG data URI."""
+        daily: Dict[date, float] = {}
+        for trade in trades:
+            if trade.net_pnl is not None and trade.open_time_utc:
+                day = trade.open_time_utc.date()
+                daily[day] = daily.get(day, 0.0) + float(trade.net_pnl)
+        return charts.svg_data_uri(charts.daily_pnl_bars_svg(list(daily.items())))
+
+    def _chart_context(self, trades: List[Trade]) -> Dict[str, Optional[str]]:
+        """Template variables for the equity, drawdown and daily P&L charts."""
         if not trades:
-            return ""
+            return {'equity_chart': None, 'drawdown_chart': None, 'daily_pnl_chart': None}
+        return {
+            'equity_chart': self.generate_equity_chart_svg(trades),
+            'drawdown_chart': self.generate_drawdown_chart_svg(trades),
+            'daily_pnl_chart': self.generate_daily_pnl_chart_svg(trades),
+        }
 
-        # Build equity curve with dates
-        dates = []
-        equity = []
+    def _chart_context_from_daily(self, daily: Dict[date, float]) -> Dict[str, Optional[str]]:
+        """Chart template variables from per-day P&L (used where trades are not loaded)."""
+        if not daily:
+            return {'equity_chart': None, 'drawdown_chart': None, 'daily_pnl_chart': None}
+        series = []
         cumulative_pnl = 0.0
+        for day in sorted(daily):
+            cumulative_pnl += daily[day]
+            series.append((datetime.combine(day, datetime.min.time()), cumulative_pnl))
+        return {
+            'equity_chart': charts.svg_data_uri(charts.equity_curve_svg(series)),
+            'drawdown_chart': charts.svg_data_uri(charts.drawdown_svg(series)),
+            'daily_pnl_chart': charts.svg_data_uri(charts.daily_pnl_bars_svg(list(daily.items()))),
+        }
 
-        for trade in trades:
-            if trade.net_pnl is not None and trade.open_time_utc:
-                pnl = float(trade.net_pnl) if isinstance(trade.net_pnl, Decimal) else trade.net_pnl
-                cumulative_pnl += pnl
-                dates.append(trade.open_time_utc)
-                equity.append(cumulative_pnl)
-
-        if not dates:
-            return ""
-
-        # Create plot
-        fig, ax = plt.subplots(figsize=(10, 4))
-        ax.plot(dates, equity, color='#2563eb', linewidth=2)
-        ax.fill_between(dates, equity, 0, alpha=0.1, color='#2563eb')
-        ax.set_xlabel('Date')
-        ax.set_ylabel('Equity ($)')
-        ax.set_title('Equity Curve')
-        ax.grid(True, alpha=0.3)
-
-        # Add zero line
-        ax.axhline(y=0, color='#666', linestyle='--', linewidth=1, alpha=0.5)
-
-        # Format x-axis dates
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%m/%d'))
-        fig.autofmt_xdate()
-
-        # Convert to SVG
-        buf = io.BytesIO()
-        fig.savefig(buf, format='svg', bbox_inches='tight')
-        plt.close(fig)
-        buf.seek(0)
-        svg_data = buf.read()
-
-        # Encode as base64 data URI
-        svg_base64 = base64.b64encode(svg_data).decode('utf-8')
-        return f"data:image/svg+xml;base64,{svg_base64}"
+    def _period_summaries(
+        self,
+        first: Tuple[int, int],
+        last: Tuple[int, int],
+        account_ids: Optional[List[int]] = None,
+        view_id: Optional[int] = None,
+    ) -> Dict[Tuple[int, int, int], PeriodSummary]:
+        """
+        Per-(account, year, month) summaries for the months first..last.
+
+        Stored monthly summaries cannot honour a saved view's filters, so with
+        a view the trades are fetched and aggregated directly.
+        """
+        if not view_id:
+            return load_month_summaries(self.db, self.user_id, first, last, account_ids)
+        start, end = month_bounds(first)[0], month_bounds(last)[1]
+        out: Dict[Tuple[int, int, int], PeriodSummary] = {}
+        for trade in self._fetch_trades_for_period(start, end, account_ids, view_id):
+            t = trade.open_time_utc
+            out.setdefault((trade.account_id, t.year, t.month), PeriodSummary()).add_trade(t.date(), trade.symbol, trade.net_pnl)
+        return out
+
+    def _summary_account_groups(self, summaries: Dict[Tuple[int, int, int], PeriodSummary]) -> List[dict]:
+        """Per-account metrics (same shape as _group_trades_by_account, without trade lists)."""
+        names = dict(self.db.query(Account.id, Account.name).filter(Account.user_id == self.user_id).all())
+        per_account: Dict[str, PeriodSummary] = {}
+        for (account_id, _, _), s in summaries.items():
+            per_account.setdefault(names.get(account_id) or "Unknown", PeriodSummary()).merge(s)
+        return [
+            {'account_name': name, 'trade_count': s.trade_count, 'metrics': s.metrics()}
+            for name, s in sorted(per_account.items()) if s.trade_count
+        ]
 
     def generate_calendar_html(self, year: int, month: int, trades: List[Trade]) -> str:
         """
@@ -1217,53 +1177,44 @@ class ReportGenerator:
 
         return account_groups
 
-    def _encode_image_to_data_uri(self, file_path: str, mime_type: str = None) -> str:
-        """
-        Encode image file to base64 data URI for embedding in HTML/PDF.
+    def _write_pdf(self, html_content: str) -> bytes:
+        """Render report HTML to PDF, resolving attachment images via _url_fetcher."""
+        return self.engine.write_pdf(html_content, url_fetcher=self._url_fetcher)
 
-        Args:
-            file_path: Path to image file
-            mime_type: MIME type of the image (optional, will be detected)
-
-        Returns:
-            Data URI string (e.g., "data:image/png;base64,...")
+    def _url_fetcher(self, url: str, *args, **kwargs) -> dict:
         """
-        import os
-        import base64
-        import mimetypes
-
-        # Check if file exists, handle permission errors gracefully (e.g., in CI)
-        try:
-            if not os.path.exists(file_path):
-                return ""
-        except (PermissionError, OSError):
-            return ""
+        WeasyPrint URL fetcher that streams ``attachment:{id}`` images from disk.
 
-        # Detect MIME type if not provided
-        if not mime_type:
-            mime_type, _ = mimetypes.guess_type(file_path)
-            if not mime_type or not mime_type.startswith('image/'):
-                mime_type = 'image/png'  # Default fallback
-
-        try:
-            with open(file_path, 'rb') as f:
-                image_data = f.read()
-
-            encoded = base64.b64encode(image_data).decode('utf-8')
-            return f"data:{mime_type};base64,{encoded}"
-        except Exception as e:
-            print(f"[WARN] Failed to encode image {file_path}: {e}")
-            return ""
+        Images are passed as references instead of base64 data URIs so the
+        HTML stays small; each is read once, at print resolution, while
+        WeasyPrint lays out the page. Only attachments prepared for this
+        report resolve. Other URLs use the default fetcher.
+        """
+        if url.startswith(ATTACHMENT_URL_SCHEME):
+            try:
+                path = self._attachment_files[int(url[len(ATTACHMENT_URL_SCHEME):])]
+            except (KeyError, ValueError):
+                raise ValueError(f"Unknown attachment reference: {url}")
+            rendition_path, mime_type = print_rendition(path)
+            return {
+                "file_obj": open(rendition_path, "rb"),
+                "mime_type": mime_type,
+                "redirected_url": url,
+            }
+        return default_url_fetcher(url, *args, **kwargs)
 
     def _prepare_attachments_for_template(self, attachments: List[Attachment]) -> List[dict]:
         """
-        Prepare attachments for template rendering with embedded images.
+        Prepare attachments for template rendering.
+
+        Images are referenced as ``attachment:{id}`` URLs, resolved by
+        _url_fetcher at PDF render time.
 
         Args:
             attachments: List of Attachment objects
 
         Returns:
-            List of dicts with attachment metadata and embedded image data
+            List of dicts with attachment metadata and image URLs
         """
         prepared = []
         for att in attachments:
@@ -1276,12 +1227,18 @@ class ReportGenerator:
                 'state': att.state or '',
                 'view': att.view or '',
                 'is_image': att.mime_type and att.mime_type.startswith('image/') if att.mime_type else False,
-                'data_uri': ''
+                'image_url': ''
             }
 
-            # Embed image as data URI if it's an image
+            # Reference the image if its file is present
             if att_dict['is_image'] and att.storage_path:
-                att_dict['data_uri'] = self._encode_image_to_data_uri(att.storage_path, att.mime_type)
+                try:
+                    exists = os.path.exists(att.storage_path)
+                except OSError:  # e.g. unreadable /data in CI
+                    exists = False
+                if exists:
+                    self._attachment_files[att.id] = att.storage_path
+                    att_dict['image_url'] = f"{ATTACHMENT_URL_SCHEME}{att.id}"
 
             prepared.append(att_dict)
 
@@ -1298,3 +1255,107 @@ class ReportGenerator:
     def _format_date(self, dt: datetime) -> str:
         """Format datetime as YYYY-MM-DD HH:MM."""
         return dt.strftime("%Y-%m-%d %H:%M")
+
+
+# ========== Separate-mode rendering ==========
+
+# Per-account renders run in their own processes: WeasyPrint layout is
+# CPU-bound and single-threaded.
+REPORT_ACCOUNT_WORKERS = int(os.environ.get("REPORT_ACCOUNT_WORKERS", str(os.cpu_count() or 1)))
+
+_account_pool: Optional[ProcessPoolExecutor] = None
+_account_pool_lock = threading.Lock()
+# Report job workers already run REPORT_WORKERS renders side by side; a
+# per-account pool inside each would start REPORT_WORKERS x cpu_count processes
+_accounts_inline = False
+
+
+def render_accounts_inline() -> None:
+    """Render separate-mode accounts in the calling process from now on (report job workers)."""
+    global _accounts_inline
+    _accounts_inline = True
+
+
+def _get_account_pool() -> ProcessPoolExecutor:
+    global _account_pool
+    with _account_pool_lock:
+        if _account_pool is None or getattr(_account_pool, "_broken", False):
+            _account_pool = ProcessPoolExecutor(
+                max_workers=REPORT_ACCOUNT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_report_engine,
+            )
+        return _account_pool
+
+
+def _separate_filename(report_type: str, account_name: str, params: Dict[str, Any]) -> str:
+    year = params.get("year")
+    if report_type == "monthly":
+        filename = f"{account_name}_{year}_{params['month']:02d}_monthly.pdf"
+    elif report_type == "weekly":
+        filename = f"{account_name}_{year}_W{params['week']:02d}_weekly.pdf"
+    elif report_type == "daily":
+        filename = f"{account_name}_{params['report_date'].strftime('%Y-%m-%d')}_daily.pdf"
+    else:
+        raise ValueError(f"Unsupported report type for separate mode: {report_type}")
+    # Sanitize filename (remove invalid characters)
+    return "".join(c for c in filename if c.isalnum() or c in (' ', '.', '_', '-')).rstrip()
+
+
+def render_account_pdf(user_id: int, report_type: str, account_id: int, params: Dict[str, Any]) -> bytes:
+    """Render one account's combined-mode PDF on a fresh session (runs in a pool worker)."""
+    from .db import engine
+
+    with Session(bind=engine) as db:
+        generator = ReportGenerator(db, user_id)
+        common = {
+            "account_ids": [account_id],
+            "account_separation_mode": "combined",
+            "view_id": params.get("view_id"),
+            "theme": params.get("theme", "light"),
+            "include_screenshots": params.get("include_screenshots", True),
+        }
+        if report_type == "monthly":
+            pdf_bytes, _ = generator.generate_monthly_report(year=params["year"], month=params["month"], **common)
+        elif report_type == "weekly":
+            pdf_bytes, _ = generator.generate_weekly_report(year=params["year"], week=params["week"], **common)
+        elif report_type == "daily":
+            pdf_bytes, _ = generator.generate_daily_report(report_date=params["report_date"], **common)
+        else:
+            raise ValueError(f"Unsupported report type for separate mode: {report_type}")
+        return pdf_bytes
+
+
+def iter_separate_account_zip(
+    user_id: int,
+    report_type: str,
+    accounts: List[Tuple[int, str]],
+    params: Dict[str, Any],
+) -> Iterator[bytes]:
+    """
+    Yield a ZIP of per-account PDFs chunk by chunk, adding each PDF as soon
+    as its render finishes. Uses no request-scoped state, so it can be
+    consumed by a StreamingResponse after the handler has returned.
+    """
+    # Validate names up front so a bad type fails before any work is queued
+    names = {account_id: _separate_filename(report_type, name, params) for account_id, name in accounts}
+
+    def members():
+        if len(accounts) == 1 or REPORT_ACCOUNT_WORKERS <= 1 or _accounts_inline:
+            for account_id, _ in accounts:
+                yield names[account_id], render_account_pdf(user_id, report_type, account_id, params)
+            return
+        pool = _get_account_pool()
+        futures = {
+            pool.submit(render_account_pdf, user_id, report_type, account_id, params): account_id
+            for account_id, _ in accounts
+        }
+        try:
+            for fut in as_completed(futures):
+                yield names[futures[fut]], fut.result()
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+    # PDFs are already compressed; deflating them again costs CPU for ~nothing
+    return iter_zip(members(), compression=zipfile.ZIP_STORED)
@@ -0,0 +1,31 @@
+"""
+Attachment routes that span owners.
+
+Per-trade and per-journal attachment endpoints live on their own routers
+(routes_trades.py, routes_journal.py); this router serves requests that
+cover many of them at once.
+"""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from .db import get_db
+from .deps import get_current_user
+from .models import User
+from .schemas import AttachmentBatchMetaOut, AttachmentBatchMetaRequest
+from . import attachments
+
+router = APIRouter(prefix="/attachments", tags=["attachments"])
+
+
+@router.post("/batch-meta", response_model=AttachmentBatchMetaOut)
+def batch_attachment_meta(
+    body: AttachmentBatchMetaRequest,
+    db: Session = Depends(get_db),
+    current: User = Depends(get_current_user)
+):
+    """
+    Attachment metadata and thumbnail URLs for many trades and/or journal
+    days in one request (one query), e.g. for a trades grid or calendar.
+    """
+    return attachments.batch_meta(db, current.id, body.trade_ids, body.journal_ids, body.include_items)
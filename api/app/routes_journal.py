@@ -1,26 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from sqlalchemy import delete, exists, func, insert, literal, select
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta, timezone
+from zoneinfo import ZoneInfo
 
 from .db import get_db
 from .deps import get_current_user
-from .models import DailyJournal, DailyJournalTradeLink, Trade, Account
-from .schemas import DailyJournalUpsert, DailyJournalOut, AttachmentOut, AttachmentUpdate
-from fastapi import UploadFile, File, Form
-from fastapi.responses import FileResponse
+from .models import DailyJournal, DailyJournalTradeLink, Trade, Account, Instrument, PlaybookResponse
+from .data_version import bump_data_version
+from . import attachments, chunked_uploads, storage_reclaimer
+from .schemas import (
+    DailyJournalUpsert, DailyJournalOut, AttachmentOut, AttachmentUpdate, ChunkedUploadInit, ChunkedUploadOut,
+    JournalRangeDayOut, JournalRangeTradeOut, JournalChecklistGradeOut,
+)
+from .serialization import float_or_none, iso_or_none
+from fastapi import UploadFile, File, Form, Request
+from fastapi.concurrency import run_in_threadpool
+import json
 import os, tempfile
-from datetime import datetime as dt
-from io import BytesIO
 from .models import Attachment
-from fastapi.responses import StreamingResponse
-import zipfile
 
 
 router = APIRouter(prefix="/journal", tags=["journal"])
 
 ATTACH_MAX_MB = float(os.environ.get("ATTACH_MAX_MB", "10"))
-ATTACH_THUMB_SIZE = int(os.environ.get("ATTACH_THUMB_SIZE", "256"))
 
 def _resolve_attach_base() -> str:
     base = os.environ.get("ATTACH_BASE_DIR", "/data/uploads")
@@ -75,6 +79,97 @@ def list_dates(
     return [{"date": d, "attachment_count": int(counts.get(d, 0))} for d in dates]
 
 
+JOURNAL_RANGE_MAX_DAYS = 366
+
+
+@router.get("/range", response_model=List[JournalRangeDayOut])
+def get_journal_range(
+    start: str = Query(..., description="YYYY-MM-DD (inclusive)"),
+    end: str = Query(..., description="YYYY-MM-DD (inclusive)"),
+    account_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    """
+    Journal entries in [start, end] with their linked trades, attachment
+    counts and instrument-checklist grades: four queries however many days
+    the range holds (declared before ``/{d}`` so "range" is not read as a date).
+    """
+    start_d, end_d = _parse_date(start), _parse_date(end)
+    if end_d < start_d:
+        raise HTTPException(400, detail="end must not be before start")
+    if (end_d - start_d).days >= JOURNAL_RANGE_MAX_DAYS:
+        raise HTTPException(400, detail=f"Range is limited to {JOURNAL_RANGE_MAX_DAYS} days")
+
+    q = db.query(DailyJournal).filter(DailyJournal.user_id == current.id, DailyJournal.date >= start_d, DailyJournal.date <= end_d)
+    if account_id:
+        q = q.filter(DailyJournal.account_id == account_id)
+    journals = q.order_by(DailyJournal.date.asc(), DailyJournal.id.asc()).all()
+    if not journals:
+        return []
+    # The other queries select by the same criteria rather than a long IN list
+    in_range = q.with_entities(DailyJournal.id).subquery()
+
+    trades: dict[int, list] = {j.id: [] for j in journals}
+    link_rows = (
+        db.query(
+            DailyJournalTradeLink.journal_id, Trade.id, Account.name, Instrument.symbol,
+            Trade.side, Trade.open_time_utc, Trade.net_pnl,
+        )
+        .join(Trade, Trade.id == DailyJournalTradeLink.trade_id)
+        .join(Account, Account.id == Trade.account_id)
+        .outerjoin(Instrument, Instrument.id == Trade.instrument_id)
+        .filter(DailyJournalTradeLink.journal_id.in_(select(in_range.c.id)), Account.user_id == current.id)
+        .order_by(Trade.open_time_utc.asc(), Trade.id.asc())
+        .all()
+    )
+    for jid, tid, account_name, symbol, side, open_time, net_pnl in link_rows:
+        trades[jid].append(JournalRangeTradeOut(
+            id=tid, account_name=account_name, symbol=symbol, side=side,
+            open_time_utc=iso_or_none(open_time), net_pnl=float_or_none(net_pnl),
+        ))
+
+    counts = dict(
+        db.query(Attachment.journal_id, func.count(Attachment.id))
+        .filter(Attachment.journal_id.in_(select(in_range.c.id)))
+        .group_by(Attachment.journal_id)
+        .all()
+    )
+
+    checklists: dict[int, list] = {j.id: [] for j in journals}
+    resp_rows = (
+        db.query(
+            PlaybookResponse.journal_id, PlaybookResponse.id, PlaybookResponse.template_id, PlaybookResponse.values_json,
+            PlaybookResponse.computed_grade, PlaybookResponse.compliance_score,
+        )
+        .filter(
+            PlaybookResponse.user_id == current.id,
+            PlaybookResponse.entry_type == "instrument_checklist",
+            PlaybookResponse.journal_id.in_(select(in_range.c.id)),
+        )
+        .order_by(PlaybookResponse.created_at.desc())
+        .all()
+    )
+    for jid, rid, template_id, values_json, grade, compliance in resp_rows:
+        try:
+            vals = json.loads(values_json) if values_json else {}
+        except ValueError:
+            vals = {}
+        symbol = (vals.get("symbol") or vals.get("instrument")) if isinstance(vals, dict) else None
+        checklists[jid].append(JournalChecklistGradeOut(
+            id=rid, template_id=template_id, symbol=symbol, computed_grade=grade, compliance_score=compliance,
+        ))
+
+    return [
+        JournalRangeDayOut(
+            id=j.id, date=j.date.strftime("%Y-%m-%d"), title=j.title, notes_md=j.notes_md, reviewed=bool(j.reviewed),
+            account_id=j.account_id, trade_ids=[t.id for t in trades[j.id]], trades=trades[j.id],
+            attachment_count=int(counts.get(j.id, 0)), checklists=checklists[j.id],
+        )
+        for j in journals
+    ]
+
+
 @router.get("/{d}", response_model=DailyJournalOut)
 def get_journal(d: str, db: Session = Depends(get_db), current = Depends(get_current_user), account_id: Optional[int] = None):
     day = _parse_date(d)
@@ -121,83 +216,104 @@ def delete_journal(d: str, db: Session = Depends(get_db), current = Depends(get_
     rows = q.all()
     if not rows:
         raise HTTPException(404, detail="Not found")
-    deleted_ids: list[int] = []
+    deleted_ids = [row.id for row in rows]
+    # Delete attachment rows in one go; files go once no other attachment shares them
+    storage_reclaimer.release_and_log(db, Attachment.journal_id.in_(deleted_ids))
+    db.query(DailyJournalTradeLink).filter(DailyJournalTradeLink.journal_id.in_(deleted_ids)).delete(synchronize_session=False)
     for row in rows:
-        # Delete attachments files if present
-        atts = db.query(Attachment).filter(Attachment.journal_id == row.id).all()
-        for a in atts:
-            try:
-                if a.storage_path and os.path.exists(a.storage_path):
-                    os.remove(a.storage_path)
-                if a.thumb_path and os.path.exists(a.thumb_path):
-                    os.remove(a.thumb_path)
-            except Exception:
-                pass
-        # Cascade delete rows
-        db.query(Attachment).filter(Attachment.journal_id == row.id).delete(synchronize_session=False)
-        db.query(DailyJournalTradeLink).filter(DailyJournalTradeLink.journal_id == row.id).delete(synchronize_session=False)
         db.delete(row)
-        deleted_ids.append(row.id)
     db.commit()
+    storage_reclaimer.wake()
     return {"deleted": len(deleted_ids), "ids": deleted_ids, "date": d}
 
 
+def _local_day_bounds_utc(day: date, tz_name: Optional[str]) -> tuple[datetime, datetime]:
+    """[start, end) of a local calendar day as naive UTC datetimes (as trade times are stored)."""
+    try:
+        tz = ZoneInfo(tz_name or "UTC")
+    except Exception:
+        tz = ZoneInfo("UTC")
+    start = datetime.combine(day, time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)
+    return (start.astimezone(timezone.utc).replace(tzinfo=None), end.astimezone(timezone.utc).replace(tzinfo=None))
+
+
 @router.post("/{journal_id}/trades")
-def set_journal_trades(journal_id: int, trade_ids: List[int] = Body(...), db: Session = Depends(get_db), current = Depends(get_current_user)):
+def set_journal_trades(
+    journal_id: int,
+    trade_ids: Optional[List[int]] = Body(None),
+    auto_link: bool = Query(False, description="Also link every trade closed on the journal's date (user's timezone)"),
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    """
+    Replace the journal's linked trades with ``trade_ids`` (ids not owned by
+    the user are ignored). Only the difference is written: one DELETE for
+    removed links and one bulk INSERT for new ones. With ``auto_link`` the
+    day's closed trades are added by a single INSERT ... SELECT; the body may
+    then be omitted to keep the existing links.
+    """
     j = db.query(DailyJournal).filter(DailyJournal.id == journal_id, DailyJournal.user_id == current.id).first()
     if not j:
         raise HTTPException(404, detail="Journal not found")
-    # Ensure all trades belong to user
-    if trade_ids:
-        valid_ids = [r[0] for r in db.query(Trade.id).join(Account, Account.id == Trade.account_id, isouter=True).\
-            filter(Trade.id.in_(trade_ids), Account.user_id == current.id).all()]
-    else:
-        valid_ids = []
-    # Replace links
-    db.query(DailyJournalTradeLink).filter(DailyJournalTradeLink.journal_id == journal_id).delete(synchronize_session=False)
-    for tid in valid_ids:
-        db.add(DailyJournalTradeLink(journal_id=journal_id, trade_id=tid))
+    if trade_ids is None and not auto_link:
+        raise HTTPException(400, detail="Body must be a list of trade IDs")
+
+    existing = {r[0] for r in db.query(DailyJournalTradeLink.trade_id).filter(DailyJournalTradeLink.journal_id == journal_id)}
+    added = removed = 0
+    if trade_ids is not None:
+        # Ensure all trades belong to user
+        wanted = set()
+        if trade_ids:
+            wanted = {r[0] for r in db.query(Trade.id).join(Account, Account.id == Trade.account_id).
+                      filter(Trade.id.in_(set(trade_ids)), Account.user_id == current.id)}
+        to_remove = existing - wanted
+        to_add = wanted - existing
+        if to_remove:
+            removed = db.execute(
+                delete(DailyJournalTradeLink).where(
+                    DailyJournalTradeLink.journal_id == journal_id, DailyJournalTradeLink.trade_id.in_(to_remove)
+                ),
+                execution_options={"synchronize_session": False},
+            ).rowcount
+        if to_add:
+            db.execute(insert(DailyJournalTradeLink), [{"journal_id": journal_id, "trade_id": t} for t in sorted(to_add)])
+            added = len(to_add)
+        existing = wanted
+
+    if auto_link:
+        lo, hi = _local_day_bounds_utc(j.date, current.tz)
+        day_trades = (
+            select(literal(journal_id), Trade.id)
+            .join(Account, Account.id == Trade.account_id)
+            .where(
+                Account.user_id == current.id,
+                Trade.close_time_utc >= lo,
+                Trade.close_time_utc < hi,
+                ~exists().where(DailyJournalTradeLink.journal_id == journal_id, DailyJournalTradeLink.trade_id == Trade.id),
+            )
+        )
+        if j.account_id:
+            day_trades = day_trades.where(Trade.account_id == j.account_id)
+        added += db.execute(
+            insert(DailyJournalTradeLink).from_select(["journal_id", "trade_id"], day_trades)
+        ).rowcount
+        existing = {r[0] for r in db.query(DailyJournalTradeLink.trade_id).filter(DailyJournalTradeLink.journal_id == journal_id)}
+
+    if added or removed:
+        bump_data_version(db, [current.id])  # set-based writes bypass flush tracking
     db.commit()
-    return {"journal_id": journal_id, "trade_ids": valid_ids}
+    return {"journal_id": journal_id, "trade_ids": sorted(existing), "added": added, "removed": removed}
 
 
 # --- Attachments for Journal ---
-def _ensure_journal_owned(db: Session, current, journal_id: int) -> DailyJournal:
-    j = db.query(DailyJournal).filter(DailyJournal.id == journal_id, DailyJournal.user_id == current.id).first()
-    if not j:
-        raise HTTPException(404, detail="Journal not found")
-    return j
-
-
 @router.get("/{journal_id}/attachments", response_model=list[AttachmentOut])
 def list_journal_attachments(journal_id: int, db: Session = Depends(get_db), current = Depends(get_current_user)):
-    _ensure_journal_owned(db, current, journal_id)
-    rows = (
-        db.query(Attachment)
-        .filter(Attachment.journal_id == journal_id)
-        .order_by(Attachment.sort_order.asc(), Attachment.created_at.asc())
-        .all()
-    )
-    out: list[AttachmentOut] = []
-    for a in rows:
-        out.append(AttachmentOut(
-            id=a.id,
-            filename=a.filename,
-            mime_type=a.mime_type,
-            size_bytes=a.size_bytes,
-            timeframe=a.timeframe,
-            state=a.state,
-            view=a.view,
-            caption=a.caption,
-            reviewed=bool(a.reviewed),
-            thumb_available=bool(a.thumb_path),
-            thumb_url=(f"/journal/{journal_id}/attachments/{a.id}/thumb" if a.thumb_path else None),
-        ))
-    return out
+    return attachments.list_attachments(db, attachments.journal_owner(db, journal_id, current.id))
 
 
 @router.post("/{journal_id}/attachments", response_model=AttachmentOut)
-async def upload_journal_attachment(
+def upload_journal_attachment(
     journal_id: int,
     file: UploadFile = File(...),
     timeframe: str | None = Form(None),
@@ -208,139 +324,48 @@ async def upload_journal_attachment(
     db: Session = Depends(get_db),
     current = Depends(get_current_user),
 ):
-    _ensure_journal_owned(db, current, journal_id)
-    content = await file.read()
-    if len(content) > int(ATTACH_MAX_MB * 1024 * 1024):
-        raise HTTPException(413, detail=f"File exceeds limit of {int(ATTACH_MAX_MB)} MB")
-    name = file.filename or "file"
-    ext = os.path.splitext(name)[1].lower()
-    allowed = {".png", ".jpg", ".jpeg", ".webp", ".pdf"}
-    if ext not in allowed:
-        raise HTTPException(400, detail="Unsupported file type")
-    journal_dir = os.path.join(ATTACH_BASE_DIR, "journal", str(journal_id))
-    os.makedirs(journal_dir, exist_ok=True)
-    basename = f"{int(dt.now().timestamp())}_{name}"
-    path = os.path.join(journal_dir, basename)
-    thumb_path = None
-    try:
-        if ext in {".png", ".jpg", ".jpeg", ".webp"}:
-            try:
-                from PIL import Image
-                im = Image.open(BytesIO(content))
-                if im.mode not in ("RGB", "RGBA"):
-                    im = im.convert("RGB")
-                save_params = {}
-                if ext in {".jpg", ".jpeg"}:
-                    save_params.update({"quality": 92, "optimize": True})
-                im.save(path, **save_params)
-                # thumb
-                try:
-                    im_t = im.copy()
-                    im_t.thumbnail((ATTACH_THUMB_SIZE, ATTACH_THUMB_SIZE))
-                    thumbs_dir = os.path.join(journal_dir, "thumbs")
-                    os.makedirs(thumbs_dir, exist_ok=True)
-                    has_alpha = ("A" in im_t.getbands())
-                    if has_alpha:
-                        tname = os.path.splitext(basename)[0] + ".png"
-                        thumb_path = os.path.join(thumbs_dir, tname)
-                        im_t.save(thumb_path, format="PNG")
-                    else:
-                        tname = os.path.splitext(basename)[0] + ".jpg"
-                        thumb_path = os.path.join(thumbs_dir, tname)
-                        im_t = im_t.convert("RGB")
-                        im_t.save(thumb_path, format="JPEG", quality=85, optimize=True)
-                except Exception:
-                    thumb_path = None
-            except Exception:
-                # fallback: save raw
-                with open(path, "wb") as f:
-                    f.write(content)
-        else:
-            with open(path, "wb") as f:
-                f.write(content)
-    except Exception:
-        try:
-            with open(path, "wb") as f:
-                f.write(content)
-        except Exception:
-            pass
-
-    # choose next sort order for this journal
-    current_max = (
-        db.query(Attachment)
-        .filter(Attachment.journal_id == journal_id)
-        .order_by(Attachment.sort_order.desc())
-        .limit(1)
-        .first()
-    )
-    next_order = (current_max.sort_order if current_max else 0) + 1
-
-    a = Attachment(
-        trade_id=None,  # unused for journal
-        journal_id=journal_id,
-        user_id=None,
-        filename=name,
-        mime_type=file.content_type,
-        size_bytes=len(content),
-        storage_path=path,
-        thumb_path=thumb_path,
-        sort_order=next_order,
-        timeframe=timeframe,
-        state=state,
-        view=view,
-        caption=caption,
-        reviewed=bool(reviewed),
-    )
-    db.add(a); db.commit(); db.refresh(a)
-    return AttachmentOut(
-        id=a.id,
-        filename=a.filename,
-        mime_type=a.mime_type,
-        size_bytes=a.size_bytes,
-        timeframe=a.timeframe,
-        state=a.state,
-        view=a.view,
-        caption=a.caption,
-        reviewed=bool(a.reviewed),
-        thumb_available=bool(a.thumb_path),
-        thumb_url=(f"/journal/{journal_id}/attachments/{a.id}/thumb" if a.thumb_path else None),
+    # Sync handler: the body is streamed to disk on FastAPI's threadpool
+    owner = attachments.journal_owner(db, journal_id, current.id)
+    return attachments.upload(
+        db, owner, file, ATTACH_BASE_DIR, ATTACH_MAX_MB,
+        timeframe=timeframe, state=state, view=view, caption=caption, reviewed=reviewed,
     )
 
 
 @router.get("/{journal_id}/attachments/{att_id}/download")
-def download_journal_attachment(journal_id: int, att_id: int, db: Session = Depends(get_db), current = Depends(get_current_user)):
-    _ensure_journal_owned(db, current, journal_id)
-    a = db.query(Attachment).filter(Attachment.id == att_id, Attachment.journal_id == journal_id).first()
-    if not a:
-        raise HTTPException(404, detail="Attachment not found")
-    return FileResponse(a.storage_path, filename=a.filename, media_type=a.mime_type)
+def download_journal_attachment(journal_id: int, att_id: int, request: Request, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    return attachments.download(request, db, attachments.for_journal(journal_id, current.id), att_id)
 
 
 @router.get("/{journal_id}/attachments/{att_id}/thumb")
-def download_journal_attachment_thumb(journal_id: int, att_id: int, db: Session = Depends(get_db), current = Depends(get_current_user)):
-    _ensure_journal_owned(db, current, journal_id)
-    a = db.query(Attachment).filter(Attachment.id == att_id, Attachment.journal_id == journal_id).first()
-    if not a or not a.thumb_path or not os.path.exists(a.thumb_path):
-        raise HTTPException(404, detail="Thumbnail not available")
-    ext = os.path.splitext(a.thumb_path)[1].lower()
-    media = "image/jpeg" if ext in (".jpg", ".jpeg") else ("image/png" if ext == ".png" else "application/octet-stream")
-    return FileResponse(a.thumb_path, filename=os.path.basename(a.thumb_path), media_type=media)
+def download_journal_attachment_thumb(
+    journal_id: int,
+    att_id: int,
+    request: Request,
+    v: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    return attachments.thumb(request, db, attachments.for_journal(journal_id, current.id), att_id, v)
+
+
+@router.get("/{journal_id}/attachments/{att_id}/rendition/{size}")
+def download_journal_attachment_rendition(
+    journal_id: int,
+    att_id: int,
+    size: str,
+    request: Request,
+    v: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    """Downscaled image (thumb | preview | print), generated on first request and cached."""
+    return attachments.rendition(request, db, attachments.for_journal(journal_id, current.id), att_id, size, v)
 
 
 @router.delete("/{journal_id}/attachments/{att_id}")
 def delete_journal_attachment(journal_id: int, att_id: int, db: Session = Depends(get_db), current = Depends(get_current_user)):
-    _ensure_journal_owned(db, current, journal_id)
-    a = db.query(Attachment).filter(Attachment.id == att_id, Attachment.journal_id == journal_id).first()
-    if not a:
-        raise HTTPException(404, detail="Attachment not found")
-    try:
-        if a.storage_path and os.path.exists(a.storage_path):
-            os.remove(a.storage_path)
-        if a.thumb_path and os.path.exists(a.thumb_path):
-            os.remove(a.thumb_path)
-    except Exception:
-        pass
-    db.delete(a); db.commit()
+    attachments.delete(db, attachments.journal_owner(db, journal_id, current.id), att_id)
     return {"deleted": att_id}
 
 
@@ -352,93 +377,64 @@ def update_journal_attachment(
     db: Session = Depends(get_db),
     current = Depends(get_current_user),
 ):
-    _ensure_journal_owned(db, current, journal_id)
-    a = db.query(Attachment).filter(Attachment.id == att_id, Attachment.journal_id == journal_id).first()
-    if not a:
-        raise HTTPException(404, detail="Attachment not found")
-    if body.timeframe is not None:
-        a.timeframe = body.timeframe
-    if body.state is not None:
-        a.state = body.state
-    if body.view is not None:
-        a.view = body.view
-    if body.caption is not None:
-        a.caption = body.caption
-    if body.reviewed is not None:
-        a.reviewed = bool(body.reviewed)
-    db.commit(); db.refresh(a)
-    return AttachmentOut(
-        id=a.id,
-        filename=a.filename,
-        mime_type=a.mime_type,
-        size_bytes=a.size_bytes,
-        timeframe=a.timeframe,
-        state=a.state,
-        view=a.view,
-        caption=a.caption,
-        reviewed=bool(a.reviewed),
-        thumb_available=bool(a.thumb_path),
-        thumb_url=(f"/journal/{journal_id}/attachments/{a.id}/thumb" if a.thumb_path else None),
-    )
+    return attachments.update_meta(db, attachments.journal_owner(db, journal_id, current.id), att_id, body)
 
 
 @router.post("/{journal_id}/attachments/reorder")
 def reorder_journal_attachments(journal_id: int, ids: List[int], db: Session = Depends(get_db), current = Depends(get_current_user)):
-    _ensure_journal_owned(db, current, journal_id)
-    if not isinstance(ids, list) or not all(isinstance(x, int) for x in ids):
-        raise HTTPException(400, detail="Body must be a list of attachment IDs")
-    rows = db.query(Attachment).filter(Attachment.journal_id == journal_id, Attachment.id.in_(ids)).all()
-    if len(rows) != len(set(ids)):
-        raise HTTPException(400, detail="One or more attachments invalid")
-    for idx, att_id in enumerate(ids):
-        db.query(Attachment).filter(Attachment.id == att_id).update({Attachment.sort_order: idx})
-    db.commit()
-    return {"reordered": len(ids)}
+    return attachments.reorder(db, attachments.journal_owner(db, journal_id, current.id), ids)
 
 
 @router.post("/{journal_id}/attachments/batch-delete")
 def batch_delete_journal_attachments(journal_id: int, ids: List[int], db: Session = Depends(get_db), current = Depends(get_current_user)):
-    _ensure_journal_owned(db, current, journal_id)
-    if not isinstance(ids, list) or not all(isinstance(x, int) for x in ids):
-        raise HTTPException(400, detail="Body must be a list of attachment IDs")
-    rows = db.query(Attachment).filter(Attachment.journal_id == journal_id, Attachment.id.in_(ids)).all()
-    count = 0
-    for a in rows:
-        try:
-            if a.storage_path and os.path.exists(a.storage_path):
-                os.remove(a.storage_path)
-            if a.thumb_path and os.path.exists(a.thumb_path):
-                os.remove(a.thumb_path)
-        except Exception:
-            pass
-        db.delete(a); count += 1
-    db.commit()
-    return {"deleted": count}
+    return {"deleted": attachments.delete_many(db, attachments.journal_owner(db, journal_id, current.id), ids)}
 
 
 @router.post("/{journal_id}/attachments/zip")
 def zip_journal_attachments(journal_id: int, ids: List[int], db: Session = Depends(get_db), current = Depends(get_current_user)):
-    _ensure_journal_owned(db, current, journal_id)
-    if not isinstance(ids, list) or not all(isinstance(x, int) for x in ids):
-        raise HTTPException(400, detail="Body must be a list of attachment IDs")
-    rows = db.query(Attachment).filter(Attachment.journal_id == journal_id, Attachment.id.in_(ids)).all()
-    if not rows:
-        raise HTTPException(404, detail="No attachments found")
-
-    def iter_zip():
-        buf = BytesIO()
-        with zipfile.ZipFile(buf, mode="w", compression=zipfile.ZIP_DEFLATED) as z:
-            for a in rows:
-                try:
-                    arcname = a.filename or f"att-{a.id}"
-                    if a.storage_path and os.path.exists(a.storage_path):
-                        z.write(a.storage_path, arcname=arcname)
-                except Exception:
-                    continue
-        buf.seek(0)
-        data = buf.read()
-        yield data
-
-    filename = f"journal-{journal_id}-attachments.zip"
-    headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return StreamingResponse(iter_zip(), media_type="application/zip", headers=headers)
+    return attachments.zip_response(db, attachments.journal_owner(db, journal_id, current.id), ids)
+
+
+# --- Chunked (resumable) uploads ---
+@router.post("/{journal_id}/attachments/uploads", response_model=ChunkedUploadOut)
+def init_journal_chunked_upload(journal_id: int, body: ChunkedUploadInit, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    owner = attachments.journal_owner(db, journal_id, current.id)
+    meta = body.model_dump(include={"timeframe", "state", "view", "caption", "reviewed"})
+    m = chunked_uploads.init_upload(db, ATTACH_BASE_DIR, owner, body.filename, body.size_bytes, body.content_type, body.sha256, meta)
+    return chunked_uploads.status_out(ATTACH_BASE_DIR, m)
+
+
+@router.get("/{journal_id}/attachments/uploads/{upload_id}", response_model=ChunkedUploadOut)
+def get_journal_chunked_upload(journal_id: int, upload_id: str, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    m = chunked_uploads.load_upload(ATTACH_BASE_DIR, attachments.journal_owner(db, journal_id, current.id), upload_id)
+    return chunked_uploads.status_out(ATTACH_BASE_DIR, m)
+
+
+@router.put("/{journal_id}/attachments/uploads/{upload_id}/chunks/{index}", response_model=ChunkedUploadOut)
+async def put_journal_upload_chunk(
+    journal_id: int,
+    upload_id: str,
+    index: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    """Raw chunk bytes as the request body; optional X-Chunk-Sha256 header."""
+    m = chunked_uploads.load_upload(ATTACH_BASE_DIR, attachments.journal_owner(db, journal_id, current.id), upload_id)
+    data = await chunked_uploads.read_chunk_body(request, m.chunk_length(index))
+    await run_in_threadpool(chunked_uploads.write_chunk, ATTACH_BASE_DIR, m, index, data, request.headers.get("x-chunk-sha256"))
+    return chunked_uploads.status_out(ATTACH_BASE_DIR, m)
+
+
+@router.post("/{journal_id}/attachments/uploads/{upload_id}/finalize", response_model=AttachmentOut)
+def finalize_journal_chunked_upload(journal_id: int, upload_id: str, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    owner = attachments.journal_owner(db, journal_id, current.id)
+    m = chunked_uploads.load_upload(ATTACH_BASE_DIR, owner, upload_id)
+    return chunked_uploads.finalize(db, ATTACH_BASE_DIR, owner, m)
+
+
+@router.delete("/{journal_id}/attachments/uploads/{upload_id}")
+def abort_journal_chunked_upload(journal_id: int, upload_id: str, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    m = chunked_uploads.load_upload(ATTACH_BASE_DIR, attachments.journal_owner(db, journal_id, current.id), upload_id)
+    chunked_uploads.discard_upload(ATTACH_BASE_DIR, m.upload_id)
+    return {"deleted": m.upload_id}
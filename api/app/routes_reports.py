@@ -4,23 +4,24 @@ Reports API Routes
 Endpoints for generating and managing PDF reports.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from datetime import datetime
-from typing import List
+from typing import List, Optional
+import json
 import os
 
 from .db import get_db
 from .deps import get_current_user
-from .models import User
-from .schemas import ReportGenerateRequest, ReportHistoryOut
-from .reports import ReportGenerator
+from .models import User, ReportArtifact, ReportJob
+from .schemas import ReportGenerateRequest, ReportHistoryOut, ReportJobOut, ReportJobProgressOut
+from . import report_jobs
+from .http_cache import file_response, stat_etag
+from .report_jobs import REPORT_EXTENSIONS, enqueue_job, job_to_dict, render_report, save_report, stream_separate_report
+from .storage_usage import UsageDelta, check_quota
 
 router = APIRouter(prefix="/api/reports", tags=["reports"])
 
-REPORTS_BASE_DIR = os.environ.get("REPORTS_BASE_DIR", "/data/exports")
-
 
 @router.post("/generate")
 def generate_report(
@@ -40,106 +41,24 @@ def generate_report(
     - ytd: Year-to-date report
     - alltime: All-time performance report
 
-    For "separate" account_separation_mode, returns ZIP file with multiple PDFs.
-    Otherwise returns single PDF.
+    For "separate" account_separation_mode, returns ZIP file with multiple PDFs,
+    streamed as each account's PDF finishes rendering. Otherwise returns
+    single PDF.
     """
-    generator = ReportGenerator(db, current.id)
-
-    # Generate PDF based on report type
-    content_bytes = None
-    content_type = None
-    filename = None
-
+    # Rendered reports are kept in history, which counts towards the quota
+    check_quota(db, current.id)
     try:
-        if body.type == "trade":
-            if not body.period.trade_id:
-                raise HTTPException(status_code=400, detail="trade_id required for trade report")
-            content_bytes, content_type = generator.generate_trade_report(
-                body.period.trade_id,
-                body.theme,
-                body.include_screenshots
-            )
-            filename = f"trade_report_{body.period.trade_id}.pdf"
-
-        elif body.type == "daily":
-            if not body.period.date:
-                raise HTTPException(status_code=400, detail="date required for daily report")
-
-            from datetime import datetime
-            report_date = datetime.strptime(body.period.date, "%Y-%m-%d").date()
-
-            content_bytes, content_type = generator.generate_daily_report(
-                report_date,
-                body.account_ids,
-                body.account_separation_mode,
-                body.view_id,
-                body.theme,
-                body.include_screenshots
-            )
-            filename = f"daily_report_{body.period.date}" + (".zip" if content_type == "application/zip" else ".pdf")
-
-        elif body.type == "weekly":
-            if not body.period.year or not body.period.week:
-                raise HTTPException(status_code=400, detail="year and week required for weekly report")
-            content_bytes, content_type = generator.generate_weekly_report(
-                body.period.year,
-                body.period.week,
-                body.account_ids,
-                body.account_separation_mode,
-                body.view_id,
-                body.theme,
-                body.include_screenshots
-            )
-            filename = f"weekly_report_{body.period.year}_W{body.period.week}" + (".zip" if content_type == "application/zip" else ".pdf")
-
-        elif body.type == "monthly":
-            if not body.period.year or not body.period.month:
-                raise HTTPException(status_code=400, detail="year and month required for monthly report")
-
-            content_bytes, content_type = generator.generate_monthly_report(
-                body.period.year,
-                body.period.month,
-                body.account_ids,
-                body.account_separation_mode,
-                body.view_id,
-                body.theme,
-                body.include_screenshots
-            )
-            filename = f"monthly_report_{body.period.year}_{body.period.month:02d}" + (".zip" if content_type == "application/zip" else ".pdf")
-
-        elif body.type == "yearly":
-            if not body.period.year:
-                raise HTTPException(status_code=400, detail="year required for yearly report")
-            content_bytes, content_type = generator.generate_yearly_report(
-                body.period.year,
-                body.account_ids,
-                body.account_separation_mode,
-                body.view_id,
-                body.theme
-            )
-            filename = f"yearly_report_{body.period.year}" + (".zip" if content_type == "application/zip" else ".pdf")
-
-        elif body.type == "ytd":
-            content_bytes, content_type = generator.generate_ytd_report(
-                body.account_ids,
-                body.account_separation_mode,
-                body.view_id,
-                body.theme
+        streamed = stream_separate_report(db, current.id, body)
+        if streamed is not None:
+            return StreamingResponse(
+                streamed.chunks,
+                media_type=streamed.content_type,
+                headers={
+                    "Content-Disposition": f'attachment; filename="{streamed.filename}"',
+                    "X-Report-Cache": "miss",
+                },
             )
-            current_year = datetime.utcnow().year
-            filename = f"ytd_report_{current_year}" + (".zip" if content_type == "application/zip" else ".pdf")
-
-        elif body.type == "alltime":
-            content_bytes, content_type = generator.generate_alltime_report(
-                body.account_ids,
-                body.account_separation_mode,
-                body.view_id,
-                body.theme
-            )
-            filename = f"alltime_report_{datetime.utcnow().strftime('%Y%m%d')}" + (".zip" if content_type == "application/zip" else ".pdf")
-
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported report type: {body.type}")
+        content_bytes, content_type, filename, cache_hit = render_report(db, current.id, body)
 
     except HTTPException:
         # Re-raise HTTPException to preserve status code
@@ -156,85 +75,185 @@ def generate_report(
         print(f"[ERROR] Report generation failed: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Report generation failed: {str(e)}")
 
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Content-Length": str(len(content_bytes)),
+        "X-Report-Cache": "hit" if cache_hit else "miss",
+    }
+
     # Save to disk for history (skip in CI/test environments without /data access)
     try:
-        user_reports_dir = os.path.join(REPORTS_BASE_DIR, str(current.id), "reports")
-        os.makedirs(user_reports_dir, exist_ok=True)
-
-        filepath = os.path.join(user_reports_dir, filename)
-        with open(filepath, "wb") as f:
-            f.write(content_bytes)
+        headers["X-Report-Artifact-Id"] = str(save_report(current.id, body, filename, content_bytes, content_type))
     except Exception as e:
         print(f"[ERROR] Failed to save report to disk: {e}")
         # Continue even if save fails - still return the content
 
     # Return PDF or ZIP as response
-    return Response(
-        content=content_bytes,
-        media_type=content_type,
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"',
-            "Content-Length": str(len(content_bytes))
-        }
+    return Response(content=content_bytes, media_type=content_type, headers=headers)
+
+
+@router.post("/jobs", response_model=ReportJobOut, status_code=202)
+def submit_report_job(
+    body: ReportGenerateRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current: User = Depends(get_current_user)
+):
+    """
+    Queue a report render and return immediately with a job id.
+
+    Poll GET /api/reports/jobs/{id}/progress; once status is "done" the file is
+    in the report history and downloadable via download_url.
+    """
+    check_quota(db, current.id)
+    job = enqueue_job(db, current.id, body, background_tasks)
+    return job_to_dict(job)
+
+
+@router.get("/jobs", response_model=List[ReportJobOut])
+def list_report_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current: User = Depends(get_current_user)
+):
+    """List the current user's most recent report jobs, newest first."""
+    jobs = (
+        db.query(ReportJob)
+        .filter(ReportJob.user_id == current.id)
+        .order_by(ReportJob.created_at.desc(), ReportJob.id.desc())
+        .limit(limit)
+        .all()
     )
+    return [job_to_dict(j) for j in jobs]
+
 
+def _get_job(db: Session, job_id: int, user_id: int) -> ReportJob:
+    job = db.query(ReportJob).filter(ReportJob.id == job_id, ReportJob.user_id == user_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job
 
-@router.get("/history")
+
+@router.get("/jobs/{job_id}", response_model=ReportJobOut)
+def get_report_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current: User = Depends(get_current_user)
+):
+    """Full status of a report job, including download_url once done."""
+    return job_to_dict(_get_job(db, job_id, current.id))
+
+
+@router.get("/jobs/{job_id}/progress", response_model=ReportJobProgressOut)
+def get_report_job_progress(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current: User = Depends(get_current_user)
+):
+    """Status and percent complete; cheap enough to poll every second."""
+    row = (
+        db.query(ReportJob.id, ReportJob.status, ReportJob.progress, ReportJob.stage)
+        .filter(ReportJob.id == job_id, ReportJob.user_id == current.id)
+        .first()
+    )
+    if not row:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return ReportJobProgressOut(id=row.id, status=row.status, progress=row.progress, stage=row.stage)
+
+
+def _artifact_to_dict(a: ReportArtifact) -> dict:
+    return {
+        "id": a.id,
+        "filename": a.filename,
+        "report_type": a.report_type,
+        "period": json.loads(a.period_json or "{}"),
+        "content_type": a.content_type,
+        "created_at": a.created_at,
+        "file_size_bytes": a.size_bytes,
+        "checksum": a.checksum,
+        "download_url": f"/api/reports/history/{a.id}/download",
+    }
+
+
+def _get_artifact(db: Session, artifact_id: int, user_id: int) -> ReportArtifact:
+    a = db.query(ReportArtifact).filter(ReportArtifact.id == artifact_id, ReportArtifact.user_id == user_id).first()
+    if not a:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return a
+
+
+@router.get("/history", response_model=List[ReportHistoryOut])
 def list_report_history(
+    limit: int = Query(50, ge=1, le=200),
+    before_id: Optional[int] = Query(None, description="Return reports older than this id (next page)"),
+    report_type: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current: User = Depends(get_current_user)
-) -> List[ReportHistoryOut]:
+):
     """
-    List previously generated reports for the current user.
+    List previously generated reports for the current user, newest first.
 
-    Returns a list of report metadata including filename, type, creation time, and file size.
-    Reports are sorted by creation time (newest first).
+    Served from the report_artifacts index. Page with ``before_id`` set to
+    the last id of the previous page.
     """
-    user_reports_dir = os.path.join(REPORTS_BASE_DIR, str(current.id), "reports")
+    report_jobs.index_legacy_reports(current.id)
+    q = db.query(ReportArtifact).filter(ReportArtifact.user_id == current.id)
+    if before_id is not None:
+        q = q.filter(ReportArtifact.id < before_id)
+    if report_type:
+        q = q.filter(ReportArtifact.report_type == report_type)
+    rows = q.order_by(ReportArtifact.id.desc()).limit(limit).all()
+    return [_artifact_to_dict(a) for a in rows]
+
+
+@router.get("/history/{artifact_id}/download")
+def download_report_artifact(
+    artifact_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current: User = Depends(get_current_user)
+):
+    """Download a report by its history id; the content checksum is the ETag."""
+    a = _get_artifact(db, artifact_id, current.id)
+    path = report_jobs.artifact_path(a)
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return _file_download(request, path, a.content_type, a.filename, st, f'"{a.checksum}"')
 
-    if not os.path.exists(user_reports_dir):
-        return []
 
-    reports = []
+@router.delete("/history/{artifact_id}")
+def delete_report_artifact(
+    artifact_id: int,
+    db: Session = Depends(get_db),
+    current: User = Depends(get_current_user)
+):
+    """Delete a report file and its history entry."""
+    a = _get_artifact(db, artifact_id, current.id)
     try:
-        for filename in os.listdir(user_reports_dir):
-            if filename.endswith(".pdf"):
-                filepath = os.path.join(user_reports_dir, filename)
-                try:
-                    stat = os.stat(filepath)
-
-                    # Parse report type from filename (format: {type}_report_*.pdf)
-                    report_type = "unknown"
-                    if "_report_" in filename:
-                        report_type = filename.split("_report_")[0]
-
-                    reports.append(
-                        ReportHistoryOut(
-                            id=hash(filename) & 0x7FFFFFFF,  # Generate positive int ID from hash
-                            filename=filename,
-                            report_type=report_type,
-                            created_at=datetime.fromtimestamp(stat.st_mtime),
-                            file_size_bytes=stat.st_size
-                        )
-                    )
-                except OSError as e:
-                    # Skip files that can't be accessed
-                    print(f"[WARN] Could not access report file {filename}: {e}")
-                    continue
-
-        # Sort by creation time, newest first
-        reports.sort(key=lambda r: r.created_at, reverse=True)
-
+        os.remove(report_jobs.artifact_path(a))
+    except FileNotFoundError:
+        pass
     except OSError as e:
-        print(f"[ERROR] Failed to list reports directory: {e}")
-        return []
+        print(f"[ERROR] Failed to delete report file: {e}")
+        raise HTTPException(status_code=500, detail="Failed to delete report file")
+    db.delete(a)
+    usage = UsageDelta()
+    usage.add(current.id, 0, "reports", -1, -a.size_bytes)
+    usage.apply(db)
+    db.commit()
+    return {"message": "Report deleted successfully", "id": artifact_id, "filename": a.filename}
 
-    return reports
+
+def _file_download(request: Request, path: str, media_type: str, filename: str, st: os.stat_result, etag: str) -> Response:
+    return file_response(request, path, media_type, etag, st, filename=filename)
 
 
 @router.get("/download/{filename}")
 def download_report(
     filename: str,
+    request: Request,
     db: Session = Depends(get_db),
     current: User = Depends(get_current_user)
 ):
@@ -248,30 +267,20 @@ def download_report(
     if ".." in filename or "/" in filename or "\\" in filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
 
-    # Only allow PDF files
-    if not filename.endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files can be downloaded")
+    # Only allow report files (PDF, or ZIP for per-account reports)
+    media_type = REPORT_EXTENSIONS.get(os.path.splitext(filename)[1])
+    if media_type is None:
+        raise HTTPException(status_code=400, detail="Only PDF or ZIP reports can be downloaded")
 
-    filepath = os.path.join(REPORTS_BASE_DIR, str(current.id), "reports", filename)
+    filepath = os.path.join(report_jobs.user_reports_dir(current.id), filename)
 
-    if not os.path.exists(filepath):
+    try:
+        st = os.stat(filepath)
+    except OSError:
         raise HTTPException(status_code=404, detail="Report not found")
 
-    try:
-        with open(filepath, "rb") as f:
-            pdf_bytes = f.read()
-
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f'attachment; filename="{filename}"',
-                "Content-Length": str(len(pdf_bytes))
-            }
-        )
-    except Exception as e:
-        print(f"[ERROR] Failed to read report file: {e}")
-        raise HTTPException(status_code=500, detail="Failed to read report file")
+    # Same validator FileResponse emits, so a cached copy can be revalidated
+    return _file_download(request, filepath, media_type, filename, st, stat_etag(st))
 
 
 @router.delete("/{filename}")
@@ -290,17 +299,26 @@ def delete_report(
     if ".." in filename or "/" in filename or "\\" in filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
 
-    # Only allow PDF files
-    if not filename.endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files can be deleted")
+    # Only allow report files (PDF, or ZIP for per-account reports)
+    if os.path.splitext(filename)[1] not in REPORT_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Only PDF or ZIP reports can be deleted")
 
-    filepath = os.path.join(REPORTS_BASE_DIR, str(current.id), "reports", filename)
+    filepath = os.path.join(report_jobs.user_reports_dir(current.id), filename)
 
     if not os.path.exists(filepath):
         raise HTTPException(status_code=404, detail="Report not found")
 
     try:
         os.remove(filepath)
+        indexed = db.query(ReportArtifact).filter(
+            ReportArtifact.user_id == current.id, ReportArtifact.filename == filename
+        )
+        usage = UsageDelta()
+        for (size,) in indexed.with_entities(ReportArtifact.size_bytes):
+            usage.add(current.id, 0, "reports", -1, -size)
+        indexed.delete(synchronize_session=False)
+        usage.apply(db)
+        db.commit()
         return {"message": "Report deleted successfully", "filename": filename}
     except Exception as e:
         print(f"[ERROR] Failed to delete report file: {e}")
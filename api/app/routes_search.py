@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from .db import get_db
+from .deps import get_current_user
+from .models import User
+from .schemas import SearchHitOut
+from .search import SEARCH_KINDS, search_notes
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=List[SearchHitOut])
+def search(
+    q: str = Query(..., min_length=1, description="Free-text query; every word must match (prefix match)"),
+    kind: Optional[str] = Query(None, description="Restrict to trade|journal"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    if kind and kind not in SEARCH_KINDS:
+        raise HTTPException(400, detail=f"kind must be one of: {', '.join(SEARCH_KINDS)}")
+    kinds = [kind] if kind else None
+    return search_notes(db, current.id, q, kinds=kinds, limit=limit)
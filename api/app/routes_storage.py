@@ -0,0 +1,30 @@
+"""
+Storage usage routes.
+
+Reads the per-user counters kept by storage_usage.py; nothing here touches
+the filesystem.
+"""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from .db import get_db
+from .deps import get_current_user
+from .models import User
+from .schemas import StorageUsageOut
+from . import storage_usage
+
+router = APIRouter(prefix="/storage", tags=["storage"])
+
+
+@router.get("/usage", response_model=StorageUsageOut)
+def get_storage_usage(
+    db: Session = Depends(get_db),
+    current: User = Depends(get_current_user)
+):
+    """
+    Files and bytes used by the current user's attachments, thumbnails and
+    stored reports, in total, by kind and by account, with the quota if one
+    is configured.
+    """
+    return storage_usage.usage_out(db, current.id)
@@ -1,19 +1,29 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File, Form, Request
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from typing import List, Optional
-from .db import get_db
+from .db import get_db, engine
 from .deps import get_current_user
-from .models import Trade, Account, Instrument, Attachment
-from .schemas import TradeOut, TradeCreate, TradeUpdate, TradeDetailOut, AttachmentOut, AttachmentUpdate
+from .models import Trade, Account, Attachment, Instrument
+from .data_version import bump_data_version
+from .monthly_summaries import invalidate_trade_months
+from . import attachments, chunked_uploads, storage_reclaimer
+from .renditions import ensure_rendition
+from .serialization import RowLayout, float_or_none, iso_or_none, nonzero_float_or_none
+from .schemas import (
+    TradeOut, TradeCreate, TradeUpdate, TradeDetailOut, AttachmentOut, AttachmentUpdate, TypeaheadOut,
+    ChunkedUploadInit, ChunkedUploadOut,
+    TradeBatchRequest, TradeBatchOut, TradeBatchResultItem,
+)
 from datetime import datetime, timedelta, timezone
 import os, shutil, tempfile
-from fastapi.responses import FileResponse, JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from io import BytesIO
 import json
 
 router = APIRouter(prefix="/trades", tags=["trades"])
 ATTACH_MAX_MB = float(os.environ.get("ATTACH_MAX_MB", "10"))
-ATTACH_THUMB_SIZE = int(os.environ.get("ATTACH_THUMB_SIZE", "256"))
 
 def _resolve_attach_base() -> str:
     base = os.environ.get("ATTACH_BASE_DIR", "/data/uploads")
@@ -28,20 +38,42 @@ def _resolve_attach_base() -> str:
 
 ATTACH_BASE_DIR = _resolve_attach_base()
 
-@router.get("", response_model=List[TradeOut])
-def list_trades(
-    db: Session = Depends(get_db),
-    current = Depends(get_current_user),
-    limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+# Output layout for list_trades; order matches the columns selected in _filtered_trades_query
+_TRADE_LIST_LAYOUT = RowLayout([
+    ("id", None),
+    ("account_name", None),
+    ("symbol", None),
+    ("asset_class", None),
+    ("side", None),
+    ("qty_units", float_or_none),
+    ("entry_price", float_or_none),
+    ("exit_price", float_or_none),
+    ("open_time_utc", iso_or_none),
+    ("close_time_utc", iso_or_none),
+    ("net_pnl", float_or_none),
+    ("external_trade_id", None),
+    ("lot_size", nonzero_float_or_none),
+    ("pips", nonzero_float_or_none),
+    ("swap", nonzero_float_or_none),
+    ("stop_loss", nonzero_float_or_none),
+    ("take_profit", nonzero_float_or_none),
+    ("contracts", None),
+    ("ticks", nonzero_float_or_none),
+])
+
+
+def _filtered_trades_query(
+    db: Session,
+    user_id: int,
     symbol: Optional[str] = None,
     account: Optional[str] = None,
-    start: Optional[str] = Query(None, description="YYYY-MM-DD inclusive"),
-    end: Optional[str] = Query(None, description="YYYY-MM-DD inclusive"),
-    sort: Optional[str] = Query(None, description="Sort by field, e.g., open_time_utc:desc, net_pnl:asc, symbol:asc"),
-    filters: Optional[str] = Query(None, description="Filter DSL JSON string"),
-    view: Optional[str] = Query(None, description="Saved view ID or name"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    sort: Optional[str] = None,
+    filters: Optional[str] = None,
+    view: Optional[str] = None,
 ):
+    """Build the sorted trades-list query shared by list_trades and export_trades (no paging)."""
     q = db.query(
         Trade.id,
         Account.name.label("account_name"),
@@ -63,7 +95,7 @@ def list_trades(
         Trade.contracts,
         Trade.ticks,
     ).outerjoin(Account, Account.id == Trade.account_id).outerjoin(Instrument, Instrument.id == Trade.instrument_id)
-    q = q.filter(Account.user_id == current.id)
+    q = q.filter(Account.user_id == user_id)
 
     # Apply filters: Priority: view > filters > legacy params
     if view:
@@ -76,7 +108,7 @@ def list_trades(
             view_id = int(view)
             saved_view = db.query(SavedView).filter(
                 SavedView.id == view_id,
-                SavedView.user_id == current.id
+                SavedView.user_id == user_id
             ).first()
         except ValueError:
             pass
@@ -85,7 +117,7 @@ def list_trades(
         if not saved_view:
             saved_view = db.query(SavedView).filter(
                 SavedView.name.ilike(view),
-                SavedView.user_id == current.id
+                SavedView.user_id == user_id
             ).first()
 
         if not saved_view:
@@ -95,7 +127,7 @@ def list_trades(
         try:
             from .filters import FilterCompiler
             filter_dsl = json.loads(saved_view.filters_json)
-            compiler = FilterCompiler(user_id=current.id)
+            compiler = FilterCompiler(user_id=user_id)
             q = compiler.compile(filter_dsl, q)
         except Exception as e:
             raise HTTPException(400, detail=f"Failed to apply view filters: {str(e)}")
@@ -105,7 +137,7 @@ def list_trades(
         try:
             from .filters import FilterCompiler
             filter_dsl = json.loads(filters)
-            compiler = FilterCompiler(user_id=current.id)
+            compiler = FilterCompiler(user_id=user_id)
             q = compiler.compile(filter_dsl, q)
         except json.JSONDecodeError:
             raise HTTPException(400, detail="Invalid filter JSON")
@@ -121,7 +153,7 @@ def list_trades(
             end=end
         )
         if filter_dsl:
-            compiler = FilterCompiler(user_id=current.id)
+            compiler = FilterCompiler(user_id=user_id)
             q = compiler.compile(filter_dsl, q)
 
     # Sorting
@@ -145,33 +177,29 @@ def list_trades(
         except Exception:
             pass
 
-    q = q.order_by(sort_expr).offset(offset).limit(limit)
-
-    rows = q.all()
-    out: List[TradeOut] = []
-    for r in rows:
-        out.append(TradeOut(
-            id=r.id,
-            account_name=r.account_name,
-            symbol=r.symbol,
-            asset_class=r.asset_class,
-            side=r.side,
-            qty_units=r.qty_units,
-            entry_price=r.entry_price,
-            exit_price=r.exit_price,
-            open_time_utc=r.open_time_utc.isoformat() if r.open_time_utc else None,
-            close_time_utc=r.close_time_utc.isoformat() if r.close_time_utc else None,
-            net_pnl=r.net_pnl,
-            external_trade_id=r.external_trade_id,
-            lot_size=float(r.lot_size) if r.lot_size else None,
-            pips=float(r.pips) if r.pips else None,
-            swap=float(r.swap) if r.swap else None,
-            stop_loss=float(r.stop_loss) if r.stop_loss else None,
-            take_profit=float(r.take_profit) if r.take_profit else None,
-            contracts=r.contracts,
-            ticks=float(r.ticks) if r.ticks else None,
-        ))
-    return out
+    return q.order_by(sort_expr)
+
+
+@router.get("", response_model=List[TradeOut])
+def list_trades(
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    symbol: Optional[str] = None,
+    account: Optional[str] = None,
+    start: Optional[str] = Query(None, description="YYYY-MM-DD inclusive"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD inclusive"),
+    sort: Optional[str] = Query(None, description="Sort by field, e.g., open_time_utc:desc, net_pnl:asc, symbol:asc"),
+    filters: Optional[str] = Query(None, description="Filter DSL JSON string"),
+    view: Optional[str] = Query(None, description="Saved view ID or name"),
+):
+    q = _filtered_trades_query(db, current.id, symbol=symbol, account=account, start=start, end=end, sort=sort, filters=filters, view=view)
+    q = q.offset(offset).limit(limit)
+
+    # Row tuples go straight to JSON bytes; returning a Response also skips
+    # response_model re-validation (the model still documents the schema).
+    return Response(content=_TRADE_LIST_LAYOUT.dumps(q.all()), media_type="application/json")
 
 
 @router.get("/symbols", response_model=List[str])
@@ -183,11 +211,176 @@ def list_symbols(
     q = db.query(Instrument.symbol).join(Trade, Trade.instrument_id == Instrument.id).join(Account, Account.id == Trade.account_id)
     q = q.filter(Account.user_id == current.id)
     if account:
-        q = q.filter(Account.name.ilike(f"%{account}%"))
+        # lower(name) LIKE '%x%' is served by the trigram index on Postgres (0021)
+        q = q.filter(func.lower(Account.name).contains(account.lower(), autoescape=True))
     rows = q.distinct().order_by(Instrument.symbol.asc()).all()
     return [r[0] for r in rows if r[0]]
 
 
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Least string above every string starting with ``prefix``, in code point order; None if unbounded."""
+    stem = prefix.rstrip(chr(0x10FFFF))
+    if not stem:
+        return None
+    nxt = ord(stem[-1]) + 1
+    if 0xD800 <= nxt <= 0xDFFF:
+        nxt = 0xE000  # surrogates cannot be stored
+    return stem[:-1] + chr(nxt)
+
+
+@router.get("/typeahead", response_model=List[TypeaheadOut])
+def typeahead(
+    field: str = Query(..., description="symbol|account"),
+    q: str = Query("", description="Case-insensitive substring to match"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    """Top-N symbols or account names for dropdowns: prefix matches first, then by the user's trade count."""
+    trade_count = func.count(Trade.id)
+    if field == "symbol":
+        col = Instrument.symbol
+        qry = (
+            db.query(col, trade_count)
+            .join(Trade, Trade.instrument_id == Instrument.id)
+            .join(Account, Account.id == Trade.account_id)
+            .filter(Account.user_id == current.id)
+        )
+    elif field == "account":
+        col = Account.name
+        # Accounts without trades are still selectable
+        qry = (
+            db.query(col, trade_count)
+            .outerjoin(Trade, Trade.account_id == Account.id)
+            .filter(Account.user_id == current.id)
+        )
+    else:
+        raise HTTPException(400, detail="field must be one of: symbol, account")
+    order = [trade_count.desc(), col.asc()]
+    needle = (q or "").strip().lower()
+    if not needle:
+        rows = qry.group_by(col).order_by(*order).limit(limit).all()
+    else:
+        # Prefix matches as a range on lower(col), so the lower(...) indexes
+        # (migration 0021) apply; substring matches only fill what is left.
+        # The range is a prefix match only under byte order: SQLite compares
+        # that way already, Postgres needs the "C" collation (as does the index).
+        lowered = func.lower(col)
+        ranged = lowered.collate("C") if db.get_bind().dialect.name == "postgresql" else lowered
+        prefix = ranged >= needle
+        upper = _prefix_upper_bound(needle)
+        if upper is not None:
+            prefix = prefix & (ranged < upper)
+        rows = qry.filter(prefix).group_by(col).order_by(*order).limit(limit).all()
+        if len(rows) < limit:
+            rest = qry.filter(lowered.contains(needle, autoescape=True), ~prefix)
+            rows += rest.group_by(col).order_by(*order).limit(limit - len(rows)).all()
+    return [TypeaheadOut(value=r[0], trade_count=int(r[1] or 0)) for r in rows if r[0]]
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+EXPORT_BATCH_ROWS = int(os.environ.get("TRADES_EXPORT_BATCH_ROWS", "2000"))
+
+
+def _export_value(v):
+    if v is None:
+        return None
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, (int, float, str, bool)):
+        return v
+    # Decimal (Numeric columns)
+    return float(v)
+
+
+def _iter_export_batches(stmt):
+    """
+    Yield lists of row tuples from a server-side cursor.
+
+    Runs on its own Session: the request session is closed once the handler
+    returns, while this generator keeps running for the whole download.
+    """
+    with Session(bind=engine) as s:
+        result = s.execute(stmt.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        for part in result.partitions():
+            yield [tuple(_export_value(v) for v in row) for row in part]
+
+
+def _iter_csv(stmt, columns: List[str]):
+    import csv
+    import io
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(columns)
+    for batch in _iter_export_batches(stmt):
+        w.writerows(batch)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0); buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _iter_ndjson(stmt, columns: List[str]):
+    for batch in _iter_export_batches(stmt):
+        yield "".join(json.dumps(dict(zip(columns, row)), separators=(",", ":")) + "\n" for row in batch).encode("utf-8")
+
+
+def _iter_parquet(stmt, columns: List[str]):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(c, pa.string() if c in ("account_name", "symbol", "asset_class", "side", "open_time_utc", "close_time_utc", "external_trade_id")
+                         else pa.int64() if c in ("id", "contracts") else pa.float64()) for c in columns])
+    sink = BytesIO()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in _iter_export_batches(stmt):
+            cols = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays([pa.array(cols[i], type=schema.field(i).type) for i in range(len(columns))], schema=schema))
+            # Hand finished row groups to the client and drop them from memory
+            yield sink.getvalue()
+            sink.seek(0); sink.truncate(0)
+    finally:
+        writer.close()
+    yield sink.getvalue()
+
+
+@router.get("/export")
+def export_trades(
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+    format: str = Query("csv", description="csv|ndjson|parquet"),
+    symbol: Optional[str] = None,
+    account: Optional[str] = None,
+    start: Optional[str] = Query(None, description="YYYY-MM-DD inclusive"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD inclusive"),
+    sort: Optional[str] = Query(None, description="Sort by field, e.g., open_time_utc:desc, net_pnl:asc, symbol:asc"),
+    filters: Optional[str] = Query(None, description="Filter DSL JSON string"),
+    view: Optional[str] = Query(None, description="Saved view ID or name"),
+):
+    """Stream every trade matching the list filters (no paging) as CSV, NDJSON or Parquet."""
+    fmt = (format or "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(501, detail="Parquet export requires pyarrow")
+    # Filter/view errors surface here as 4xx, before the response starts
+    q = _filtered_trades_query(db, current.id, symbol=symbol, account=account, start=start, end=end, sort=sort, filters=filters, view=view)
+    columns = [d["name"] for d in q.column_descriptions]
+    stmt = q.statement
+    media_type, ext = EXPORT_FORMATS[fmt]
+    body = {"csv": _iter_csv, "ndjson": _iter_ndjson, "parquet": _iter_parquet}[fmt](stmt, columns)
+    headers = {"Content-Disposition": f'attachment; filename="trades.{ext}"'}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
 def _parse_dt(dt_str: str, tz_name: str | None = None) -> datetime:
     s = (dt_str or "").strip()
     # 1) Try ISO-8601 first (supports 'T', microseconds, and offsets). Handle trailing 'Z'.
@@ -421,7 +614,17 @@ def delete_trade(trade_id: int, db: Session = Depends(get_db), current = Depends
         raise HTTPException(404, detail="Trade not found")
 
     # Build restore payload before delete
-    rp = {
+    rp = _restore_payload(row)
+    t = db.query(Trade).filter(Trade.id == trade_id).first()
+    storage_reclaimer.release_and_log(db, Attachment.trade_id == trade_id)
+    db.delete(t); db.commit()
+    storage_reclaimer.wake()
+    return {"deleted": trade_id, "restore_payload": rp}
+
+
+def _restore_payload(row) -> dict:
+    """POST /trades body that recreates a deleted trade (row from _RESTORE_COLUMNS)."""
+    return {
         "account_name": row.account_name,
         "symbol": row.symbol,
         "side": row.side,
@@ -435,9 +638,165 @@ def delete_trade(trade_id: int, db: Session = Depends(get_db), current = Depends
         "notes_md": row.notes_md,
         "tz": "UTC",
     }
-    t = db.query(Trade).filter(Trade.id == trade_id).first()
-    db.delete(t); db.commit()
-    return {"deleted": trade_id, "restore_payload": rp}
+
+
+_RESTORE_COLUMNS = (
+    Trade.id,
+    Account.name.label("account_name"),
+    Instrument.symbol.label("symbol"),
+    Trade.side,
+    Trade.qty_units,
+    Trade.entry_price,
+    Trade.exit_price,
+    Trade.open_time_utc,
+    Trade.close_time_utc,
+    Trade.fees,
+    Trade.net_pnl,
+    Trade.notes_md,
+)
+TRADES_BATCH_MAX = int(os.environ.get("TRADES_BATCH_MAX", "5000"))
+
+
+def _batch_target_ids(db: Session, user_id: int, body: TradeBatchRequest) -> List[int]:
+    if body.items is not None and body.filters is not None:
+        raise HTTPException(400, detail="Provide either items or filters, not both")
+    if body.items is not None:
+        ids = list(dict.fromkeys(it.id for it in body.items))
+    elif body.filters is not None:
+        from .filters import FilterCompiler
+        # A filter that constrains nothing would target every trade the user owns
+        try:
+            empty = FilterCompiler(user_id=user_id).condition(body.filters) is None
+        except ValueError as e:
+            raise HTTPException(400, detail=str(e))
+        if empty:
+            raise HTTPException(400, detail="filters must contain at least one condition")
+        q = _filtered_trades_query(db, user_id, filters=json.dumps(body.filters))
+        ids = [r[0] for r in q.with_entities(Trade.id).limit(TRADES_BATCH_MAX + 1).all()]
+    else:
+        raise HTTPException(400, detail="Provide items or filters")
+    if len(ids) > TRADES_BATCH_MAX:
+        raise HTTPException(400, detail=f"Batch exceeds {TRADES_BATCH_MAX} trades")
+    return ids
+
+
+def _patch_values(patch: Optional[TradeUpdate]) -> dict:
+    if patch is None:
+        return {}
+    vals = patch.model_dump(exclude_unset=True)
+    if vals.get("reviewed", False) is None:
+        vals.pop("reviewed")  # NOT NULL column
+    return vals
+
+
+@router.post("/batch", response_model=TradeBatchOut)
+def batch_trades(body: TradeBatchRequest, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    """
+    Update or delete many trades in one transaction.
+
+    Trades sharing the same patch are changed with a single set-based UPDATE;
+    deletes are one DELETE. Loss-streak enforcement then runs once per affected
+    account-day instead of once per trade. Because a batch edit is retroactive,
+    breaches are recorded and reported in the response rather than blocking.
+    """
+    ids = _batch_target_ids(db, current.id, body)
+    if body.action == "update":
+        if body.items is not None:
+            patches = {it.id: _patch_values(it.patch) for it in body.items}
+        else:
+            common = _patch_values(body.patch)
+            patches = {i: common for i in ids}
+        if not any(patches.values()):
+            raise HTTPException(400, detail="patch is required for action 'update'")
+
+    # Ownership + previous values for undo, in one query
+    restore_names = {c.key for c in _RESTORE_COLUMNS}
+    patched = {f for p in patches.values() for f in p} if body.action == "update" else set()
+    cols = list(_RESTORE_COLUMNS) + [Trade.account_id] + [getattr(Trade, f) for f in sorted(patched - restore_names)]
+    owned = {}
+    for i in range(0, len(ids), 900):
+        chunk = ids[i:i + 900]
+        rows = (
+            db.query(*cols)
+            .join(Account, Account.id == Trade.account_id)
+            .outerjoin(Instrument, Instrument.id == Trade.instrument_id)
+            .filter(Trade.id.in_(chunk), Account.user_id == current.id)
+            .all()
+        )
+        owned.update({r.id: r for r in rows})
+
+    results: List[TradeBatchResultItem] = []
+    found = [i for i in ids if i in owned]
+    if body.action == "delete" or "net_pnl" in patched:
+        # Set-based writes bypass the flush listener
+        invalidate_trade_months(db, found)
+    if body.action == "delete":
+        for i in range(0, len(found), 900):
+            storage_reclaimer.release_and_log(db, Attachment.trade_id.in_(found[i:i + 900]))
+            db.query(Trade).filter(Trade.id.in_(found[i:i + 900])).delete(synchronize_session=False)
+        for i in ids:
+            if i in owned:
+                results.append(TradeBatchResultItem(id=i, status="deleted", undo=_restore_payload(owned[i])))
+            else:
+                results.append(TradeBatchResultItem(id=i, status="not_found"))
+    else:
+        # Group ids by identical patch -> one UPDATE per distinct patch
+        groups = {}
+        for i in found:
+            vals = patches.get(i) or {}
+            if vals:
+                groups.setdefault(json.dumps(vals, sort_keys=True), []).append(i)
+        for key, group_ids in groups.items():
+            vals = json.loads(key)
+            for i in range(0, len(group_ids), 900):
+                db.query(Trade).filter(Trade.id.in_(group_ids[i:i + 900])).update(vals, synchronize_session=False)
+        for i in ids:
+            if i not in owned:
+                results.append(TradeBatchResultItem(id=i, status="not_found"))
+                continue
+            row = owned[i]
+            old = {}
+            for f in patches.get(i) or {}:
+                v = getattr(row, f)
+                old[f] = float(v) if v is not None and f in ("lot_size", "pips", "swap", "stop_loss", "take_profit", "ticks") else v
+            results.append(TradeBatchResultItem(id=i, status="updated", undo={"id": i, "patch": old}))
+    if found:
+        # Set-based writes bypass the flush listener
+        bump_data_version(db, [current.id])
+    db.commit()
+    if body.action == "delete":
+        storage_reclaimer.wake()
+
+    # M6 Enforcement: once per affected account-day where a loss was written
+    breaches: List[str] = []
+    warnings: List[str] = []
+    if body.action == "update":
+        days = {}
+        for i in found:
+            row = owned[i]
+            pnl = (patches.get(i) or {}).get("net_pnl")
+            if row.close_time_utc and pnl is not None and pnl < 0:
+                days.setdefault((row.account_id, row.close_time_utc.date()), row.close_time_utc)
+        if days:
+            from .enforcement import check_loss_streaks
+            for (account_id, _day), close_time in days.items():
+                try:
+                    b, w = check_loss_streaks(db, current.id, account_id, close_time)
+                except HTTPException as e:
+                    # 'block' mode: breach is logged by check_loss_streaks; report it
+                    detail = e.detail if isinstance(e.detail, dict) else {"message": str(e.detail)}
+                    b, w = [detail.get("rule", "blocked")], [detail.get("message", "")]
+                breaches.extend(b); warnings.extend(w)
+
+    return TradeBatchOut(
+        action=body.action,
+        updated=sum(1 for r in results if r.status == "updated"),
+        deleted=sum(1 for r in results if r.status == "deleted"),
+        not_found=sum(1 for r in results if r.status == "not_found"),
+        results=results,
+        breaches=breaches,
+        warnings=warnings,
+    )
 
 
 @router.get("/{trade_id}", response_model=TradeDetailOut)
@@ -454,7 +813,6 @@ def get_trade_detail(trade_id: int, db: Session = Depends(get_db), current = Dep
     if not r:
         raise HTTPException(404, detail="Trade not found")
     t, account_name, symbol, asset_class = r
-    atts = db.query(Attachment).filter(Attachment.trade_id == t.id).order_by(Attachment.sort_order.asc(), Attachment.created_at.asc()).all()
     return TradeDetailOut(
         id=t.id,
         account_name=account_name,
@@ -478,20 +836,7 @@ def get_trade_detail(trade_id: int, db: Session = Depends(get_db), current = Dep
         notes_md=t.notes_md,
         post_analysis_md=t.post_analysis_md,
         reviewed=bool(t.reviewed),
-        attachments=[AttachmentOut(
-            id=a.id,
-            filename=a.filename,
-            mime_type=a.mime_type,
-            size_bytes=a.size_bytes,
-            timeframe=a.timeframe,
-            state=a.state,
-            view=a.view,
-            caption=a.caption,
-            reviewed=bool(a.reviewed),
-            thumb_available=bool(a.thumb_path),
-            thumb_url=(f"/trades/{trade_id}/attachments/{a.id}/thumb" if a.thumb_path else None),
-            sort_order=a.sort_order,
-        ) for a in atts],
+        attachments=attachments.list_attachments(db, attachments.for_trade(t.id, current.id)),
     )
 
 
@@ -684,21 +1029,20 @@ def export_trade_markdown(
                                 except Exception:
                                     pass
                         elif evidence.lower() == 'full':
-                            # Embed full image if available and of supported type
+                            # Embed the preview rendition (downscaled) rather than the raw upload
                             from .models import Attachment as AttachmentModel
                             a = db.query(AttachmentModel).filter(AttachmentModel.id == e.source_id).first()
-                            if a and a.storage_path and os.path.exists(a.storage_path):
-                                extf = os.path.splitext(a.storage_path)[1].lower()
-                                if extf in ('.png', '.jpg', '.jpeg', '.webp'):
-                                    try:
-                                        import base64
-                                        mime = "image/jpeg" if extf in (".jpg", ".jpeg") else ("image/png" if extf == ".png" else "image/webp")
-                                        with open(a.storage_path, 'rb') as fh:
-                                            b64 = base64.b64encode(fh.read()).decode('ascii')
-                                        lines.append(f"- [{e.field_key}] {e.source_kind} attachment #{e.source_id}{(' — ' + (e.note or ''))}\\n\\n  ![](data:{mime};base64,{b64})\\n")
-                                        continue
-                                    except Exception:
-                                        pass
+                            r = ensure_rendition(db, a, "preview") if a else None
+                            if r:
+                                try:
+                                    import base64
+                                    img_path, mime = r
+                                    with open(img_path, 'rb') as fh:
+                                        b64 = base64.b64encode(fh.read()).decode('ascii')
+                                    lines.append(f"- [{e.field_key}] {e.source_kind} attachment #{e.source_id}{(' — ' + (e.note or ''))}\\n\\n  ![](data:{mime};base64,{b64})\\n")
+                                    continue
+                                except Exception:
+                                    pass
                         # Fallback to plain link line
                         lines.append(f"- [{e.field_key}] {e.source_kind} attachment #{e.source_id}{(' — ' + (e.note or ''))}")
                 lines.append("")
@@ -843,10 +1187,11 @@ def _render_trade_html(
                             img_path = None
                             css_class = 'thumb'
                             if a:
-                                if evidence.lower() == 'full' and a.storage_path and os.path.exists(a.storage_path):
-                                    extf = os.path.splitext(a.storage_path)[1].lower()
-                                    if extf in ('.png', '.jpg', '.jpeg', '.webp'):
-                                        img_path = a.storage_path
+                                if evidence.lower() == 'full':
+                                    # Print rendition: sized for the 170mm column, not the raw upload
+                                    r = ensure_rendition(db, a, "print")
+                                    if r:
+                                        img_path = r[0]
                                         css_class = 'full'
                                 if not img_path and a.thumb_path and os.path.exists(a.thumb_path):
                                     img_path = a.thumb_path
@@ -929,32 +1274,11 @@ def export_trade_html(
 
 @router.get("/{trade_id}/attachments", response_model=List[AttachmentOut])
 def list_attachments(trade_id: int, db: Session = Depends(get_db), current = Depends(get_current_user)):
-    # ensure ownership
-    t = db.query(Trade).join(Account, Account.id == Trade.account_id, isouter=True).filter(Trade.id == trade_id, Account.user_id == current.id).first()
-    if not t:
-        raise HTTPException(404, detail="Trade not found")
-    rows = db.query(Attachment).filter(Attachment.trade_id == trade_id).order_by(Attachment.sort_order.asc(), Attachment.created_at.asc()).all()
-    out: list[AttachmentOut] = []
-    for a in rows:
-        out.append(AttachmentOut(
-            id=a.id,
-            filename=a.filename,
-            mime_type=a.mime_type,
-            size_bytes=a.size_bytes,
-            timeframe=a.timeframe,
-            state=a.state,
-            view=a.view,
-            caption=a.caption,
-            reviewed=bool(a.reviewed),
-            thumb_available=bool(a.thumb_path),
-            thumb_url=(f"/trades/{trade_id}/attachments/{a.id}/thumb" if a.thumb_path else None),
-            sort_order=a.sort_order,
-        ))
-    return out
+    return attachments.list_attachments(db, attachments.trade_owner(db, trade_id, current.id))
 
 
 @router.post("/{trade_id}/attachments", response_model=AttachmentOut)
-async def upload_attachment(
+def upload_attachment(
     trade_id: int,
     file: UploadFile = File(...),
     timeframe: Optional[str] = Form(None),
@@ -965,141 +1289,48 @@ async def upload_attachment(
     db: Session = Depends(get_db),
     current = Depends(get_current_user),
 ):
-    # ensure ownership
-    t = db.query(Trade).join(Account, Account.id == Trade.account_id, isouter=True).filter(Trade.id == trade_id, Account.user_id == current.id).first()
-    if not t:
-        raise HTTPException(404, detail="Trade not found")
-    content = await file.read()
-    if len(content) > int(ATTACH_MAX_MB * 1024 * 1024):
-        raise HTTPException(413, detail=f"File exceeds limit of {int(ATTACH_MAX_MB)} MB")
-    # basic type/extension check
-    name = file.filename or "file"
-    ext = os.path.splitext(name)[1].lower()
-    allowed = {".png", ".jpg", ".jpeg", ".webp", ".pdf"}
-    if ext not in allowed:
-        raise HTTPException(400, detail="Unsupported file type")
-    # save to disk (and process if image)
-    trade_dir = os.path.join(ATTACH_BASE_DIR, str(trade_id))
-    os.makedirs(trade_dir, exist_ok=True)
-    basename = f"{int(datetime.now().timestamp())}_{name}"
-    path = os.path.join(trade_dir, basename)
-
-    thumb_path = None
-    try:
-        if ext in {".png", ".jpg", ".jpeg", ".webp"}:
-            try:
-                from PIL import Image
-            except Exception:
-                # Pillow not available; fall back to raw save
-                with open(path, "wb") as f:
-                    f.write(content)
-            else:
-                im = Image.open(BytesIO(content))
-                # Normalize mode and strip EXIF by re-saving without metadata
-                if im.mode not in ("RGB", "RGBA"):
-                    im = im.convert("RGB")
-                save_params = {}
-                if ext in {".jpg", ".jpeg"}:
-                    save_params.update({"quality": 92, "optimize": True})
-                im.save(path, **save_params)
-                # Create thumbnail
-                try:
-                    im_thumb = im.copy()
-                    im_thumb.thumbnail((ATTACH_THUMB_SIZE, ATTACH_THUMB_SIZE))
-                    thumbs_dir = os.path.join(trade_dir, "thumbs")
-                    os.makedirs(thumbs_dir, exist_ok=True)
-                    # Prefer PNG if alpha channel present, else JPEG
-                    has_alpha = ("A" in im_thumb.getbands())
-                    if has_alpha:
-                        thumb_name = os.path.splitext(basename)[0] + ".png"
-                        thumb_path = os.path.join(thumbs_dir, thumb_name)
-                        im_thumb.save(thumb_path, format="PNG")
-                    else:
-                        thumb_name = os.path.splitext(basename)[0] + ".jpg"
-                        thumb_path = os.path.join(thumbs_dir, thumb_name)
-                        im_thumb = im_thumb.convert("RGB")
-                        im_thumb.save(thumb_path, format="JPEG", quality=85, optimize=True)
-                except Exception:
-                    thumb_path = None
-        else:
-            # PDFs or other allowed types: save raw
-            with open(path, "wb") as f:
-                f.write(content)
-    except Exception:
-        # If any processing fails, ensure the original bytes are saved
-        try:
-            with open(path, "wb") as f:
-                f.write(content)
-        except Exception:
-            pass
-    # choose next sort order for this trade
-    current_max = db.query(Attachment).filter(Attachment.trade_id == trade_id).order_by(Attachment.sort_order.desc()).limit(1).first()
-    next_order = (current_max.sort_order if current_max else 0) + 1
-
-    a = Attachment(
-        trade_id=trade_id,
-        user_id=None,
-        filename=name,
-        mime_type=file.content_type,
-        size_bytes=len(content),
-        storage_path=path,
-        thumb_path=thumb_path,
-        sort_order=next_order,
-        timeframe=timeframe,
-        state=state,
-        view=view,
-        caption=caption,
-        reviewed=bool(reviewed),
-    )
-    db.add(a); db.commit(); db.refresh(a)
-    return AttachmentOut(
-        id=a.id,
-        filename=a.filename,
-        mime_type=a.mime_type,
-        size_bytes=a.size_bytes,
-        timeframe=a.timeframe,
-        state=a.state,
-        view=a.view,
-        caption=a.caption,
-        reviewed=bool(a.reviewed),
-        thumb_available=bool(a.thumb_path),
-        thumb_url=(f"/trades/{trade_id}/attachments/{a.id}/thumb" if a.thumb_path else None),
-        sort_order=a.sort_order,
+    # Sync handler: the body is streamed to disk on FastAPI's threadpool
+    owner = attachments.trade_owner(db, trade_id, current.id)
+    return attachments.upload(
+        db, owner, file, ATTACH_BASE_DIR, ATTACH_MAX_MB,
+        timeframe=timeframe, state=state, view=view, caption=caption, reviewed=reviewed,
     )
 
 
 @router.get("/{trade_id}/attachments/{att_id}/download")
-def download_attachment(trade_id: int, att_id: int, db: Session = Depends(get_db), current = Depends(get_current_user)):
-    a = db.query(Attachment).join(Trade, Trade.id == Attachment.trade_id).join(Account, Account.id == Trade.account_id, isouter=True).filter(Attachment.id == att_id, Trade.id == trade_id, Account.user_id == current.id).first()
-    if not a:
-        raise HTTPException(404, detail="Attachment not found")
-    return FileResponse(a.storage_path, filename=a.filename, media_type=a.mime_type)
+def download_attachment(trade_id: int, att_id: int, request: Request, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    return attachments.download(request, db, attachments.for_trade(trade_id, current.id), att_id)
 
 
 @router.get("/{trade_id}/attachments/{att_id}/thumb")
-def download_attachment_thumb(trade_id: int, att_id: int, db: Session = Depends(get_db), current = Depends(get_current_user)):
-    a = db.query(Attachment).join(Trade, Trade.id == Attachment.trade_id).join(Account, Account.id == Trade.account_id, isouter=True).\
-        filter(Attachment.id == att_id, Trade.id == trade_id, Account.user_id == current.id).first()
-    if not a:
-        raise HTTPException(404, detail="Attachment not found")
-    if not a.thumb_path or not os.path.exists(a.thumb_path):
-        raise HTTPException(404, detail="Thumbnail not available")
-    ext = os.path.splitext(a.thumb_path)[1].lower()
-    media = "image/jpeg" if ext in (".jpg", ".jpeg") else ("image/png" if ext == ".png" else "application/octet-stream")
-    return FileResponse(a.thumb_path, filename=os.path.basename(a.thumb_path), media_type=media)
+def download_attachment_thumb(
+    trade_id: int,
+    att_id: int,
+    request: Request,
+    v: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    return attachments.thumb(request, db, attachments.for_trade(trade_id, current.id), att_id, v)
+
+
+@router.get("/{trade_id}/attachments/{att_id}/rendition/{size}")
+def download_attachment_rendition(
+    trade_id: int,
+    att_id: int,
+    size: str,
+    request: Request,
+    v: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    """Downscaled image (thumb | preview | print), generated on first request and cached."""
+    return attachments.rendition(request, db, attachments.for_trade(trade_id, current.id), att_id, size, v)
 
 
 @router.delete("/{trade_id}/attachments/{att_id}")
 def delete_attachment(trade_id: int, att_id: int, db: Session = Depends(get_db), current = Depends(get_current_user)):
-    a = db.query(Attachment).join(Trade, Trade.id == Attachment.trade_id).join(Account, Account.id == Trade.account_id, isouter=True).filter(Attachment.id == att_id, Trade.id == trade_id, Account.user_id == current.id).first()
-    if not a:
-        raise HTTPException(404, detail="Attachment not found")
-    try:
-        if a.storage_path and os.path.exists(a.storage_path):
-            os.remove(a.storage_path)
-    except Exception:
-        pass
-    db.delete(a); db.commit()
+    attachments.delete(db, attachments.trade_owner(db, trade_id, current.id), att_id)
     return {"deleted": att_id}
 
 
@@ -1111,108 +1342,64 @@ def update_attachment(
     db: Session = Depends(get_db),
     current = Depends(get_current_user),
 ):
-    # ownership
-    a = db.query(Attachment).join(Trade, Trade.id == Attachment.trade_id).join(Account, Account.id == Trade.account_id, isouter=True).\
-        filter(Attachment.id == att_id, Trade.id == trade_id, Account.user_id == current.id).first()
-    if not a:
-        raise HTTPException(404, detail="Attachment not found")
-    if body.timeframe is not None:
-        a.timeframe = body.timeframe
-    if body.state is not None:
-        a.state = body.state
-    if body.view is not None:
-        a.view = body.view
-    if body.caption is not None:
-        a.caption = body.caption
-    if body.reviewed is not None:
-        a.reviewed = bool(body.reviewed)
-    db.commit(); db.refresh(a)
-    return AttachmentOut(
-        id=a.id,
-        filename=a.filename,
-        mime_type=a.mime_type,
-        size_bytes=a.size_bytes,
-        timeframe=a.timeframe,
-        state=a.state,
-        view=a.view,
-        caption=a.caption,
-        reviewed=bool(a.reviewed),
-        thumb_available=bool(a.thumb_path),
-        thumb_url=(f"/trades/{trade_id}/attachments/{a.id}/thumb" if a.thumb_path else None),
-        sort_order=a.sort_order,
-    )
+    return attachments.update_meta(db, attachments.trade_owner(db, trade_id, current.id), att_id, body)
 
 
 @router.post("/{trade_id}/attachments/reorder")
 def reorder_attachments(trade_id: int, ids: List[int], db: Session = Depends(get_db), current = Depends(get_current_user)):
-    # validate ownership and that all ids belong to this trade
-    t = db.query(Trade).join(Account, Account.id == Trade.account_id, isouter=True).filter(Trade.id == trade_id, Account.user_id == current.id).first()
-    if not t:
-        raise HTTPException(404, detail="Trade not found")
-    if not isinstance(ids, list) or not all(isinstance(x, int) for x in ids):
-        raise HTTPException(400, detail="Body must be a list of attachment IDs")
-    rows = db.query(Attachment).filter(Attachment.trade_id == trade_id, Attachment.id.in_(ids)).all()
-    if len(rows) != len(set(ids)):
-        raise HTTPException(400, detail="One or more attachments invalid")
-    # set sort_order by index
-    for idx, att_id in enumerate(ids):
-        db.query(Attachment).filter(Attachment.id == att_id).update({Attachment.sort_order: idx})
-    db.commit()
-    return {"reordered": len(ids)}
+    return attachments.reorder(db, attachments.trade_owner(db, trade_id, current.id), ids)
 
 
 @router.post("/{trade_id}/attachments/batch-delete")
 def batch_delete_attachments(trade_id: int, ids: List[int], db: Session = Depends(get_db), current = Depends(get_current_user)):
-    t = db.query(Trade).join(Account, Account.id == Trade.account_id, isouter=True).filter(Trade.id == trade_id, Account.user_id == current.id).first()
-    if not t:
-        raise HTTPException(404, detail="Trade not found")
-    if not isinstance(ids, list) or not all(isinstance(x, int) for x in ids):
-        raise HTTPException(400, detail="Body must be a list of attachment IDs")
-    rows = db.query(Attachment).filter(Attachment.trade_id == trade_id, Attachment.id.in_(ids)).all()
-    count = 0
-    for a in rows:
-        try:
-            if a.storage_path and os.path.exists(a.storage_path):
-                os.remove(a.storage_path)
-            if a.thumb_path and os.path.exists(a.thumb_path):
-                os.remove(a.thumb_path)
-        except Exception:
-            pass
-        db.delete(a); count += 1
-    db.commit()
-    return {"deleted": count}
+    return {"deleted": attachments.delete_many(db, attachments.trade_owner(db, trade_id, current.id), ids)}
 
 
 @router.post("/{trade_id}/attachments/zip")
 def zip_trade_attachments(trade_id: int, ids: List[int], db: Session = Depends(get_db), current = Depends(get_current_user)):
-    # ensure ownership
-    t = db.query(Trade).join(Account, Account.id == Trade.account_id, isouter=True).filter(Trade.id == trade_id, Account.user_id == current.id).first()
-    if not t:
-        raise HTTPException(404, detail="Trade not found")
-    if not isinstance(ids, list) or not all(isinstance(x, int) for x in ids):
-        raise HTTPException(400, detail="Body must be a list of attachment IDs")
-    rows = db.query(Attachment).filter(Attachment.trade_id == trade_id, Attachment.id.in_(ids)).all()
-    if not rows:
-        raise HTTPException(404, detail="No attachments found")
-
-    from fastapi.responses import StreamingResponse
-    from io import BytesIO
-    import zipfile, os
-
-    def iter_zip():
-        buf = BytesIO()
-        with zipfile.ZipFile(buf, mode="w", compression=zipfile.ZIP_DEFLATED) as z:
-            for a in rows:
-                try:
-                    arcname = a.filename or f"att-{a.id}"
-                    if a.storage_path and os.path.exists(a.storage_path):
-                        z.write(a.storage_path, arcname=arcname)
-                except Exception:
-                    continue
-        buf.seek(0)
-        data = buf.read()
-        yield data
-
-    filename = f"trade-{trade_id}-attachments.zip"
-    headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return StreamingResponse(iter_zip(), media_type="application/zip", headers=headers)
+    return attachments.zip_response(db, attachments.trade_owner(db, trade_id, current.id), ids)
+
+
+# --- Chunked (resumable) uploads ---
+@router.post("/{trade_id}/attachments/uploads", response_model=ChunkedUploadOut)
+def init_chunked_upload(trade_id: int, body: ChunkedUploadInit, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    owner = attachments.trade_owner(db, trade_id, current.id)
+    meta = body.model_dump(include={"timeframe", "state", "view", "caption", "reviewed"})
+    m = chunked_uploads.init_upload(db, ATTACH_BASE_DIR, owner, body.filename, body.size_bytes, body.content_type, body.sha256, meta)
+    return chunked_uploads.status_out(ATTACH_BASE_DIR, m)
+
+
+@router.get("/{trade_id}/attachments/uploads/{upload_id}", response_model=ChunkedUploadOut)
+def get_chunked_upload(trade_id: int, upload_id: str, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    m = chunked_uploads.load_upload(ATTACH_BASE_DIR, attachments.trade_owner(db, trade_id, current.id), upload_id)
+    return chunked_uploads.status_out(ATTACH_BASE_DIR, m)
+
+
+@router.put("/{trade_id}/attachments/uploads/{upload_id}/chunks/{index}", response_model=ChunkedUploadOut)
+async def put_upload_chunk(
+    trade_id: int,
+    upload_id: str,
+    index: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current = Depends(get_current_user),
+):
+    """Raw chunk bytes as the request body; optional X-Chunk-Sha256 header."""
+    m = chunked_uploads.load_upload(ATTACH_BASE_DIR, attachments.trade_owner(db, trade_id, current.id), upload_id)
+    data = await chunked_uploads.read_chunk_body(request, m.chunk_length(index))
+    await run_in_threadpool(chunked_uploads.write_chunk, ATTACH_BASE_DIR, m, index, data, request.headers.get("x-chunk-sha256"))
+    return chunked_uploads.status_out(ATTACH_BASE_DIR, m)
+
+
+@router.post("/{trade_id}/attachments/uploads/{upload_id}/finalize", response_model=AttachmentOut)
+def finalize_chunked_upload(trade_id: int, upload_id: str, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    owner = attachments.trade_owner(db, trade_id, current.id)
+    m = chunked_uploads.load_upload(ATTACH_BASE_DIR, owner, upload_id)
+    return chunked_uploads.finalize(db, ATTACH_BASE_DIR, owner, m)
+
+
+@router.delete("/{trade_id}/attachments/uploads/{upload_id}")
+def abort_chunked_upload(trade_id: int, upload_id: str, db: Session = Depends(get_db), current = Depends(get_current_user)):
+    m = chunked_uploads.load_upload(ATTACH_BASE_DIR, attachments.trade_owner(db, trade_id, current.id), upload_id)
+    chunked_uploads.discard_upload(ATTACH_BASE_DIR, m.upload_id)
+    return {"deleted": m.upload_id}
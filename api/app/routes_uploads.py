@@ -8,7 +8,8 @@ import os
 from sqlalchemy.orm import Session
 from .db import get_db
 from .deps import get_optional_user, get_current_user
-from .models import Upload, Trade, Account, Instrument, MappingPreset, User
+from .models import Upload, Trade, Account, Attachment, Instrument, MappingPreset, User
+from . import storage_reclaimer
 from datetime import datetime, timezone
 from sqlalchemy import and_
 from .forex_utils import (
@@ -768,14 +769,18 @@ def delete_upload(upload_id: int, db: Session = Depends(get_db), current: User =
         Trade.source_upload_id == upload.id,
         Account.user_id == current.id,
     )
+    trades = trade_q.all()
+    if trades:
+        storage_reclaimer.release_and_log(db, Attachment.trade_id.in_([t.id for t in trades]))
     deleted_trades = 0
-    for t in trade_q.all():
+    for t in trades:
         db.delete(t)
         deleted_trades += 1
 
     # Finally delete the upload record
     db.delete(upload)
     db.commit()
+    storage_reclaimer.wake()
     return {"deleted_trades": deleted_trades, "deleted_upload": upload_id}
 
 
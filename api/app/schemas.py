@@ -155,6 +155,38 @@ class TradeUpdate(BaseModel):
     ticks: Optional[float] = None
 
 
+class TradeBatchItem(BaseModel):
+    id: int
+    patch: Optional[TradeUpdate] = None  # required for action='update'
+
+
+class TradeBatchRequest(BaseModel):
+    action: Literal['update', 'delete'] = 'update'
+    # Either explicit items, or a filter DSL (same shape as GET /trades?filters=) plus one patch.
+    # In batch patches an explicit null clears the field; omitted fields are left alone.
+    items: Optional[List[TradeBatchItem]] = None
+    filters: Optional[Dict[str, Any]] = None
+    patch: Optional[TradeUpdate] = None
+
+
+class TradeBatchResultItem(BaseModel):
+    id: int
+    status: Literal['updated', 'deleted', 'not_found']
+    # Update: {"id", "patch"} restoring previous values (feed back to /trades/batch).
+    # Delete: restore payload for POST /trades.
+    undo: Optional[Dict[str, Any]] = None
+
+
+class TradeBatchOut(BaseModel):
+    action: str
+    updated: int
+    deleted: int
+    not_found: int
+    results: List[TradeBatchResultItem]
+    breaches: List[str] = []
+    warnings: List[str] = []
+
+
 class AttachmentOut(BaseModel):
     id: int
     filename: str
@@ -167,9 +199,66 @@ class AttachmentOut(BaseModel):
     reviewed: bool
     thumb_available: Optional[bool] = None
     thumb_url: Optional[str] = None
+    preview_url: Optional[str] = None
     sort_order: Optional[int] = None
 
 
+class AttachmentBatchMetaRequest(BaseModel):
+    trade_ids: List[int] = []
+    journal_ids: List[int] = []
+    include_items: bool = True  # False: counts only (calendar badges)
+
+
+class AttachmentOwnerMeta(BaseModel):
+    count: int
+    thumb_url: Optional[str] = None  # first thumbnail in display order, for grid cells
+    items: List[AttachmentOut] = []
+
+
+class AttachmentBatchMetaOut(BaseModel):
+    # Keyed by trade / journal id; ids without attachments (or not yours) are absent
+    trades: Dict[int, AttachmentOwnerMeta]
+    journals: Dict[int, AttachmentOwnerMeta]
+
+
+class ChunkedUploadInit(BaseModel):
+    filename: str
+    size_bytes: int
+    content_type: Optional[str] = None
+    sha256: Optional[str] = None  # hex digest of the whole file, verified on finalize
+    timeframe: Optional[str] = None
+    state: Optional[str] = None
+    view: Optional[str] = None
+    caption: Optional[str] = None
+    reviewed: Optional[bool] = False
+
+
+class ChunkedUploadOut(BaseModel):
+    upload_id: str
+    filename: str
+    size_bytes: int
+    chunk_size: int
+    chunk_count: int
+    received: List[int]
+
+
+class StorageCounts(BaseModel):
+    files: int
+    bytes: int
+
+
+class StorageAccountUsage(StorageCounts):
+    account_id: Optional[int] = None  # None: journal days without an account, reports
+    account_name: Optional[str] = None
+    by_kind: Dict[str, StorageCounts]
+
+
+class StorageUsageOut(StorageCounts):
+    quota_bytes: Optional[int] = None  # None when STORAGE_QUOTA_MB is unset
+    by_kind: Dict[str, StorageCounts]  # attachments / thumbnails / reports
+    by_account: List[StorageAccountUsage]
+
+
 class AttachmentUpdate(BaseModel):
     timeframe: Optional[str] = None
     state: Optional[str] = None
@@ -184,6 +273,11 @@ class TradeDetailOut(TradeOut):
     reviewed: bool
     attachments: list[AttachmentOut]
 
+
+class TypeaheadOut(BaseModel):
+    value: str
+    trade_count: int
+
 class UploadSummaryOut(BaseModel):
     id: int
     filename: str
@@ -214,6 +308,29 @@ class DailyJournalOut(BaseModel):
     trade_ids: List[int]
 
 
+class JournalRangeTradeOut(BaseModel):
+    id: int
+    account_name: Optional[str]
+    symbol: Optional[str]
+    side: Optional[str]
+    open_time_utc: Optional[str]
+    net_pnl: Optional[float]
+
+
+class JournalChecklistGradeOut(BaseModel):
+    id: int
+    template_id: int
+    symbol: Optional[str]
+    computed_grade: Optional[str]
+    compliance_score: Optional[float]
+
+
+class JournalRangeDayOut(DailyJournalOut):
+    trades: List[JournalRangeTradeOut]
+    attachment_count: int
+    checklists: List[JournalChecklistGradeOut]
+
+
 # --- Note Templates ---
 class TemplateSection(BaseModel):
     heading: str
@@ -388,7 +505,8 @@ FilterOperator = Literal[
     'lt',        # <
     'between',   # date/number range
     'is_null',   # field is NULL
-    'not_null'   # field is NOT NULL
+    'not_null',  # field is NOT NULL
+    'text'       # full-text match (notes / post_analysis)
 ]
 
 
@@ -407,6 +525,17 @@ class Filter(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
+# --- Full-text search ---
+class SearchHitOut(BaseModel):
+    """Ranked search hit with an HTML-escaped, <mark>-highlighted snippet"""
+    kind: Literal['trade', 'journal']
+    id: int
+    date: Optional[str] = None
+    title: Optional[str] = None
+    snippet: str
+    rank: float
+
+
 # --- Saved Views (M7) ---
 class SavedViewCreate(BaseModel):
     """Schema for creating a saved view"""
@@ -468,12 +597,41 @@ class ReportGenerateRequest(BaseModel):
     include_screenshots: bool = True
 
 
+class ReportJobOut(BaseModel):
+    """Queued report render"""
+    id: int
+    status: Literal["queued", "running", "done", "failed"]
+    progress: int
+    stage: Optional[str] = None
+    report_type: Optional[str] = None
+    filename: Optional[str] = None
+    artifact_id: Optional[int] = None
+    content_type: Optional[str] = None
+    download_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class ReportJobProgressOut(BaseModel):
+    """Lightweight polling payload for a report job"""
+    id: int
+    status: Literal["queued", "running", "done", "failed"]
+    progress: int
+    stage: Optional[str] = None
+
+
 class ReportHistoryOut(BaseModel):
     """Report history item"""
     id: int
     filename: str
     report_type: str
+    period: Dict[str, Any] = {}
+    content_type: str
     created_at: datetime
     file_size_bytes: int
+    checksum: str
+    download_url: str
 
     model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,253 @@
+"""
+Full-text search over trade notes, post-analysis and daily journal entries.
+
+The index lives in the database and is kept in sync on write (migration 0020):
+- Postgres: generated ``search_tsv`` tsvector columns with GIN indexes on
+  ``trades`` and ``daily_journal``.
+- SQLite: external-content FTS5 tables ``trades_fts`` / ``daily_journal_fts``
+  maintained by triggers.
+
+Other dialects fall back to case-insensitive LIKE matching.
+"""
+
+import html
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, column, func, literal_column, or_, text
+from sqlalchemy.orm import Session
+
+from .models import DailyJournal, Trade
+
+# Sentinels used to mark highlights before HTML-escaping the snippet
+_HL_START = "\x02"
+_HL_END = "\x03"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SEARCH_KINDS = ("trade", "journal")
+
+
+def dialect_name(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def tokenize(q: str) -> List[str]:
+    """Split a user query into plain word tokens (operators are not supported)."""
+    return _TOKEN_RE.findall(q or "")
+
+
+def _fts5_match(tokens: List[str]) -> str:
+    # Every token must match, each as a prefix: "eur"* "break"*
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in tokens)
+
+
+def _pg_tsquery(tokens: List[str]) -> str:
+    # Prefix AND query: eur:* & break:*
+    return " & ".join(t.replace("'", "") + ":*" for t in tokens)
+
+
+def trade_text_clause(dialect: str, q: str) -> Any:
+    """
+    Build a filter expression matching trades whose notes or post-analysis
+    contain every word of ``q`` (prefix match).
+
+    Returns None when the query has no searchable words.
+    """
+    tokens = tokenize(q)
+    if not tokens:
+        return None
+    if dialect == "sqlite":
+        sub = text("SELECT rowid FROM trades_fts WHERE trades_fts MATCH :fts_q").bindparams(
+            fts_q=_fts5_match(tokens)
+        ).columns(column("rowid"))
+        return Trade.id.in_(sub)
+    if dialect == "postgresql":
+        return literal_column("trades.search_tsv").op("@@")(func.to_tsquery("simple", _pg_tsquery(tokens)))
+    # Fallback: every token must appear in either column
+    clauses = []
+    for t in tokens:
+        needle = t.lower()
+        clauses.append(or_(
+            func.lower(func.coalesce(Trade.notes_md, "")).contains(needle),
+            func.lower(func.coalesce(Trade.post_analysis_md, "")).contains(needle),
+        ))
+    return and_(*clauses)
+
+
+def _render_snippet(raw: Optional[str]) -> str:
+    """HTML-escape a snippet and turn highlight sentinels into <mark> tags."""
+    if not raw:
+        return ""
+    escaped = html.escape(raw)
+    return escaped.replace(_HL_START, "<mark>").replace(_HL_END, "</mark>")
+
+
+def _search_sqlite(db: Session, user_id: int, tokens: List[str], kinds: List[str], limit: int) -> List[Dict[str, Any]]:
+    match = _fts5_match(tokens)
+    hits: List[Dict[str, Any]] = []
+    if "trade" in kinds:
+        rows = db.execute(text(
+            "SELECT t.id, t.open_time_utc, i.symbol, a.name, "
+            "snippet(trades_fts, -1, :hs, :he, '…', 16) AS snip, bm25(trades_fts) AS score "
+            "FROM trades_fts "
+            "JOIN trades t ON t.id = trades_fts.rowid "
+            "JOIN accounts a ON a.id = t.account_id "
+            "LEFT JOIN instruments i ON i.id = t.instrument_id "
+            "WHERE trades_fts MATCH :q AND a.user_id = :uid "
+            "ORDER BY score LIMIT :lim"
+        ), {"q": match, "uid": user_id, "lim": limit, "hs": _HL_START, "he": _HL_END}).all()
+        for r in rows:
+            hits.append({
+                "kind": "trade",
+                "id": r[0],
+                "date": str(r[1])[:10] if r[1] else None,
+                "title": " ".join(x for x in (r[2], r[3] and f"({r[3]})") if x) or None,
+                "snippet": _render_snippet(r[4]),
+                # bm25() is lower-is-better; flip so higher means more relevant
+                "rank": -float(r[5] or 0.0),
+            })
+    if "journal" in kinds:
+        rows = db.execute(text(
+            "SELECT j.id, j.date, j.title, "
+            "snippet(daily_journal_fts, -1, :hs, :he, '…', 16) AS snip, bm25(daily_journal_fts) AS score "
+            "FROM daily_journal_fts "
+            "JOIN daily_journal j ON j.id = daily_journal_fts.rowid "
+            "WHERE daily_journal_fts MATCH :q AND j.user_id = :uid "
+            "ORDER BY score LIMIT :lim"
+        ), {"q": match, "uid": user_id, "lim": limit, "hs": _HL_START, "he": _HL_END}).all()
+        for r in rows:
+            hits.append({
+                "kind": "journal",
+                "id": r[0],
+                "date": str(r[1])[:10] if r[1] else None,
+                "title": r[2],
+                "snippet": _render_snippet(r[3]),
+                "rank": -float(r[4] or 0.0),
+            })
+    return hits
+
+
+def _search_postgres(db: Session, user_id: int, tokens: List[str], kinds: List[str], limit: int) -> List[Dict[str, Any]]:
+    tsq = _pg_tsquery(tokens)
+    opts = f"StartSel={_HL_START}, StopSel={_HL_END}, MaxWords=32, MinWords=12, MaxFragments=2, FragmentDelimiter=…"
+    hits: List[Dict[str, Any]] = []
+    if "trade" in kinds:
+        # Rank in the inner query (index scan + LIMIT), headline only the winners
+        rows = db.execute(text(
+            "SELECT h.id, h.open_time_utc, h.symbol, h.account_name, "
+            "ts_headline('simple', coalesce(h.notes_md, '') || ' ' || coalesce(h.post_analysis_md, ''), h.q, :opts) AS snip, h.score "
+            "FROM ("
+            "  SELECT t.id, t.open_time_utc, i.symbol, a.name AS account_name, t.notes_md, t.post_analysis_md, "
+            "         q, ts_rank(t.search_tsv, q) AS score "
+            "  FROM trades t JOIN accounts a ON a.id = t.account_id "
+            "  LEFT JOIN instruments i ON i.id = t.instrument_id, "
+            "  to_tsquery('simple', :q) AS q "
+            "  WHERE t.search_tsv @@ q AND a.user_id = :uid "
+            "  ORDER BY score DESC LIMIT :lim"
+            ") h ORDER BY h.score DESC"
+        ), {"q": tsq, "uid": user_id, "lim": limit, "opts": opts}).all()
+        for r in rows:
+            hits.append({
+                "kind": "trade",
+                "id": r[0],
+                "date": r[1].date().isoformat() if r[1] else None,
+                "title": " ".join(x for x in (r[2], r[3] and f"({r[3]})") if x) or None,
+                "snippet": _render_snippet(r[4]),
+                "rank": float(r[5] or 0.0),
+            })
+    if "journal" in kinds:
+        rows = db.execute(text(
+            "SELECT h.id, h.date, h.title, "
+            "ts_headline('simple', coalesce(h.title, '') || ' ' || coalesce(h.notes_md, ''), h.q, :opts) AS snip, h.score "
+            "FROM ("
+            "  SELECT j.id, j.date, j.title, j.notes_md, q, ts_rank(j.search_tsv, q) AS score "
+            "  FROM daily_journal j, to_tsquery('simple', :q) AS q "
+            "  WHERE j.search_tsv @@ q AND j.user_id = :uid "
+            "  ORDER BY score DESC LIMIT :lim"
+            ") h ORDER BY h.score DESC"
+        ), {"q": tsq, "uid": user_id, "lim": limit, "opts": opts}).all()
+        for r in rows:
+            hits.append({
+                "kind": "journal",
+                "id": r[0],
+                "date": r[1].isoformat() if r[1] else None,
+                "title": r[2],
+                "snippet": _render_snippet(r[3]),
+                "rank": float(r[4] or 0.0),
+            })
+    return hits
+
+
+def _search_fallback(db: Session, user_id: int, tokens: List[str], kinds: List[str], limit: int) -> List[Dict[str, Any]]:
+    from .models import Account, Instrument
+
+    hits: List[Dict[str, Any]] = []
+    if "trade" in kinds:
+        q = (
+            db.query(Trade.id, Trade.open_time_utc, Instrument.symbol, Account.name, Trade.notes_md, Trade.post_analysis_md)
+            .join(Account, Account.id == Trade.account_id)
+            .outerjoin(Instrument, Instrument.id == Trade.instrument_id)
+            .filter(Account.user_id == user_id, trade_text_clause("", " ".join(tokens)))
+            .order_by(Trade.open_time_utc.desc())
+            .limit(limit)
+        )
+        for r in q.all():
+            body = " ".join(x for x in (r[4], r[5]) if x)
+            hits.append({
+                "kind": "trade", "id": r[0],
+                "date": r[1].date().isoformat() if r[1] else None,
+                "title": " ".join(x for x in (r[2], r[3] and f"({r[3]})") if x) or None,
+                "snippet": html.escape(body[:200]), "rank": 0.0,
+            })
+    if "journal" in kinds:
+        q = db.query(DailyJournal).filter(DailyJournal.user_id == user_id)
+        for t in tokens:
+            needle = t.lower()
+            q = q.filter(or_(
+                func.lower(func.coalesce(DailyJournal.title, "")).contains(needle),
+                func.lower(func.coalesce(DailyJournal.notes_md, "")).contains(needle),
+            ))
+        for j in q.order_by(DailyJournal.date.desc()).limit(limit).all():
+            hits.append({
+                "kind": "journal", "id": j.id,
+                "date": j.date.isoformat() if j.date else None,
+                "title": j.title, "snippet": html.escape((j.notes_md or "")[:200]), "rank": 0.0,
+            })
+    return hits
+
+
+def search_notes(
+    db: Session,
+    user_id: int,
+    q: str,
+    kinds: Optional[List[str]] = None,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    Ranked full-text search across the user's trade notes and journal entries.
+
+    Args:
+        db: SQLAlchemy session
+        user_id: Owner of the notes
+        q: Free-text query; every word must match (prefix match)
+        kinds: Subset of SEARCH_KINDS to search (None = all)
+        limit: Maximum hits returned
+
+    Returns:
+        List of hit dicts (kind, id, date, title, snippet, rank) sorted by rank,
+        most relevant first. Snippets are HTML-escaped with <mark> highlights.
+    """
+    tokens = tokenize(q)
+    if not tokens:
+        return []
+    kinds = [k for k in (kinds or SEARCH_KINDS) if k in SEARCH_KINDS]
+    dialect = dialect_name(db)
+    if dialect == "sqlite":
+        hits = _search_sqlite(db, user_id, tokens, kinds, limit)
+    elif dialect == "postgresql":
+        hits = _search_postgres(db, user_id, tokens, kinds, limit)
+    else:
+        hits = _search_fallback(db, user_id, tokens, kinds, limit)
+    hits.sort(key=lambda h: h["rank"], reverse=True)
+    return hits[:limit]
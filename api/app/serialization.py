@@ -0,0 +1,78 @@
+"""
+Fast JSON serialization for hot list endpoints.
+
+Maps SQL row tuples straight to JSON bytes through a precomputed
+column-to-key layout, skipping per-row Pydantic models and FastAPI's
+response_model re-validation. Uses orjson when installed, falling back to
+the stdlib json module.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import orjson  # type: ignore
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+except ImportError:  # pragma: no cover - exercised only without orjson
+    import json
+
+    def _default(o: Any) -> Any:
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        if isinstance(o, Decimal):
+            return float(o)
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+Converter = Optional[Callable[[Any], Any]]
+
+
+def iso_or_none(v: Any) -> Optional[str]:
+    return v.isoformat() if v is not None else None
+
+
+def float_or_none(v: Any) -> Optional[float]:
+    return float(v) if v is not None else None
+
+
+def nonzero_float_or_none(v: Any) -> Optional[float]:
+    # Matches the historical `float(x) if x else None` used for Numeric columns
+    return float(v) if v else None
+
+
+class RowLayout:
+    """
+    Precomputed mapping of row positions to JSON keys.
+
+    Args:
+        fields: Sequence of (key, converter) in output order. The row is
+            expected to carry values in the same order; converter may be None
+            for values that serialize as-is.
+    """
+
+    def __init__(self, fields: Sequence[Tuple[str, Converter]]):
+        self.keys: Tuple[str, ...] = tuple(k for k, _ in fields)
+        self._converted: Tuple[Tuple[int, Callable[[Any], Any]], ...] = tuple(
+            (i, conv) for i, (_, conv) in enumerate(fields) if conv is not None
+        )
+
+    def to_dicts(self, rows: Iterable[Sequence[Any]]) -> List[dict]:
+        keys = self.keys
+        converted = self._converted
+        out = []
+        for row in rows:
+            vals = list(row)
+            for i, conv in converted:
+                vals[i] = conv(vals[i])
+            out.append(dict(zip(keys, vals)))
+        return out
+
+    def dumps(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        return dumps(self.to_dicts(rows))
@@ -0,0 +1,246 @@
+"""
+Background reclamation of attachment storage.
+
+Deleting attachments (directly, or through their trade, journal day or
+import upload) no longer unlinks files inside the request. The request logs
+the paths in ``file_deletions`` in the same transaction as the row deletes
+(``log_deletions``) and, after commit, wakes the reclaimer (``wake``). The
+reclaimer thread then unlinks them in parallel batches and removes the log
+rows. Because the log is a table, deletions committed just before a restart
+are picked up again on the next start.
+
+A file is skipped rather than removed if an attachment or blob references it
+again by the time the reclaimer gets to it, e.g. when the same content was
+uploaded again in the meantime.
+
+``sweep_orphans`` reconciles ATTACH_BASE_DIR against the database: it drops
+attachment rows whose trade or journal no longer exists (SQLite does not
+enforce the cascades), blob rows nothing references, and files no row
+references, and reports what it reclaimed. It then recounts storage usage
+(``storage_usage.rebuild``) to correct any drift in the counters. The API
+runs it every ATTACH_SWEEP_INTERVAL_HOURS (default 24, 0 disables);
+``scripts/sweep_attachments.py`` runs it on demand.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, exists, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import storage_usage
+from .blobs import BLOBS_DIRNAME, release_attachments
+from .db import engine
+from .models import Attachment, AttachmentBlob, DailyJournal, FileDeletion, Trade
+from .renditions import rendition_paths
+
+ATTACH_SWEEP_INTERVAL_HOURS = float(os.environ.get("ATTACH_SWEEP_INTERVAL_HOURS", "24"))
+# Files younger than this are never swept (uploads in flight, images being processed)
+SWEEP_MIN_AGE_SECONDS = 3600
+RECLAIM_BATCH = 500
+MAX_ATTEMPTS = 5
+_RETRY_SECONDS = 60
+
+_wake = threading.Event()
+_thread: Optional[threading.Thread] = None
+_thread_lock = threading.Lock()
+
+
+def log_deletions(db: Session, paths: Iterable[str]) -> int:
+    """Record files to remove once the caller's transaction commits; returns how many."""
+    rows = [{"path": p, "attempts": 0} for p in sorted(set(p for p in paths if p))]
+    if rows:
+        db.execute(insert(FileDeletion), rows)
+    return len(rows)
+
+
+def release_and_log(db: Session, *criteria) -> int:
+    """``release_attachments`` plus logging of the freed files; returns the attachment rows deleted."""
+    released = release_attachments(db, *criteria)
+    log_deletions(db, released.files)
+    return released.count
+
+
+def wake() -> None:
+    """Have the reclaimer process the log now (call after committing deletions)."""
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="storage-reclaimer", daemon=True)
+            _thread.start()
+    _wake.set()
+
+
+def _run() -> None:
+    while True:
+        _wake.clear()
+        try:
+            while reclaim_pending() == RECLAIM_BATCH:
+                pass
+        except Exception as e:
+            print(f"[WARN] Storage reclaimer pass failed: {type(e).__name__}: {e}")
+        # Sleep until woken; failed unlinks are retried periodically
+        _wake.wait(_RETRY_SECONDS)
+
+
+def _referenced(db: Session, paths: List[str]) -> Set[str]:
+    refs: Set[str] = set()
+    for col in (Attachment.storage_path, Attachment.thumb_path, AttachmentBlob.storage_path, AttachmentBlob.thumb_path):
+        refs.update(r[0] for r in db.execute(select(col).where(col.in_(paths))))
+    return refs
+
+
+def _unlink(path: str) -> Optional[str]:
+    """None once the file is gone (already missing counts), else the error."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def reclaim_pending(limit: int = RECLAIM_BATCH) -> int:
+    """Process up to ``limit`` logged deletions; returns how many rows were handled."""
+    with Session(bind=engine) as db:
+        rows = db.execute(
+            select(FileDeletion.id, FileDeletion.path, FileDeletion.attempts).order_by(FileDeletion.id).limit(limit)
+        ).all()
+        if not rows:
+            return 0
+        refs = _referenced(db, sorted({r.path for r in rows}))
+        todo = [r for r in rows if r.path not in refs]
+        with ThreadPoolExecutor(max_workers=8, thread_name_prefix="reclaim") as ex:
+            errors = dict(zip((r.id for r in todo), ex.map(_unlink, (r.path for r in todo))))
+
+        done = [r.id for r in rows if errors.get(r.id) is None]
+        for r in rows:
+            err = errors.get(r.id)
+            if err is None:
+                continue
+            if r.attempts + 1 >= MAX_ATTEMPTS:
+                print(f"[WARN] Giving up deleting {r.path}: {err}")
+                done.append(r.id)
+            else:
+                db.execute(update(FileDeletion).where(FileDeletion.id == r.id).values(attempts=r.attempts + 1, last_error=err))
+        if done:
+            db.execute(delete(FileDeletion).where(FileDeletion.id.in_(done)))
+        db.commit()
+        return len(rows)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _record_thumb_sizes(db: Session) -> None:
+    """Fill in sizes of thumbnails generated before they were recorded (each file is stat'ed once)."""
+    blobs = db.query(AttachmentBlob.sha256, AttachmentBlob.thumb_path).filter(
+        AttachmentBlob.thumb_path.isnot(None), AttachmentBlob.thumb_size_bytes.is_(None)
+    ).all()
+    for sha, thumb in blobs:
+        size = _file_size(thumb)
+        db.execute(update(AttachmentBlob).where(AttachmentBlob.sha256 == sha).values(thumb_size_bytes=size))
+        db.execute(
+            update(Attachment).where(Attachment.blob_sha256 == sha).values(thumb_size_bytes=size),
+            execution_options={"synchronize_session": False},
+        )
+    legacy = db.query(Attachment.id, Attachment.thumb_path).filter(
+        Attachment.thumb_path.isnot(None), Attachment.thumb_size_bytes.is_(None)
+    ).all()
+    for att_id, thumb in legacy:
+        db.execute(
+            update(Attachment).where(Attachment.id == att_id).values(thumb_size_bytes=_file_size(thumb)),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def _referenced_paths(db: Session) -> Set[str]:
+    refs: Set[str] = set()
+    cols = (Attachment.storage_path, Attachment.thumb_path, Attachment.renditions_json)
+    for row in db.query(*cols).yield_per(2000):
+        refs.update(p for p in (row.storage_path, row.thumb_path) if p)
+        refs |= rendition_paths(row)
+    for path, thumb in db.query(AttachmentBlob.storage_path, AttachmentBlob.thumb_path).yield_per(2000):
+        refs.update(p for p in (path, thumb) if p)
+    return {os.path.abspath(p) for p in refs}
+
+
+def sweep_orphans(base_dir: str, dry_run: bool = False, min_age_seconds: float = SWEEP_MIN_AGE_SECONDS) -> Dict[str, int]:
+    """
+    Reconcile ``base_dir`` with the attachments tables and remove what
+    nothing references. With ``dry_run`` nothing is changed and the counts
+    say what would go.
+    """
+    from .chunked_uploads import sweep_stale_uploads
+
+    report = {"attachment_rows": 0, "blob_rows": 0, "files": 0, "bytes_reclaimed": 0}
+    with Session(bind=engine) as db:
+        dangling = or_(
+            Attachment.trade_id.isnot(None) & Attachment.trade_id.notin_(select(Trade.id)),
+            Attachment.journal_id.isnot(None) & Attachment.journal_id.notin_(select(DailyJournal.id)),
+        )
+        unused_blob = ~exists().where(Attachment.blob_sha256 == AttachmentBlob.sha256)
+        if dry_run:
+            report["attachment_rows"] = db.query(Attachment.id).filter(dangling).count()
+            report["blob_rows"] = db.query(AttachmentBlob.sha256).filter(unused_blob).count()
+        else:
+            report["attachment_rows"] = release_and_log(db, dangling)
+            orphans = db.query(AttachmentBlob.sha256, AttachmentBlob.storage_path, AttachmentBlob.thumb_path).filter(unused_blob).all()
+            if orphans:
+                log_deletions(db, [p for o in orphans for p in (o.storage_path, o.thumb_path)])
+                db.execute(delete(AttachmentBlob).where(AttachmentBlob.sha256.in_([o.sha256 for o in orphans])))
+            report["blob_rows"] = len(orphans)
+            _record_thumb_sizes(db)
+            storage_usage.rebuild(db)
+            db.commit()
+        refs = _referenced_paths(db)
+
+    if not dry_run:
+        wake()
+        sweep_stale_uploads(base_dir)
+    # Chunked uploads have their own lifecycle; staging files are swept by age like the rest
+    skip = {os.path.abspath(os.path.join(base_dir, BLOBS_DIRNAME, "uploads"))}
+    cutoff = time.time() - min_age_seconds
+    for root, dirs, files in os.walk(base_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) not in skip]
+        for name in files:
+            path = os.path.abspath(os.path.join(root, name))
+            if path in refs:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_mtime > cutoff:
+                continue
+            if dry_run or _unlink(path) is None:
+                report["files"] += 1
+                report["bytes_reclaimed"] += st.st_size
+    return report
+
+
+def _sweep_loop(base_dir: str) -> None:
+    interval = ATTACH_SWEEP_INTERVAL_HOURS * 3600
+    while True:
+        time.sleep(interval)
+        try:
+            r = sweep_orphans(base_dir)
+            print(f"[storage] sweep reclaimed {r['bytes_reclaimed']} bytes in {r['files']} files "
+                  f"({r['attachment_rows']} dangling attachments, {r['blob_rows']} unused blobs)")
+        except Exception as e:
+            print(f"[WARN] Storage sweep failed: {type(e).__name__}: {e}")
+
+
+def start_background(base_dir: str) -> None:
+    """Drain any deletions left from a previous process and schedule the periodic sweep."""
+    wake()
+    if ATTACH_SWEEP_INTERVAL_HOURS > 0:
+        threading.Thread(target=_sweep_loop, args=(base_dir,), name="storage-sweeper", daemon=True).start()
@@ -0,0 +1,190 @@
+"""
+Per-user storage accounting.
+
+``storage_usage`` keeps running file and byte counters per user, account
+and kind:
+
+- attachments: uploaded files (``Attachment.size_bytes``)
+- thumbnails: their generated thumbnails (``thumb_size_bytes``)
+- reports: rendered reports kept in history (``ReportArtifact.size_bytes``)
+
+Usage is logical: an attachment counts in full for its owner even when the
+blob store shares its content with other attachments. Attachments count
+against the account of their trade or journal day (0 for a day without
+one); reports against no account.
+
+Writes that create, change or remove those rows adjust the counters in the
+same transaction (``UsageDelta``), so ``GET /storage/usage`` and quota
+checks read a handful of rows instead of scanning ATTACH_BASE_DIR and
+REPORTS_BASE_DIR. ``rebuild`` recomputes the counters from the rows; the
+periodic attachment sweep runs it to correct drift (e.g. a trade moved to
+another account).
+
+STORAGE_QUOTA_MB caps each user's total (default 0: unlimited). Uploads that
+would exceed it, and report renders once it is reached, are refused with 413.
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.orm import Query, Session
+
+from .models import Account, Attachment, DailyJournal, ReportArtifact, StorageUsage, Trade
+
+STORAGE_QUOTA_MB = float(os.environ.get("STORAGE_QUOTA_MB", "0"))
+KINDS = ("attachments", "thumbnails", "reports")
+
+UsageKey = Tuple[int, int, str]  # (user_id, account_id or 0, kind)
+
+# Owner of an attachment row, via its trade's account or its journal day
+OWNER_USER_ID = func.coalesce(Account.user_id, DailyJournal.user_id).label("owner_user_id")
+OWNER_ACCOUNT_ID = func.coalesce(Trade.account_id, DailyJournal.account_id, 0).label("owner_account_id")
+
+
+def with_owner(q: Query) -> Query:
+    """Join what ``OWNER_USER_ID`` / ``OWNER_ACCOUNT_ID`` need onto an Attachment query."""
+    return (
+        q.select_from(Attachment)
+        .outerjoin(Trade, Trade.id == Attachment.trade_id)
+        .outerjoin(Account, Account.id == Trade.account_id)
+        .outerjoin(DailyJournal, DailyJournal.id == Attachment.journal_id)
+    )
+
+
+def quota_bytes() -> Optional[int]:
+    return int(STORAGE_QUOTA_MB * 1024 * 1024) if STORAGE_QUOTA_MB > 0 else None
+
+
+class UsageDelta:
+    """Counter changes accumulated over a write, applied with one statement."""
+
+    def __init__(self):
+        self._d: Dict[UsageKey, List[int]] = {}
+
+    def add(self, user_id: Optional[int], account_id: Optional[int], kind: str, files: int, nbytes: Optional[int]) -> None:
+        if user_id is None:
+            return
+        c = self._d.setdefault((user_id, account_id or 0, kind), [0, 0])
+        c[0] += files
+        c[1] += nbytes or 0
+
+    def add_attachment(self, row, sign: int = 1) -> None:
+        """Count (``sign=1``) or uncount (-1) an attachment row carrying the owner labels."""
+        self.add(row.owner_user_id, row.owner_account_id, "attachments", sign, sign * (row.size_bytes or 0))
+        if row.thumb_path:
+            self.add(row.owner_user_id, row.owner_account_id, "thumbnails", sign, sign * (row.thumb_size_bytes or 0))
+
+    def apply(self, db: Session) -> int:
+        """Add the changes to the counters in the caller's transaction; returns how many counters changed."""
+        rows = [
+            {"user_id": u, "account_id": a, "kind": k, "files": f, "bytes": b}
+            for (u, a, k), (f, b) in sorted(self._d.items())
+            if f or b
+        ]
+        self._d = {}
+        if not rows:
+            return 0
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as upsert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as upsert
+            t = StorageUsage.__table__
+            stmt = upsert(StorageUsage).values(rows)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[t.c.user_id, t.c.account_id, t.c.kind],
+                set_={"files": t.c.files + stmt.excluded.files, "bytes": t.c.bytes + stmt.excluded.bytes, "updated_at": func.now()},
+            ))
+            return len(rows)
+        for r in rows:
+            n = db.execute(
+                update(StorageUsage)
+                .where(StorageUsage.user_id == r["user_id"], StorageUsage.account_id == r["account_id"], StorageUsage.kind == r["kind"])
+                .values(files=StorageUsage.files + r["files"], bytes=StorageUsage.bytes + r["bytes"]),
+                execution_options={"synchronize_session": False},
+            ).rowcount
+            if not n:
+                db.execute(insert(StorageUsage), [r])
+        return len(rows)
+
+
+def used_bytes(db: Session, user_id: int) -> int:
+    return int(db.query(func.coalesce(func.sum(StorageUsage.bytes), 0)).filter(StorageUsage.user_id == user_id).scalar())
+
+
+def check_quota(db: Session, user_id: int, incoming_bytes: int = 0) -> None:
+    """413 if storing ``incoming_bytes`` more would take the user past STORAGE_QUOTA_MB (or it is already reached)."""
+    quota = quota_bytes()
+    if quota is None:
+        return
+    used = used_bytes(db, user_id)
+    if used >= quota or used + incoming_bytes > quota:
+        raise HTTPException(413, detail=f"Storage quota of {STORAGE_QUOTA_MB:g} MB exceeded ({used} bytes used)")
+
+
+def _counts(files: int = 0, nbytes: int = 0) -> dict:
+    return {"files": int(files), "bytes": int(nbytes)}
+
+
+def usage_out(db: Session, user_id: int) -> dict:
+    """The user's counters, totalled and broken down by kind and by account."""
+    rows = (
+        db.query(StorageUsage.account_id, StorageUsage.kind, StorageUsage.files, StorageUsage.bytes, Account.name)
+        .outerjoin(Account, Account.id == StorageUsage.account_id)
+        .filter(StorageUsage.user_id == user_id, (StorageUsage.files != 0) | (StorageUsage.bytes != 0))
+        .order_by(StorageUsage.account_id, StorageUsage.kind)
+        .all()
+    )
+    by_kind = {k: _counts() for k in KINDS}
+    accounts: Dict[int, dict] = {}
+    for r in rows:
+        kind = by_kind.setdefault(r.kind, _counts())
+        kind["files"] += r.files
+        kind["bytes"] += r.bytes
+        acc = accounts.setdefault(r.account_id, {
+            "account_id": r.account_id or None, "account_name": r.name, "files": 0, "bytes": 0, "by_kind": {},
+        })
+        acc["files"] += r.files
+        acc["bytes"] += r.bytes
+        acc["by_kind"][r.kind] = _counts(r.files, r.bytes)
+    return {
+        "files": sum(c["files"] for c in by_kind.values()),
+        "bytes": sum(c["bytes"] for c in by_kind.values()),
+        "quota_bytes": quota_bytes(),
+        "by_kind": by_kind,
+        "by_account": list(accounts.values()),
+    }
+
+
+def rebuild(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute the counters from the attachment and report rows (all users,
+    or ``user_ids``); returns how many counter rows were written. Runs in
+    the caller's transaction.
+    """
+    ids = None if user_ids is None else sorted(set(user_ids))
+    delta = UsageDelta()
+    groups = [
+        ("attachments", Attachment.size_bytes, ()),
+        ("thumbnails", Attachment.thumb_size_bytes, (Attachment.thumb_path.isnot(None),)),
+    ]
+    for kind, size, criteria in groups:
+        q = with_owner(db.query(OWNER_USER_ID, OWNER_ACCOUNT_ID, func.count(Attachment.id), func.sum(size))).filter(*criteria)
+        if ids is not None:
+            q = q.filter(OWNER_USER_ID.in_(ids))
+        for user_id, account_id, files, nbytes in q.group_by(OWNER_USER_ID, OWNER_ACCOUNT_ID):
+            delta.add(user_id, account_id, kind, files, nbytes)
+    q = db.query(ReportArtifact.user_id, func.count(ReportArtifact.id), func.sum(ReportArtifact.size_bytes))
+    if ids is not None:
+        q = q.filter(ReportArtifact.user_id.in_(ids))
+    for user_id, files, nbytes in q.group_by(ReportArtifact.user_id):
+        delta.add(user_id, 0, "reports", files, nbytes)
+
+    wipe = delete(StorageUsage)
+    if ids is not None:
+        wipe = wipe.where(StorageUsage.user_id.in_(ids))
+    db.execute(wipe, execution_options={"synchronize_session": False})
+    return delta.apply(db)
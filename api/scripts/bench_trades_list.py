@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /trades serialization at page sizes 50, 200 and 1000.
+
+This script:
+1. Creates a throwaway SQLite database and migrates it to head
+2. Seeds one user with N trades (default 5000)
+3. Times the trades-list query + serialization two ways:
+   - legacy: per-row TradeOut models, then response_model re-validation
+   - fast:   RowLayout row tuples -> JSON bytes (current list_trades path)
+4. Times end-to-end GET /trades requests through the TestClient
+
+Usage:
+    python scripts/bench_trades_list.py [--trades 5000] [--repeat 30]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Point the app at a scratch database before anything imports app.db
+_tmpdir = tempfile.mkdtemp(prefix="bench_trades_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault("ATTACH_BASE_DIR", os.path.join(_tmpdir, "uploads"))
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from alembic import command as alembic_command
+from alembic.config import Config as AlembicConfig
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from app.db import SessionLocal
+from app.main import app
+from app.models import Account, Instrument, Trade, User
+from app.routes_trades import _TRADE_LIST_LAYOUT, _filtered_trades_query
+from app.schemas import TradeOut
+
+PAGE_SIZES = (50, 200, 1000)
+
+
+def migrate():
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cfg = AlembicConfig(os.path.join(here, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(here, "alembic"))
+    alembic_command.upgrade(cfg, "head")
+
+
+def seed(client: TestClient, n_trades: int) -> Tuple[Dict[str, str], int]:
+    email, pwd = "bench@example.com", "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}).json()["access_token"]
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).one()
+        acct = Account(user_id=user.id, name="Bench", status="active")
+        inst = Instrument(symbol="EURUSD", asset_class="forex")
+        db.add_all([acct, inst]); db.flush()
+        t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        db.add_all([
+            Trade(
+                account_id=acct.id, instrument_id=inst.id, side="Buy",
+                qty_units=100000.0, entry_price=1.1, exit_price=1.1010,
+                open_time_utc=t0 + timedelta(minutes=i), close_time_utc=t0 + timedelta(minutes=i + 5),
+                net_pnl=100.0 - i % 200, external_trade_id=f"B{i}", trade_key=f"bench|{i}",
+                lot_size=1.0, pips=10.0, swap=-0.5, stop_loss=1.095, take_profit=1.11,
+            )
+            for i in range(n_trades)
+        ])
+        db.commit()
+        return {"Authorization": f"Bearer {tok}"}, user.id
+    finally:
+        db.close()
+
+
+def legacy_serialize(rows) -> bytes:
+    out: List[TradeOut] = []
+    for r in rows:
+        out.append(TradeOut(
+            id=r.id, account_name=r.account_name, symbol=r.symbol, asset_class=r.asset_class,
+            side=r.side, qty_units=r.qty_units, entry_price=r.entry_price, exit_price=r.exit_price,
+            open_time_utc=r.open_time_utc.isoformat() if r.open_time_utc else None,
+            close_time_utc=r.close_time_utc.isoformat() if r.close_time_utc else None,
+            net_pnl=r.net_pnl, external_trade_id=r.external_trade_id,
+            lot_size=float(r.lot_size) if r.lot_size else None,
+            pips=float(r.pips) if r.pips else None,
+            swap=float(r.swap) if r.swap else None,
+            stop_loss=float(r.stop_loss) if r.stop_loss else None,
+            take_profit=float(r.take_profit) if r.take_profit else None,
+            contracts=r.contracts,
+            ticks=float(r.ticks) if r.ticks else None,
+        ))
+    # FastAPI validates the returned objects against response_model before dumping
+    adapter = TypeAdapter(List[TradeOut])
+    return adapter.dump_json(adapter.validate_python([o.model_dump() for o in out]))
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return statistics.median(samples) * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--trades", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=30)
+    args = ap.parse_args()
+
+    migrate()
+    client = TestClient(app)
+    auth, user_id = seed(client, args.trades)
+
+    print(f"{args.trades} trades, median of {args.repeat} runs (ms)")
+    print(f"{'page':>6} {'legacy ser':>11} {'fast ser':>9} {'speedup':>8} {'GET /trades':>12}")
+    db = SessionLocal()
+    try:
+        for size in PAGE_SIZES:
+            rows = _filtered_trades_query(db, user_id).limit(size).all()
+            legacy = timed(lambda: legacy_serialize(rows), args.repeat)
+            fast = timed(lambda: _TRADE_LIST_LAYOUT.dumps(rows), args.repeat)
+            e2e = timed(lambda: client.get("/trades", params={"limit": size}, headers=auth), args.repeat)
+            print(f"{size:>6} {legacy:>11.2f} {fast:>9.2f} {legacy / fast:>7.1f}x {e2e:>12.2f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Reconcile attachment storage with the database and reclaim what is orphaned.
+
+This script:
+1. Removes attachment rows whose trade or journal day no longer exists
+2. Removes content blobs no attachment references
+3. Deletes files under ATTACH_BASE_DIR that no row references (older than --min-age-hours)
+
+The API runs the same sweep every ATTACH_SWEEP_INTERVAL_HOURS.
+
+Usage:
+    python scripts/sweep_attachments.py --dry-run
+    python scripts/sweep_attachments.py
+    # or via docker:
+    docker compose run --rm api python scripts/sweep_attachments.py
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routes_trades import ATTACH_BASE_DIR
+from app.storage_reclaimer import SWEEP_MIN_AGE_SECONDS, sweep_orphans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true", help="report what would be removed without changing anything")
+    parser.add_argument("--min-age-hours", type=float, default=SWEEP_MIN_AGE_SECONDS / 3600,
+                        help="leave unreferenced files younger than this alone")
+    args = parser.parse_args()
+
+    report = sweep_orphans(ATTACH_BASE_DIR, dry_run=args.dry_run, min_age_seconds=args.min_age_hours * 3600)
+    verb = "Would reclaim" if args.dry_run else "Reclaimed"
+    print(f"{verb} {report['bytes_reclaimed']} bytes in {report['files']} files under {ATTACH_BASE_DIR}")
+    print(f"  - {report['attachment_rows']} attachment rows without a trade/journal")
+    print(f"  - {report['blob_rows']} unreferenced blobs")
+
+
+if __name__ == "__main__":
+    main()
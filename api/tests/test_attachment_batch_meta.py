@@ -0,0 +1,59 @@
+import tempfile
+
+from fastapi.testclient import TestClient
+
+PDF = b"%PDF-1.4 batch-meta "
+
+
+def _login(client, email):
+    pwd = "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    return {"Authorization": f"Bearer {tok}"}
+
+
+def test_batch_meta_for_trades_and_journals(monkeypatch):
+    from app.main import app
+    import app.routes_journal as routes_journal
+    import app.routes_trades as routes_trades
+
+    base = tempfile.mkdtemp(prefix="ej_batchmeta_")
+    monkeypatch.setattr(routes_trades, "ATTACH_BASE_DIR", base)
+    monkeypatch.setattr(routes_journal, "ATTACH_BASE_DIR", base)
+    client = TestClient(app)
+    auth = _login(client, "batchmeta@example.com")
+
+    trade_ids = []
+    for day in ("2025-03-03", "2025-03-04", "2025-03-05"):
+        trade_ids.append(client.post("/trades", json={"account_name": "BM", "symbol": "EURUSD", "side": "Buy", "open_time": f"{day} 10:00:00",
+                                                       "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth).json()["id"])
+    jid = client.put("/journal/2025-03-03", json={"title": "bm", "notes_md": ""}, headers=auth).json()["id"]
+
+    def up(prefix, name):
+        return client.post(f"{prefix}/attachments", headers=auth, files={"file": (name, PDF + name.encode(), "application/pdf")}).json()["id"]
+
+    t0 = [up(f"/trades/{trade_ids[0]}", f"t0-{i}.pdf") for i in range(2)]
+    t1 = [up(f"/trades/{trade_ids[1]}", "t1.pdf")]
+    j0 = [up(f"/journal/{jid}", "j0.pdf")]
+    client.post(f"/trades/{trade_ids[0]}/attachments/reorder", json=list(reversed(t0)), headers=auth)
+
+    body = {"trade_ids": trade_ids + [10**9], "journal_ids": [jid]}
+    r = client.post("/attachments/batch-meta", json=body, headers=auth)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert set(data["trades"]) == {str(trade_ids[0]), str(trade_ids[1])}  # no attachments / unknown: absent
+    assert [a["id"] for a in data["trades"][str(trade_ids[0])]["items"]] == list(reversed(t0))
+    assert data["trades"][str(trade_ids[1])]["count"] == 1
+    assert [a["id"] for a in data["trades"][str(trade_ids[1])]["items"]] == t1
+    assert [a["id"] for a in data["journals"][str(jid)]["items"]] == j0
+    # Items match the per-owner listing
+    assert data["trades"][str(trade_ids[0])]["items"] == client.get(f"/trades/{trade_ids[0]}/attachments", headers=auth).json()
+
+    counts = client.post("/attachments/batch-meta", json={**body, "include_items": False}, headers=auth).json()
+    assert {k: v["count"] for k, v in counts["trades"].items()} == {str(trade_ids[0]): 2, str(trade_ids[1]): 1}
+    assert counts["journals"][str(jid)]["items"] == []
+
+    # Another user's ids yield nothing
+    other = _login(client, "batchmeta2@example.com")
+    assert client.post("/attachments/batch-meta", json=body, headers=other).json() == {"trades": {}, "journals": {}}
+    assert client.post("/attachments/batch-meta", json={"trade_ids": list(range(1001))}, headers=auth).status_code == 400
@@ -0,0 +1,62 @@
+import tempfile
+import time
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def test_attachment_conditional_get_range_and_thumb_caching(monkeypatch):
+    from app.main import app
+    import app.routes_trades as routes_trades
+
+    monkeypatch.setattr(routes_trades, "ATTACH_BASE_DIR", tempfile.mkdtemp(prefix="ej_cache_"))
+    client = TestClient(app)
+    email, pwd = "attcache@example.com", "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    auth = {"Authorization": f"Bearer {tok}"}
+    trade_id = client.post("/trades", json={"account_name": "CACHE", "symbol": "EURUSD", "side": "Buy", "open_time": "2025-02-25 10:00:00",
+                                            "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth).json()["id"]
+
+    buf = BytesIO()
+    Image.new("RGB", (400, 300), (200, 40, 40)).save(buf, format="PNG")
+    att = client.post(f"/trades/{trade_id}/attachments", headers=auth, files={"file": ("c.png", buf.getvalue(), "image/png")}).json()
+    for _ in range(50):
+        att = client.get(f"/trades/{trade_id}/attachments", headers=auth).json()[0]
+        if att["thumb_available"]:
+            break
+        time.sleep(0.1)
+    assert att["thumb_url"].startswith(f"/trades/{trade_id}/attachments/{att['id']}/thumb?v=")
+
+    # Original: strong ETag, revalidated with If-None-Match, byte ranges served
+    url = f"/trades/{trade_id}/attachments/{att['id']}/download"
+    r = client.get(url, headers=auth)
+    etag = r.headers["etag"]
+    assert r.status_code == 200 and not etag.startswith("W/") and r.headers["cache-control"] == "private, no-cache"
+    r304 = client.get(url, headers={**auth, "If-None-Match": etag})
+    assert r304.status_code == 304 and r304.content == b"" and r304.headers["etag"] == etag
+    part = client.get(url, headers={**auth, "Range": "bytes=0-7"})
+    assert part.status_code == 206 and part.content == r.content[:8]
+
+    # Versioned thumbnail URL is immutable; the bare one revalidates
+    t = client.get(att["thumb_url"], headers=auth)
+    assert t.status_code == 200 and "immutable" in t.headers["cache-control"]
+    assert client.get(att["thumb_url"], headers={**auth, "If-None-Match": t.headers["etag"]}).status_code == 304
+    bare = client.get(f"/trades/{trade_id}/attachments/{att['id']}/thumb", headers=auth)
+    assert bare.headers["cache-control"] == "private, no-cache"
+
+    # Renditions likewise: immutable only under the versioned preview_url
+    rend = client.get(att["preview_url"], headers=auth)
+    assert rend.status_code == 200 and "immutable" in rend.headers["cache-control"]
+    bare = client.get(f"/trades/{trade_id}/attachments/{att['id']}/rendition/preview", headers=auth)
+    assert bare.headers["cache-control"] == "private, no-cache"
+    assert client.get(f"/trades/{trade_id}/attachments/{att['id']}/rendition/preview",
+                      headers={**auth, "If-None-Match": rend.headers["etag"]}).status_code == 304
+
+    # Ownership is still enforced in the single lookup
+    client.post("/auth/register", json={"email": "attcache2@example.com", "password": pwd})
+    tok2 = client.post("/auth/login", data={"username": "attcache2@example.com", "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    assert client.get(url, headers={"Authorization": f"Bearer {tok2}", "If-None-Match": etag}).status_code == 404
@@ -8,8 +8,8 @@ from fastapi.testclient import TestClient
 # Minimal 1x1 PNG bytes (transparent)
 MIN_PNG = (
     b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01"
-    b"\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\x0bIDATx\x9cc``\x00\x00\x00\x02\x00\x01"
-    b"\xe2!\xbc3\x00\x00\x00\x00IEND\xaeB`\x82"
+    b"\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\rIDATx\x9cc````\x00\x00\x00\x05\x00\x01"
+    b"\xa5\xf6E@\x00\x00\x00\x00IEND\xaeB`\x82"
 )
 
 
@@ -82,8 +82,16 @@ def test_upload_png_and_thumb_and_download():
             pil_available = False
 
         if pil_available:
+            # Thumbnails are built off the request path; poll until ready
+            import time
+            for _ in range(50):
+                if att.get("thumb_available"):
+                    break
+                time.sleep(0.1)
+                listed = client.get(f"/trades/{trade_id}/attachments", headers=auth).json()
+                att = next(a for a in listed if a["id"] == att_id)
             assert att.get("thumb_available") is True
-            assert isinstance(att.get("thumb_url"), str) and att["thumb_url"].endswith("/thumb")
+            assert isinstance(att.get("thumb_url"), str) and att["thumb_url"].split("?")[0].endswith("/thumb")
             rt = client.get(f"/trades/{trade_id}/attachments/{att_id}/thumb", headers=auth)
             assert rt.status_code == 200
             ctype = rt.headers.get("content-type", "")
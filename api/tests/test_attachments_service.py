@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+from fastapi.testclient import TestClient
+
+
+def _client(monkeypatch):
+    from app.main import app
+    import app.routes_journal as routes_journal
+    import app.routes_trades as routes_trades
+
+    base = tempfile.mkdtemp(prefix="ej_attsvc_")
+    monkeypatch.setattr(routes_trades, "ATTACH_BASE_DIR", base)
+    monkeypatch.setattr(routes_journal, "ATTACH_BASE_DIR", base)
+    client = TestClient(app)
+    email, pwd = "attsvc@example.com", "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    return client, {"Authorization": f"Bearer {tok}"}, base
+
+
+def _upload(client, auth, prefix, name, content):
+    r = client.post(f"{prefix}/attachments", headers=auth, files={"file": (name, content, "application/pdf")})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_journal_attachments_reorder_and_batch_delete(monkeypatch):
+    client, auth, base = _client(monkeypatch)
+    jid = client.put("/journal/2025-02-11", json={"title": "svc", "notes_md": ""}, headers=auth).json()["id"]
+    prefix = f"/journal/{jid}"
+    atts = [_upload(client, auth, prefix, f"n{i}.pdf", b"%PDF-1.4 svc " + bytes([i])) for i in range(4)]
+    assert [a["sort_order"] for a in atts] == [1, 2, 3, 4]
+    ids = [a["id"] for a in atts]
+
+    new_order = [ids[2], ids[0], ids[3], ids[1]]
+    assert client.post(f"{prefix}/attachments/reorder", json=new_order, headers=auth).json() == {"reordered": 4}
+    listed = client.get(f"{prefix}/attachments", headers=auth).json()
+    assert [a["id"] for a in listed] == new_order
+    assert [a["sort_order"] for a in listed] == [0, 1, 2, 3]
+
+    # Ids of another owner are rejected without touching anything
+    r = client.post(f"{prefix}/attachments/reorder", json=[ids[0], 10**9], headers=auth)
+    assert r.status_code == 400
+
+    paths = []
+    from app.db import SessionLocal
+    from app.models import Attachment
+    from app import storage_reclaimer
+    db = SessionLocal()
+    try:
+        paths = [db.get(Attachment, i).storage_path for i in ids[:3]]
+    finally:
+        db.close()
+    r = client.post(f"{prefix}/attachments/batch-delete", json=ids[:3] + [10**9], headers=auth)
+    assert r.json() == {"deleted": 3}
+    assert [a["id"] for a in client.get(f"{prefix}/attachments", headers=auth).json()] == [ids[3]]
+    storage_reclaimer.reclaim_pending()
+    assert not any(os.path.exists(p) for p in paths)
+
+
+def test_upload_over_limit_is_rejected_and_not_kept(monkeypatch):
+    import app.routes_trades as routes_trades
+
+    client, auth, base = _client(monkeypatch)
+    monkeypatch.setattr(routes_trades, "ATTACH_MAX_MB", 0.001)  # ~1 KB
+    trade_id = client.post("/trades", json={"account_name": "SVC", "symbol": "EURUSD", "side": "Buy", "open_time": "2025-02-12 10:00:00",
+                                            "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth).json()["id"]
+    r = client.post(f"/trades/{trade_id}/attachments", headers=auth, files={"file": ("big.pdf", b"x" * 4096, "application/pdf")})
+    assert r.status_code == 413
+    staging = os.path.join(base, "blobs", "tmp")
+    assert not os.path.isdir(staging) or os.listdir(staging) == []
+    assert client.get(f"/trades/{trade_id}/attachments", headers=auth).json() == []
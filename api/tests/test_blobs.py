@@ -0,0 +1,79 @@
+import os
+import tempfile
+import time
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(color) -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", (640, 360), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_identical_uploads_share_one_blob(monkeypatch):
+    from app.main import app
+    from app.db import SessionLocal
+    from app.models import Attachment, AttachmentBlob
+    from app import storage_reclaimer
+    from app import image_jobs
+    import app.routes_journal as routes_journal
+    import app.routes_trades as routes_trades
+
+    base = tempfile.mkdtemp()
+    monkeypatch.setattr(routes_trades, "ATTACH_BASE_DIR", base)
+    monkeypatch.setattr(routes_journal, "ATTACH_BASE_DIR", base)
+    processed = []
+    real_run = image_jobs.run_image_job
+    monkeypatch.setattr(image_jobs, "run_image_job", lambda sha: (processed.append(sha), real_run(sha)))
+
+    client = TestClient(app)
+    email, pwd = "blobs@example.com", "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    auth = {"Authorization": f"Bearer {tok}"}
+    trade_id = client.post("/trades", json={"account_name": "BLOB", "symbol": "EURUSD", "side": "Buy", "open_time": "2025-01-08 10:00:00",
+                                            "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth).json()["id"]
+    jid = client.put("/journal/2025-01-08", json={"title": "blobs", "notes_md": ""}, headers=auth).json()["id"]
+
+    shot = _png((30, 160, 90))
+    a1 = client.post(f"/trades/{trade_id}/attachments", headers=auth, files={"file": ("chart.png", shot, "image/png")}).json()
+    for _ in range(50):
+        listed = client.get(f"/trades/{trade_id}/attachments", headers=auth).json()
+        if listed[0]["thumb_available"]:
+            break
+        time.sleep(0.1)
+    # Same bytes again (journal and a second copy on the trade): no new file, no re-processing
+    a2 = client.post(f"/journal/{jid}/attachments", headers=auth, files={"file": ("same.png", shot, "image/png")}).json()
+    a3 = client.post(f"/trades/{trade_id}/attachments", headers=auth, files={"file": ("again.png", shot, "image/png")}).json()
+    assert a2["thumb_available"] and a3["thumb_available"]
+    assert len(processed) == 1
+
+    db = SessionLocal()
+    try:
+        atts = [db.get(Attachment, a["id"]) for a in (a1, a2, a3)]
+        assert len({a.storage_path for a in atts}) == 1
+        assert len({a.blob_sha256 for a in atts}) == 1
+        blob = db.get(AttachmentBlob, atts[0].blob_sha256)
+        path, thumb = blob.storage_path, blob.thumb_path
+    finally:
+        db.close()
+    assert path.startswith(os.path.join(base, "blobs"))
+    assert client.get(f"/journal/{jid}/attachments/{a2['id']}/download", headers=auth).status_code == 200
+
+    # Files stay until the last reference is deleted
+    assert client.delete(f"/trades/{trade_id}/attachments/{a1['id']}", headers=auth).status_code == 200
+    assert client.post(f"/trades/{trade_id}/attachments/batch-delete", json=[a3["id"]], headers=auth).json() == {"deleted": 1}
+    assert os.path.exists(path) and os.path.exists(thumb)
+    assert client.delete(f"/journal/{jid}/attachments/{a2['id']}", headers=auth).status_code == 200
+    storage_reclaimer.reclaim_pending()
+    assert not os.path.exists(path) and not os.path.exists(thumb)
+    db = SessionLocal()
+    try:
+        assert db.get(AttachmentBlob, atts[0].blob_sha256) is None
+    finally:
+        db.close()
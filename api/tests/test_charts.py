@@ -0,0 +1,38 @@
+import sys
+import xml.etree.ElementTree as ET
+from datetime import date, datetime, timedelta
+from urllib.parse import unquote
+
+from app import charts
+
+
+def _series(n):
+    t0 = datetime(2024, 1, 1)
+    eq, out = 0.0, []
+    for i in range(n):
+        eq += (37 * i % 101) - 48
+        out.append((t0 + timedelta(hours=i), eq))
+    return out
+
+
+def test_equity_and_drawdown_svg_are_valid_and_downsampled():
+    series = _series(50000)
+    svg = charts.equity_curve_svg(series)
+    root = ET.fromstring(svg)
+    line = [p for p in root.iter("{http://www.w3.org/2000/svg}path") if p.get("stroke") == "#2563eb"][0]
+    # One vertex per pixel bucket (min + max), not one per trade
+    assert line.get("d").count("L") <= 2 * (charts.WIDTH) + 2
+    ET.fromstring(charts.drawdown_svg(series))
+    assert "matplotlib" not in sys.modules
+
+
+def test_daily_bars_and_data_uri():
+    days = [(date(2025, 3, d), float(v)) for d, v in [(3, 120), (4, -80), (5, 0), (6, 40)]]
+    svg = charts.daily_pnl_bars_svg(days)
+    root = ET.fromstring(svg)
+    fills = {p.get("fill") for p in root.iter("{http://www.w3.org/2000/svg}path")}
+    assert {"#16a34a", "#dc2626"} <= fills
+    uri = charts.svg_data_uri(svg)
+    assert uri.startswith("data:image/svg+xml;charset=utf-8,") and "#" not in uri and '"' not in uri
+    assert unquote(uri.split(",", 1)[1]) == svg
+    assert charts.svg_data_uri("") == "" and charts.equity_curve_svg([]) == ""
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+
+def _client(monkeypatch, day):
+    from app.main import app
+    from app import chunked_uploads
+    import app.routes_journal as routes_journal
+    import app.routes_trades as routes_trades
+
+    base = tempfile.mkdtemp(prefix="ej_chunked_")
+    monkeypatch.setattr(routes_trades, "ATTACH_BASE_DIR", base)
+    monkeypatch.setattr(routes_journal, "ATTACH_BASE_DIR", base)
+    monkeypatch.setattr(chunked_uploads, "UPLOAD_CHUNK_BYTES", 1024)
+    client = TestClient(app)
+    email, pwd = "chunked@example.com", "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    auth = {"Authorization": f"Bearer {tok}"}
+    trade_id = client.post("/trades", json={"account_name": "CHUNK", "symbol": "EURUSD", "side": "Buy", "open_time": f"{day} 10:00:00",
+                                            "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth).json()["id"]
+    return client, auth, base, trade_id
+
+
+def test_chunked_upload_resume_and_finalize(monkeypatch):
+    client, auth, base, trade_id = _client(monkeypatch, "2025-02-20")
+    content = b"%PDF-1.4\n" + os.urandom(2500)
+    prefix = f"/trades/{trade_id}/attachments/uploads"
+    r = client.post(prefix, json={"filename": "statement.pdf", "size_bytes": len(content), "content_type": "application/pdf",
+                                  "sha256": hashlib.sha256(content).hexdigest(), "caption": "broker"}, headers=auth)
+    assert r.status_code == 200, r.text
+    up = r.json()
+    assert (up["chunk_size"], up["chunk_count"], up["received"]) == (1024, 3, [])
+    chunks = [content[i:i + 1024] for i in range(0, len(content), 1024)]
+
+    # Out of order, with one retry; the last chunk is short
+    for i in (2, 0, 0):
+        r = client.put(f"{prefix}/{up['upload_id']}/chunks/{i}", content=chunks[i], headers=auth)
+        assert r.status_code == 200, r.text
+    assert client.get(f"{prefix}/{up['upload_id']}", headers=auth).json()["received"] == [0, 2]
+
+    # Finalize refuses an incomplete upload; wrong sizes and checksums are refused per chunk
+    assert client.post(f"{prefix}/{up['upload_id']}/finalize", headers=auth).status_code == 409
+    assert client.put(f"{prefix}/{up['upload_id']}/chunks/1", content=chunks[1] + b"x", headers=auth).status_code == 413
+    assert client.put(f"{prefix}/{up['upload_id']}/chunks/1", content=chunks[1][:-1], headers=auth).status_code == 400
+    bad = {**auth, "X-Chunk-Sha256": "0" * 64}
+    assert client.put(f"{prefix}/{up['upload_id']}/chunks/1", content=chunks[1], headers=bad).status_code == 400
+    ok = {**auth, "X-Chunk-Sha256": hashlib.sha256(chunks[1]).hexdigest()}
+    assert client.put(f"{prefix}/{up['upload_id']}/chunks/1", content=chunks[1], headers=ok).json()["received"] == [0, 1, 2]
+
+    att = client.post(f"{prefix}/{up['upload_id']}/finalize", headers=auth).json()
+    assert att["filename"] == "statement.pdf" and att["caption"] == "broker" and att["size_bytes"] == len(content)
+    assert client.get(f"/trades/{trade_id}/attachments/{att['id']}/download", headers=auth).content == content
+    # The upload is gone once attached
+    assert client.get(f"{prefix}/{up['upload_id']}", headers=auth).status_code == 404
+    assert os.listdir(os.path.join(base, "blobs", "uploads")) == []
+
+
+def test_chunked_upload_limits_and_ownership(monkeypatch):
+    from app import chunked_uploads
+
+    client, auth, base, trade_id = _client(monkeypatch, "2025-02-21")
+    prefix = f"/trades/{trade_id}/attachments/uploads"
+    monkeypatch.setattr(chunked_uploads, "ATTACH_UPLOAD_MAX_MB", 0.01)
+    assert client.post(prefix, json={"filename": "big.pdf", "size_bytes": 20000}, headers=auth).status_code == 413
+    assert client.post(prefix, json={"filename": "run.exe", "size_bytes": 10}, headers=auth).status_code == 400
+
+    content = b"%PDF-1.4 declared"
+    up = client.post(prefix, json={"filename": "x.pdf", "size_bytes": len(content), "sha256": "a" * 64}, headers=auth).json()
+    client.put(f"{prefix}/{up['upload_id']}/chunks/0", content=content, headers=auth)
+    assert client.post(f"{prefix}/{up['upload_id']}/finalize", headers=auth).status_code == 400
+    assert client.get(f"/trades/{trade_id}/attachments", headers=auth).json() == []
+
+    # Another trade (or journal) cannot see the upload; abort removes it
+    jid = client.put("/journal/2025-02-21", json={"title": "c", "notes_md": ""}, headers=auth).json()["id"]
+    assert client.get(f"/journal/{jid}/attachments/uploads/{up['upload_id']}", headers=auth).status_code == 404
+    assert client.get(f"{prefix}/..%2F..%2Fmanifest", headers=auth).status_code == 404
+    assert client.delete(f"{prefix}/{up['upload_id']}", headers=auth).json() == {"deleted": up["upload_id"]}
+    assert client.get(f"{prefix}/{up['upload_id']}", headers=auth).status_code == 404
+
+    # Stale uploads are swept by the next init
+    old = client.post(prefix, json={"filename": "old.pdf", "size_bytes": 5}, headers=auth).json()["upload_id"]
+    assert chunked_uploads.sweep_stale_uploads(base, now=time.time() + 2 * 86400) == 1
+    assert client.get(f"{prefix}/{old}", headers=auth).status_code == 404
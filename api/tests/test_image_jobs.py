@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from app.image_jobs import process_image, store_original
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def test_process_image_strips_exif_and_writes_thumb(tmp_path):
+    src = tmp_path / "shot.jpg"
+    exif = Image.Exif()
+    exif[0x010F] = "CameraMaker"  # Make
+    Image.new("RGB", (1200, 600), (10, 120, 200)).save(src, format="JPEG", exif=exif.tobytes())
+    assert Image.open(src).getexif()
+
+    thumb = process_image(str(src))
+
+    assert thumb == str(tmp_path / "thumbs" / "shot.jpg")
+    with Image.open(thumb) as t:
+        assert max(t.size) == 256
+    with Image.open(src) as im:
+        assert not im.getexif()
+        assert im.size == (1200, 600)
+    assert not os.path.exists(str(src) + ".part")
+
+
+def test_process_image_keeps_undecodable_original(tmp_path):
+    path = tmp_path / "broken.png"
+    store_original(str(path), b"\x89PNG not really")
+    assert process_image(str(path)) is None
+    assert path.read_bytes() == b"\x89PNG not really"
+    assert not os.path.exists(str(path) + ".part")
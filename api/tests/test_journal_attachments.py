@@ -1,4 +1,4 @@
-import os, shutil, tempfile, importlib
+import io, os, shutil, tempfile, importlib, zipfile
 from fastapi.testclient import TestClient
 
 
@@ -56,6 +56,13 @@ def test_journal_attachments_flow():
         # Download original
         rd = client.get(f"/journal/{jid}/attachments/{att_id}/download", headers=auth)
         assert rd.status_code == 200
+        # ZIP of selected attachments; PNGs are stored, not re-deflated
+        rz = client.post(f"/journal/{jid}/attachments/zip", json=[att_id], headers=auth)
+        assert rz.status_code == 200 and rz.headers["content-type"] == "application/zip"
+        zf = zipfile.ZipFile(io.BytesIO(rz.content))
+        assert zf.namelist() == ["tiny.png"]
+        assert zf.getinfo("tiny.png").compress_type == zipfile.ZIP_STORED
+        assert zf.read("tiny.png") == MIN_PNG
 
         # Delete journal by date
         rdel = client.delete(f"/journal/{d}", headers=auth)
@@ -58,3 +58,86 @@ def test_daily_journal_crud_and_links():
     assert r4.status_code == 200
     assert d in r4.json()
 
+
+
+def test_journal_range_fixed_queries():
+    from sqlalchemy import event
+    from app.db import engine
+
+    auth = auth_pair()
+    tpl = client.post("/playbooks/templates", json={"name": "PB-Range", "purpose": "pre", "schema": [
+        {"key": "ready", "label": "Ready", "type": "boolean", "required": True, "weight": 1},
+    ]}, headers=auth).json()
+    days = ["2025-06-02", "2025-06-03", "2025-06-04", "2025-06-06"]
+    for i, d in enumerate(days):
+        jid = client.put(f"/journal/{d}", json={"title": f"R{i}", "notes_md": ""}, headers=auth).json()["id"]
+        tids = [client.post("/trades", json={"account_name": "J-ACC", "symbol": "EURUSD", "side": "Buy", "open_time": f"{d} 1{h}:00:00",
+                                             "qty_units": 1.0, "entry_price": 1.2, "tz": "UTC"}, headers=auth).json()["id"]
+                for h in range(i % 2 + 1)]
+        client.post(f"/journal/{jid}/trades", json=tids, headers=auth)
+        if i % 2 == 0:
+            client.post(f"/journal/{d}/instrument/EURUSD/playbook-response", json={"template_id": tpl["id"], "values": {"ready": True}}, headers=auth)
+
+    assert client.get("/journal/range?start=2025-06-01&end=2025-06-01", headers=auth).json() == []
+    assert client.get("/journal/range?start=2025-06-05&end=2025-06-01", headers=auth).status_code == 400
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        r = client.get("/journal/range?start=2025-06-01&end=2025-06-30", headers=auth)
+        wide = len(statements)
+        statements.clear()
+        client.get("/journal/range?start=2025-06-02&end=2025-06-02", headers=auth)
+        narrow = len(statements)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert r.status_code == 200, r.text
+    assert wide == narrow
+
+    out = r.json()
+    assert [e["date"] for e in out] == days
+    for e in out:
+        single = client.get(f"/journal/{e['date']}", headers=auth).json()
+        assert e["id"] == single["id"] and sorted(e["trade_ids"]) == sorted(single["trade_ids"])
+        assert all(t["symbol"] == "EURUSD" for t in e["trades"])
+        assert e["attachment_count"] == 0
+    assert [len(e["trades"]) for e in out] == [1, 2, 1, 2]
+    assert [[c["computed_grade"] is not None for c in e["checklists"]] for e in out] == [[True], [], [True], []]
+    assert out[0]["checklists"][0]["symbol"] == "EURUSD"
+
+
+def test_journal_trade_links_diff_and_auto_link():
+    from app.db import SessionLocal
+    from app.models import User
+
+    auth = auth_pair()
+    db = SessionLocal()
+    try:
+        u = db.query(User).filter(User.email == "journal_user@example.com").first()
+        u.tz = "Australia/Sydney"
+        db.commit()
+    finally:
+        db.close()
+
+    def trade(open_time, close_time):
+        return client.post("/trades", json={"account_name": "J-ACC", "symbol": "EURUSD", "side": "Buy", "open_time": open_time,
+                                             "close_time": close_time, "qty_units": 1.0, "entry_price": 1.2, "tz": "UTC"}, headers=auth).json()["id"]
+
+    # 2025-07-01 20:30 UTC is 2025-07-02 06:30 in Sydney; 2025-07-02 15:00 UTC is already 07-03 there
+    in_day = [trade("2025-07-01 19:00:00", "2025-07-01 20:30:00"), trade("2025-07-02 01:00:00", "2025-07-02 03:00:00")]
+    next_day = trade("2025-07-02 14:00:00", "2025-07-02 15:00:00")
+    jid = client.put("/journal/2025-07-02", json={"title": "links", "notes_md": ""}, headers=auth).json()["id"]
+
+    r = client.post(f"/journal/{jid}/trades", json=[next_day, in_day[0], 10**9], headers=auth).json()
+    assert (set(r["trade_ids"]), r["added"], r["removed"]) == ({next_day, in_day[0]}, 2, 0)
+    r = client.post(f"/journal/{jid}/trades", json=[in_day[0]], headers=auth).json()
+    assert (r["trade_ids"], r["added"], r["removed"]) == ([in_day[0]], 0, 1)
+    r = client.post(f"/journal/{jid}/trades", json=[in_day[0]], headers=auth).json()
+    assert (r["added"], r["removed"]) == (0, 0)
+
+    # Auto-link keeps existing links and adds the rest of the local day's closed trades
+    r = client.post(f"/journal/{jid}/trades?auto_link=true", headers=auth).json()
+    assert (set(r["trade_ids"]), r["added"]) == (set(in_day), 1)
+    assert set(client.get("/journal/2025-07-02", headers=auth).json()["trade_ids"]) == set(in_day)
+    assert client.post(f"/journal/{jid}/trades", headers=auth).status_code == 400
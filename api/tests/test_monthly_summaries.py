@@ -0,0 +1,78 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db import SessionLocal
+from app.models import Account, MonthlySummary, User
+from app.monthly_summaries import PeriodSummary, load_month_summaries
+
+client = TestClient(app)
+
+
+def auth_user(email: str):
+    pwd = "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    db = SessionLocal()
+    try:
+        uid = db.query(User.id).filter(User.email == email).scalar()
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {tok}"}, uid
+
+
+def add_trade(auth, when: str, symbol: str, pnl):
+    r = client.post("/trades", json={"account_name": "MS-ACC", "symbol": symbol, "side": "Buy", "open_time": when,
+                                     "qty_units": 1, "entry_price": 1.1, "net_pnl": pnl, "tz": "UTC"}, headers=auth)
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def summaries(uid):
+    db = SessionLocal()
+    try:
+        out = load_month_summaries(db, uid, (2019, 1), (2019, 3))
+        stored = {(r.year, r.month) for r in db.query(MonthlySummary).join(Account, Account.id == MonthlySummary.account_id).filter(Account.user_id == uid)}
+        return out, stored
+    finally:
+        db.close()
+
+
+def test_month_summaries_stored_composed_and_invalidated():
+    auth, uid = auth_user("monthly_summaries@example.com")
+    t1 = add_trade(auth, "2019-01-07 09:00:00", "EURUSD", 100.0)
+    add_trade(auth, "2019-01-08 09:00:00", "GBPUSD", -40.0)
+    t3 = add_trade(auth, "2019-02-11 09:00:00", "EURUSD", 25.0)
+    add_trade(auth, "2019-02-12 09:00:00", "EURUSD", None)
+
+    out, stored = summaries(uid)
+    assert stored == {(2019, 1), (2019, 2), (2019, 3)}
+    total = PeriodSummary.merged(out.values())
+    m = total.metrics()
+    assert m["total_pnl"] == 85.0 and m["total_trades"] == 3 and m["winning_trades"] == 2
+    assert m["profit_factor"] == 3.12 and m["largest_loss"] == -40.0
+    assert total.trade_count == 4 and len(total.daily_pnl()) == 4
+    assert total.symbols["EURUSD"] == [3, 2, 2, 125.0]
+
+    # Editing a trade's P&L drops only its month; a notes edit drops nothing
+    client.patch(f"/trades/{t1}", json={"notes_md": "n"}, headers=auth)
+    assert summaries(uid)[1] == {(2019, 1), (2019, 2), (2019, 3)}
+    db = SessionLocal()
+    try:
+        acct = db.query(Account.id).filter(Account.user_id == uid).scalar()
+        db.query(MonthlySummary).filter(MonthlySummary.account_id == acct, MonthlySummary.month == 3).delete()
+        db.commit()
+    finally:
+        db.close()
+    client.patch(f"/trades/{t1}", json={"net_pnl": 10.0}, headers=auth)
+    db = SessionLocal()
+    try:
+        assert {r.month for r in db.query(MonthlySummary).filter(MonthlySummary.account_id == acct)} == {2}
+    finally:
+        db.close()
+    out, _ = summaries(uid)
+    assert PeriodSummary.merged(out.values()).metrics()["total_pnl"] == -5.0
+
+    # Set-based batch delete invalidates too
+    r = client.post("/trades/batch", json={"action": "delete", "items": [{"id": t3}]}, headers=auth)
+    assert r.status_code == 200, r.text
+    out, _ = summaries(uid)
+    assert PeriodSummary.merged(out.values()).metrics()["total_pnl"] == -30.0
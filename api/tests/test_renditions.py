@@ -0,0 +1,120 @@
+import os
+import tempfile
+
+import pytest
+
+from app import renditions, storage_reclaimer
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def test_print_rendition_downscales_and_caches(monkeypatch):
+    monkeypatch.setitem(renditions.RENDITION_SIZES, "print", 400)
+    d = tempfile.mkdtemp()
+    src = os.path.join(d, "shot.png")
+    Image.new("RGB", (1200, 800), (10, 120, 200)).save(src)
+
+    path, mime = renditions.print_rendition(src)
+    assert mime == "image/jpeg"
+    assert path == os.path.join(d, "renditions", "shot.print.jpg")
+    with Image.open(path) as im:
+        assert im.size == (400, 267)
+
+    # Served from cache on the next call
+    mtime = os.path.getmtime(path)
+    assert renditions.print_rendition(src) == (path, mime)
+    assert os.path.getmtime(path) == mtime
+
+
+def test_print_rendition_keeps_alpha_and_small_jpeg(monkeypatch):
+    monkeypatch.setitem(renditions.RENDITION_SIZES, "print", 400)
+    d = tempfile.mkdtemp()
+    src = os.path.join(d, "overlay.png")
+    Image.new("RGBA", (800, 800), (0, 0, 0, 0)).save(src)
+    path, mime = renditions.print_rendition(src)
+    assert mime == "image/png" and path.endswith("overlay.print.png")
+
+    small = os.path.join(d, "small.jpg")
+    Image.new("RGB", (300, 200)).save(small)
+    assert renditions.print_rendition(small) == (small, "image/jpeg")
+
+
+def test_rendition_endpoint_generates_tracks_and_cleans_up(monkeypatch):
+    from io import BytesIO
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.db import SessionLocal
+    from app.models import Attachment
+    import app.routes_trades as routes_trades
+
+    monkeypatch.setattr(routes_trades, "ATTACH_BASE_DIR", tempfile.mkdtemp())
+    client = TestClient(app)
+    email, pwd = "renditions@example.com", "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    auth = {"Authorization": f"Bearer {tok}"}
+    trade_id = client.post("/trades", json={"account_name": "REND", "symbol": "EURUSD", "side": "Buy", "open_time": "2025-01-07 10:00:00",
+                                            "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth).json()["id"]
+    buf = BytesIO()
+    Image.new("RGB", (2000, 1000), (200, 30, 30)).save(buf, format="PNG")
+    att_id = client.post(f"/trades/{trade_id}/attachments", headers=auth, files={"file": ("big.png", buf.getvalue(), "image/png")}).json()["id"]
+
+    assert client.get(f"/trades/{trade_id}/attachments/{att_id}/rendition/huge", headers=auth).status_code == 400
+    r = client.get(f"/trades/{trade_id}/attachments/{att_id}/rendition/preview", headers=auth)
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"] in ("image/webp", "image/jpeg")
+    # The bare path names no content: revalidate against the ETag
+    assert r.headers["cache-control"] == "private, no-cache"
+    assert client.get(f"/trades/{trade_id}/attachments/{att_id}/rendition/preview", headers={**auth, "If-None-Match": r.headers["etag"]}).status_code == 304
+    with Image.open(BytesIO(r.content)) as im:
+        assert im.size == (1024, 512)
+    # The versioned URL from the listing is immutable; a stale version is not
+    preview_url = client.get(f"/trades/{trade_id}/attachments", headers=auth).json()[0]["preview_url"]
+    assert preview_url.startswith(f"/trades/{trade_id}/attachments/{att_id}/rendition/preview?v=")
+    assert "immutable" in client.get(preview_url, headers=auth).headers["cache-control"]
+    stale = client.get(f"/trades/{trade_id}/attachments/{att_id}/rendition/preview?v=0000", headers=auth)
+    assert stale.headers["cache-control"] == "private, no-cache"
+
+    db = SessionLocal()
+    try:
+        a = db.get(Attachment, att_id)
+        path = renditions._tracked(a)["preview"]["path"]
+    finally:
+        db.close()
+    assert os.path.exists(path)
+    assert client.delete(f"/trades/{trade_id}/attachments/{att_id}", headers=auth).status_code == 200
+    storage_reclaimer.reclaim_pending()
+    assert not os.path.exists(path)
+
+
+def test_trade_export_full_evidence_embeds_renditions(monkeypatch):
+    from io import BytesIO
+    from fastapi.testclient import TestClient
+    from app.main import app
+    import app.routes_trades as routes_trades
+
+    monkeypatch.setattr(routes_trades, "ATTACH_BASE_DIR", tempfile.mkdtemp())
+    client = TestClient(app)
+    email, pwd = "renditions-export@example.com", "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    auth = {"Authorization": f"Bearer {tok}"}
+    trade_id = client.post("/trades", json={"account_name": "REND-EXP", "symbol": "EURUSD", "side": "Buy", "open_time": "2025-01-08 10:00:00",
+                                            "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth).json()["id"]
+    buf = BytesIO()
+    Image.new("RGB", (1600, 900), (30, 160, 60)).save(buf, format="PNG")
+    att_id = client.post(f"/trades/{trade_id}/attachments", headers=auth, files={"file": ("chart.png", buf.getvalue(), "image/png")}).json()["id"]
+
+    tpl = client.post("/playbooks/templates", json={"name": "PB-Rendition", "purpose": "post", "schema": [
+        {"key": "chart", "label": "Chart", "type": "text", "required": False, "weight": 1},
+    ]}, headers=auth).json()
+    resp = client.post(f"/trades/{trade_id}/playbook-responses", json={"template_id": tpl["id"], "values": {"chart": "see"}}, headers=auth).json()
+    r = client.post(f"/playbook-responses/{resp['id']}/evidence", json={"field_key": "chart", "source_kind": "trade", "source_id": att_id}, headers=auth)
+    assert r.status_code == 200, r.text
+
+    md = client.get(f"/trades/{trade_id}/export.md?evidence=full", headers=auth)
+    assert md.status_code == 200, md.text
+    assert "](data:image/" in md.text
+    html = client.get(f"/trades/{trade_id}/export.html?evidence=full", headers=auth)
+    assert html.status_code == 200, html.text
+    assert 'class="evi-img full"' in html.text and 'src="data:image/' in html.text
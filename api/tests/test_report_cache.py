@@ -0,0 +1,101 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app import report_cache, report_jobs
+from app.db import SessionLocal
+from app.models import User
+from app.schemas import ReportGenerateRequest
+import os
+import tempfile
+
+client = TestClient(app)
+
+
+def auth_user(email: str):
+    pwd = "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    db = SessionLocal()
+    try:
+        uid = db.query(User.id).filter(User.email == email).scalar()
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {tok}"}, uid
+
+
+def cache_key(uid: int, **overrides):
+    body = ReportGenerateRequest(**{"type": "monthly", "period": {"year": 2025, "month": 3}, "include_screenshots": False, **overrides})
+    db = SessionLocal()
+    try:
+        return report_cache.report_cache_key(db, uid, body)
+    finally:
+        db.close()
+
+
+def test_cache_key_tracks_data_version_and_options():
+    auth, uid = auth_user("cache_key@example.com")
+    k1 = cache_key(uid)
+    assert cache_key(uid) == k1
+    assert cache_key(uid, theme="dark")[0] != k1[0]
+
+    r = client.post("/trades", json={"account_name": "C", "symbol": "EURUSD", "side": "Buy", "open_time": "2025-03-03 08:00:00",
+                                     "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth)
+    assert r.status_code == 200, r.text
+    k2 = cache_key(uid)
+    assert k2[1] > k1[1] and k2[0] != k1[0]
+
+    client.patch(f"/trades/{r.json()['id']}", json={"notes_md": "changed"}, headers=auth)
+    assert cache_key(uid)[1] > k2[1]
+
+
+def test_cached_report_served_without_rendering(monkeypatch):
+    base = tempfile.mkdtemp()
+    monkeypatch.setattr(report_jobs, "REPORTS_BASE_DIR", base)
+    auth, uid = auth_user("cache_hit@example.com")
+    key, version = cache_key(uid)
+    report_cache.put_cached(uid, key, version, b"%PDF-cached", "application/pdf")
+
+    payload = {"type": "monthly", "period": {"year": 2025, "month": 3}, "include_screenshots": False}
+    r = client.post("/api/reports/generate", json=payload, headers=auth)
+    assert r.status_code == 200, r.text
+    assert r.headers["x-report-cache"] == "hit"
+    assert r.content == b"%PDF-cached"
+    # Still written to history
+    assert os.path.exists(os.path.join(base, str(uid), "reports", "monthly_report_2025_03.pdf"))
+    assert [h["filename"] for h in client.get("/api/reports/history", headers=auth).json()] == ["monthly_report_2025_03.pdf"]
+
+
+def test_stale_versions_pruned_and_quota_eviction(monkeypatch):
+    base = tempfile.mkdtemp()
+    monkeypatch.setattr(report_jobs, "REPORTS_BASE_DIR", base)
+    report_cache.put_cached(1, "a" * 64, 1, b"x" * 1000, "application/pdf")
+    report_cache.put_cached(1, "b" * 64, 2, b"x" * 1000, "application/zip")
+    names = os.listdir(report_cache.cache_dir(1))
+    assert names == ["2-" + "b" * 64 + ".zip"]
+    assert report_cache.get_cached(1, "b" * 64, 2) == (b"x" * 1000, "application/zip")
+
+    report_cache.put_cached(2, "c" * 64, 1, b"y" * 1000, "application/pdf")
+    os.utime(os.path.join(report_cache.cache_dir(1), names[0]), (1, 1))  # least recently used
+    freed = report_cache.evict_to_quota(max_bytes=1500)
+    assert freed == 1000
+    assert os.listdir(report_cache.cache_dir(1)) == []
+    assert report_cache.get_cached(2, "c" * 64, 1) is not None
+
+
+def test_stores_scan_all_users_only_past_quota(monkeypatch):
+    base = tempfile.mkdtemp()
+    monkeypatch.setattr(report_jobs, "REPORTS_BASE_DIR", base)
+    monkeypatch.setattr(report_cache, "REPORT_CACHE_MAX_MB", 2500 / (1024 * 1024))
+    scans = []
+    real_evict = report_cache.evict_to_quota
+    monkeypatch.setattr(report_cache, "evict_to_quota", lambda max_bytes=None: scans.append(1) or real_evict(max_bytes))
+
+    report_cache.put_cached(1, "a" * 64, 1, b"x" * 1000, "application/pdf")  # first store: size unknown
+    assert len(scans) == 1
+    report_cache.put_cached(2, "b" * 64, 1, b"x" * 1000, "application/pdf")
+    report_cache.put_cached(1, "c" * 64, 2, b"x" * 1000, "application/pdf")  # replaces user 1's stale entry
+    assert len(scans) == 1
+    os.utime(os.path.join(report_cache.cache_dir(2), "1-" + "b" * 64 + ".pdf"), (1, 1))
+    report_cache.put_cached(3, "d" * 64, 1, b"x" * 1000, "application/pdf")  # 3000 > 2500: evict
+    assert len(scans) == 2
+    assert os.listdir(report_cache.cache_dir(2)) == []
+    assert os.listdir(report_cache.cache_dir(1)) == ["2-" + "c" * 64 + ".pdf"]
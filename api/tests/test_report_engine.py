@@ -0,0 +1,42 @@
+from app import report_engine
+from app.report_engine import get_report_engine, warm_report_engine
+
+
+def test_engine_is_shared_and_templates_precompiled():
+    engine = get_report_engine()
+    assert get_report_engine() is engine
+    assert engine.jinja_env.auto_reload is False
+    for name in ("trade.html", "daily.html", "weekly.html", "monthly.html", "yearly.html", "alltime.html"):
+        assert engine.get_template(name) is engine.get_template(name)
+    html = engine.get_template("base.html").render({"theme": "dark"})
+    assert 'class="theme-dark"' in html
+
+
+def test_warm_up_never_raises(monkeypatch):
+    monkeypatch.setattr(report_engine, "REPORT_ENGINE_WARMUP", True)
+    warm_report_engine()  # logs and returns where WeasyPrint cannot load
+
+
+def test_stylesheet_is_parsed_once_per_process():
+    import threading
+
+    import pytest
+
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError):
+        pytest.skip("WeasyPrint native libraries unavailable")
+    engine = get_report_engine()
+    seen = []
+
+    def render_thread():
+        seen.append((engine._pdf_stylesheets(), engine._font_config()))
+
+    threads = [threading.Thread(target=render_thread) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    (css_a, fonts_a), (css_b, fonts_b) = seen
+    assert css_a is css_b is engine._pdf_stylesheets()
+    assert fonts_a is not fonts_b
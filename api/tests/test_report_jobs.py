@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+
+def _user_id(email):
+    from app.main import app
+    from app.db import SessionLocal
+    from app.models import User
+
+    client = TestClient(app)
+    client.post("/auth/register", json={"email": email, "password": "S3cretPwd!"})
+    db = SessionLocal()
+    try:
+        return db.query(User.id).filter(User.email == email).scalar()
+    finally:
+        db.close()
+
+
+def test_recover_jobs_fails_only_orphaned_running_jobs(monkeypatch):
+    from app.db import SessionLocal
+    from app.models import ReportJob
+    from app import report_jobs
+
+    uid = _user_id("jobs-recover@example.com")
+    now = datetime.now(timezone.utc)
+    stale = now - timedelta(seconds=report_jobs.REPORT_JOB_LEASE_SECONDS + 60)
+    db = SessionLocal()
+    rows = {
+        "sibling": ReportJob(status="running", worker_id="other-host:7", started_at=stale, heartbeat_at=now),
+        "expired": ReportJob(status="running", worker_id="other-host:8", started_at=stale, heartbeat_at=stale),
+        "own": ReportJob(status="running", worker_id=report_jobs.WORKER_ID, started_at=now, heartbeat_at=now),
+        "legacy": ReportJob(status="running", started_at=stale),
+        "queued": ReportJob(status="queued"),
+    }
+    for job in rows.values():
+        job.user_id, job.request_json = uid, "{}"
+    db.add_all(rows.values())
+    db.commit()
+    ids = {k: j.id for k, j in rows.items()}
+
+    dispatched = []
+    monkeypatch.setattr(report_jobs, "_dispatch", lambda job_id, background_tasks=None: dispatched.append(job_id))
+    report_jobs.recover_jobs()
+    db.expire_all()
+    status = {k: db.get(ReportJob, i).status for k, i in ids.items()}
+    # A live sibling process keeps its job; jobs whose worker is gone fail
+    assert status == {"sibling": "running", "expired": "failed", "own": "failed", "legacy": "failed", "queued": "queued"}
+    assert ids["queued"] in dispatched and ids["sibling"] not in dispatched
+    db.close()
+
+
+def test_run_job_claims_with_worker_and_heartbeat():
+    from app.db import SessionLocal
+    from app.models import ReportJob
+    from app import report_jobs
+    from app.schemas import ReportGenerateRequest
+
+    uid = _user_id("jobs-claim@example.com")
+    body = ReportGenerateRequest(type="monthly", period={"year": 2025, "month": 4})
+    db = SessionLocal()
+    job = ReportJob(user_id=uid, status="queued", request_json=body.model_dump_json())
+    db.add(job)
+    db.commit()
+    report_jobs.run_job(job.id, "api-host:42")
+    db.refresh(job)
+    assert job.status in ("done", "failed")  # failed where WeasyPrint cannot load
+    assert job.worker_id == "api-host:42" and job.heartbeat_at is not None
+    db.close()
+
+
+def test_job_workers_render_accounts_inline(monkeypatch):
+    import zipfile
+    from io import BytesIO
+
+    import pytest
+
+    from app import report_jobs
+
+    try:
+        from app import reports
+    except (ImportError, OSError):
+        pytest.skip("WeasyPrint native libraries unavailable")
+    monkeypatch.setattr(reports, "_accounts_inline", False)
+    monkeypatch.setattr(report_jobs, "warm_report_engine", lambda: None)
+    report_jobs._init_worker()
+    assert reports._accounts_inline is True
+
+    # Inside a job worker no nested per-account pool is started
+    def no_pool():
+        raise AssertionError("per-account pool started inside a report worker")
+
+    monkeypatch.setattr(reports, "REPORT_ACCOUNT_WORKERS", 4)
+    monkeypatch.setattr(reports, "_get_account_pool", no_pool)
+    monkeypatch.setattr(reports, "render_account_pdf", lambda user_id, report_type, account_id, params: b"%%PDF-1.4 %d" % account_id)
+    data = b"".join(reports.iter_separate_account_zip(1, "monthly", [(1, "A"), (2, "B")], {"year": 2025, "month": 4}))
+    assert zipfile.ZipFile(BytesIO(data)).namelist() == ["A_2025_04_monthly.pdf", "B_2025_04_monthly.pdf"]
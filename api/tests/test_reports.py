@@ -189,3 +189,139 @@ def test_metrics_calculation_with_trades():
     assert metrics["profit_factor"] == round(330.0 / 80.0, 2)  # sum(wins) / abs(sum(losses))
 
     db.close()
+
+
+def test_report_job_queue_lifecycle():
+    """Queued report jobs report status/progress and land in history."""
+    auth = register_and_login()
+
+    # Missing period fields are rejected up front, before queueing
+    r = client.post("/api/reports/jobs", json={"type": "monthly", "period": {}}, headers=auth)
+    assert r.status_code == 400
+
+    payload = {"type": "monthly", "period": {"year": 2025, "month": 1}, "include_screenshots": False}
+    r = client.post("/api/reports/jobs", json=payload, headers=auth)
+    assert r.status_code == 202
+    job = r.json()
+    assert job["report_type"] == "monthly" and job["status"] in ("queued", "running", "done")
+
+    import time
+    for _ in range(120):
+        p = client.get(f"/api/reports/jobs/{job['id']}/progress", headers=auth).json()
+        if p["status"] in ("done", "failed"):
+            break
+        time.sleep(0.5)
+    assert p["status"] == "done" and p["progress"] == 100
+
+    full = client.get(f"/api/reports/jobs/{job['id']}", headers=auth).json()
+    assert full["filename"] == "monthly_report_2025_01.pdf"
+    r = client.get(full["download_url"], headers=auth)
+    assert r.status_code == 200 and r.content[:4] == b"%PDF"
+    history = client.get("/api/reports/history", headers=auth).json()
+    assert any(h["filename"] == full["filename"] for h in history)
+
+    # Jobs are private to their owner
+    other = register_and_login()
+    assert client.get(f"/api/reports/jobs/{job['id']}", headers=other).status_code == 404
+
+
+def test_download_report_range_and_etag():
+    """Stored reports are served from disk with Range and If-None-Match support."""
+    import os
+    from app import report_jobs
+
+    auth = register_and_login()
+    user_id = client.get("/me", headers=auth).json()["id"]
+    reports_dir = report_jobs.user_reports_dir(user_id)
+    os.makedirs(reports_dir, exist_ok=True)
+    body = b"%PDF-1.7\n" + bytes(range(256)) * 64
+    with open(os.path.join(reports_dir, "monthly_report_2024_02.pdf"), "wb") as f:
+        f.write(body)
+
+    r = client.get("/api/reports/download/monthly_report_2024_02.pdf", headers=auth)
+    assert r.status_code == 200 and r.content == body
+    assert r.headers["content-type"] == "application/pdf"
+    assert r.headers["accept-ranges"] == "bytes"
+    etag = r.headers["etag"]
+
+    r = client.get("/api/reports/download/monthly_report_2024_02.pdf", headers={**auth, "Range": "bytes=9-99"})
+    assert r.status_code == 206
+    assert r.content == body[9:100]
+    assert r.headers["content-range"] == f"bytes 9-99/{len(body)}"
+
+    r = client.get("/api/reports/download/monthly_report_2024_02.pdf", headers={**auth, "If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert r.headers["etag"] == etag
+
+
+def test_report_history_index_paging_and_id_routes(monkeypatch, tmp_path):
+    """History is served from report_artifacts; reports are addressed by stable id."""
+    import hashlib
+    import os
+    from app import report_jobs
+    from app.schemas import ReportGenerateRequest
+
+    monkeypatch.setattr(report_jobs, "REPORTS_BASE_DIR", str(tmp_path))
+    auth = register_and_login()
+    user_id = client.get("/me", headers=auth).json()["id"]
+    ids = []
+    for month in (4, 5, 6):
+        body = ReportGenerateRequest(type="monthly", period={"year": 2023, "month": month})
+        content = b"%PDF-" + bytes([month]) * 500
+        ids.append(report_jobs.save_report(user_id, body, f"monthly_report_2023_{month:02d}.pdf", content, "application/pdf"))
+    # A file that is not a report never shows up
+    open(os.path.join(report_jobs.user_reports_dir(user_id), "notes.txt"), "w").close()
+
+    page1 = client.get("/api/reports/history?limit=2", headers=auth).json()
+    assert [h["id"] for h in page1] == [ids[2], ids[1]]
+    assert page1[0]["period"] == {"year": 2023, "month": 6}
+    assert page1[0]["checksum"] == hashlib.sha256(b"%PDF-" + b"\x06" * 500).hexdigest()
+    page2 = client.get(f"/api/reports/history?limit=2&before_id={page1[-1]['id']}", headers=auth).json()
+    assert [h["id"] for h in page2] == [ids[0]]
+
+    r = client.get(page1[0]["download_url"], headers=auth)
+    assert r.status_code == 200 and r.content == b"%PDF-" + b"\x06" * 500
+    assert r.headers["etag"] == f'"{page1[0]["checksum"]}"'
+
+    # Re-rendering the same report replaces its entry
+    body = ReportGenerateRequest(type="monthly", period={"year": 2023, "month": 6})
+    new_id = report_jobs.save_report(user_id, body, "monthly_report_2023_06.pdf", b"%PDF-new", "application/pdf")
+    history = client.get("/api/reports/history", headers=auth).json()
+    assert [h["id"] for h in history] == [new_id, ids[1], ids[0]]
+    assert client.get(f"/api/reports/history/{ids[2]}/download", headers=auth).status_code == 404
+
+    # Other users cannot see or delete it
+    other = register_and_login()
+    assert client.get(f"/api/reports/history/{new_id}/download", headers=other).status_code == 404
+    assert client.delete(f"/api/reports/history/{new_id}", headers=other).status_code == 404
+
+    assert client.delete(f"/api/reports/history/{new_id}", headers=auth).status_code == 200
+    assert not os.path.exists(os.path.join(report_jobs.user_reports_dir(user_id), "monthly_report_2023_06.pdf"))
+    assert [h["id"] for h in client.get("/api/reports/history", headers=auth).json()] == [ids[1], ids[0]]
+    # Legacy filename delete also drops the index entry
+    assert client.delete("/api/reports/monthly_report_2023_05.pdf", headers=auth).status_code == 200
+    assert [h["id"] for h in client.get("/api/reports/history", headers=auth).json()] == [ids[0]]
+
+
+def test_report_history_imports_legacy_files(monkeypatch, tmp_path):
+    """Files written before the index existed are imported on first listing."""
+    import os
+    from app import report_jobs
+
+    monkeypatch.setattr(report_jobs, "REPORTS_BASE_DIR", str(tmp_path))
+    auth = register_and_login()
+    user_id = client.get("/me", headers=auth).json()["id"]
+    d = report_jobs.user_reports_dir(user_id)
+    os.makedirs(d, exist_ok=True)
+    with open(os.path.join(d, "yearly_report_2022.pdf"), "wb") as f:
+        f.write(b"%PDF-legacy")
+    with open(os.path.join(d, "monthly_report_2022_01.zip"), "wb") as f:
+        f.write(b"PK-legacy")
+
+    history = client.get("/api/reports/history", headers=auth).json()
+    assert sorted((h["filename"], h["report_type"], h["content_type"]) for h in history) == [
+        ("monthly_report_2022_01.zip", "monthly", "application/zip"),
+        ("yearly_report_2022.pdf", "yearly", "application/pdf"),
+    ]
+    assert os.path.exists(os.path.join(d, ".indexed"))
+    assert len(client.get("/api/reports/history", headers=auth).json()) == 2
@@ -0,0 +1,80 @@
+from fastapi.testclient import TestClient
+from app.main import app
+import json
+
+client = TestClient(app)
+
+
+def auth_pair(email: str):
+    pwd = "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    return {"Authorization": f"Bearer {tok}"}
+
+
+def make_trade(auth, day: str, notes: str = None):
+    body = {
+        "account_name": "S-ACC",
+        "symbol": "EURUSD",
+        "side": "Buy",
+        "open_time": f"{day} 08:00:00",
+        "qty_units": 1.0,
+        "entry_price": 1.23456,
+        "tz": "UTC",
+        "notes_md": notes,
+    }
+    r = client.post("/trades", json=body, headers=auth)
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def test_search_trades_and_journal_with_highlights():
+    auth = auth_pair("search_user@example.com")
+    t1 = make_trade(auth, "2025-06-02", notes="Clean breakout above the asian range")
+    t2 = make_trade(auth, "2025-06-03", notes="Chased the move, no setup")
+    # post-analysis is indexed too (update trigger keeps the index in sync)
+    r = client.patch(f"/trades/{t2}", json={"post_analysis_md": "Should have waited for the breakout retest"}, headers=auth)
+    assert r.status_code == 200, r.text
+    r = client.put("/journal/2025-06-02", json={"title": "Breakout day", "notes_md": "Patience <paid> off"}, headers=auth)
+    assert r.status_code == 200, r.text
+    jid = r.json()["id"]
+
+    r = client.get("/search", params={"q": "breakout"}, headers=auth)
+    assert r.status_code == 200, r.text
+    hits = r.json()
+    assert {(h["kind"], h["id"]) for h in hits} == {("trade", t1), ("trade", t2), ("journal", jid)}
+    assert all("<mark>" in h["snippet"] for h in hits)
+
+    # Prefix match, every word required
+    r = client.get("/search", params={"q": "break ret", "kind": "trade"}, headers=auth)
+    assert [h["id"] for h in r.json()] == [t2]
+
+    # Snippets are HTML-escaped
+    r = client.get("/search", params={"q": "patience", "kind": "journal"}, headers=auth)
+    hits = r.json()
+    assert len(hits) == 1 and "&lt;paid&gt;" in hits[0]["snippet"]
+
+    # Bad kind
+    r = client.get("/search", params={"q": "x", "kind": "nope"}, headers=auth)
+    assert r.status_code == 400
+
+    # Another user's notes are never returned
+    other = auth_pair("search_other@example.com")
+    r = client.get("/search", params={"q": "breakout"}, headers=other)
+    assert r.status_code == 200 and r.json() == []
+
+
+def test_filter_dsl_text_operator():
+    auth = auth_pair("search_filter@example.com")
+    t1 = make_trade(auth, "2025-07-01", notes="Faded the London open")
+    make_trade(auth, "2025-07-02", notes="Trend continuation")
+
+    dsl = {"operator": "AND", "conditions": [{"field": "notes", "op": "text", "value": "london"}]}
+    r = client.get("/trades", params={"filters": json.dumps(dsl)}, headers=auth)
+    assert r.status_code == 200, r.text
+    assert [t["id"] for t in r.json()] == [t1]
+
+    # 'text' is only valid on the notes fields
+    dsl = {"operator": "AND", "conditions": [{"field": "symbol", "op": "text", "value": "eur"}]}
+    r = client.get("/trades", params={"filters": json.dumps(dsl)}, headers=auth)
+    assert r.status_code == 400
@@ -0,0 +1,94 @@
+import os
+import tempfile
+
+from fastapi.testclient import TestClient
+
+
+def _login(client, email):
+    pwd = "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    return {"Authorization": f"Bearer {tok}"}
+
+
+def test_trade_delete_logs_files_for_reclaimer(monkeypatch):
+    from app.main import app
+    from app.db import SessionLocal
+    from app.models import Attachment, FileDeletion
+    from app import storage_reclaimer
+    import app.routes_trades as routes_trades
+
+    monkeypatch.setattr(routes_trades, "ATTACH_BASE_DIR", tempfile.mkdtemp(prefix="ej_reclaim_"))
+    client = TestClient(app)
+    auth = _login(client, "reclaim@example.com")
+    trade_id = client.post("/trades", json={"account_name": "RECLAIM", "symbol": "EURUSD", "side": "Buy", "open_time": "2025-03-03 10:00:00",
+                                            "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth).json()["id"]
+    att = client.post(f"/trades/{trade_id}/attachments", headers=auth, files={"file": ("s.pdf", b"%PDF-1.4 reclaim me", "application/pdf")}).json()
+    db = SessionLocal()
+    path = db.query(Attachment.storage_path).filter(Attachment.id == att["id"]).scalar()
+    assert os.path.exists(path)
+
+    # Deleting the trade drops its attachments too; the file goes in the background
+    assert client.delete(f"/trades/{trade_id}", headers=auth).status_code == 200
+    assert db.query(Attachment).filter(Attachment.id == att["id"]).count() == 0
+    storage_reclaimer.reclaim_pending()
+    assert not os.path.exists(path)
+    assert db.query(FileDeletion).filter(FileDeletion.path == path).count() == 0
+    db.close()
+
+
+def test_reclaimer_retries_failures_and_tolerates_missing_files():
+    from app.db import SessionLocal
+    from app.models import FileDeletion
+    from app import storage_reclaimer
+
+    base = tempfile.mkdtemp(prefix="ej_reclaim_")
+    gone, blocked = os.path.join(base, "gone.bin"), os.path.join(base, "dir")
+    open(gone, "wb").write(b"x")
+    os.makedirs(os.path.join(blocked, "child"))  # os.remove fails on a directory
+    db = SessionLocal()
+    storage_reclaimer.log_deletions(db, [gone, blocked, os.path.join(base, "already-missing")])
+    db.commit()
+    storage_reclaimer.reclaim_pending()
+    assert not os.path.exists(gone)
+    left = db.query(FileDeletion).filter(FileDeletion.path.like(base + "%")).all()
+    assert [(r.path, r.attempts) for r in left] == [(blocked, 1)] and left[0].last_error
+    db.close()
+
+
+def test_sweep_reconciles_storage_with_attachments(monkeypatch):
+    from app.main import app
+    from app.db import SessionLocal
+    from app.models import Attachment, Trade
+    from app import storage_reclaimer
+    import app.routes_trades as routes_trades
+
+    base = tempfile.mkdtemp(prefix="ej_sweep_")
+    monkeypatch.setattr(routes_trades, "ATTACH_BASE_DIR", base)
+    client = TestClient(app)
+    auth = _login(client, "sweep@example.com")
+    ids = [client.post("/trades", json={"account_name": "SWEEP", "symbol": "EURUSD", "side": "Buy", "open_time": f"2025-03-0{d} 10:00:00",
+                                        "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth).json()["id"] for d in (4, 5)]
+    kept = client.post(f"/trades/{ids[0]}/attachments", headers=auth, files={"file": ("k.pdf", b"%PDF-1.4 keep", "application/pdf")}).json()
+    lost = client.post(f"/trades/{ids[1]}/attachments", headers=auth, files={"file": ("l.pdf", b"%PDF-1.4 dangling", "application/pdf")}).json()
+    stray = os.path.join(base, "stray.bin")
+    open(stray, "wb").write(b"0123456789")
+
+    # A trade removed behind the API's back leaves its attachment dangling
+    db = SessionLocal()
+    db.query(Trade).filter(Trade.id == ids[1]).delete()
+    db.commit()
+    kept_path, lost_path = (db.query(Attachment.storage_path).filter(Attachment.id == a["id"]).scalar() for a in (kept, lost))
+
+    dry = storage_reclaimer.sweep_orphans(base, dry_run=True, min_age_seconds=0)
+    assert dry["attachment_rows"] == 1 and dry["files"] == 1 and dry["bytes_reclaimed"] == 10
+    assert os.path.exists(stray) and db.query(Attachment).filter(Attachment.id == lost["id"]).count() == 1
+
+    # Fresh files are left alone; old enough ones are reclaimed and counted
+    assert storage_reclaimer.sweep_orphans(base)["files"] == 0
+    report = storage_reclaimer.sweep_orphans(base, min_age_seconds=0)
+    assert report["files"] >= 1 and report["bytes_reclaimed"] >= 10
+    assert not os.path.exists(stray) and not os.path.exists(lost_path) and os.path.exists(kept_path)
+    assert db.query(Attachment).filter(Attachment.id == lost["id"]).count() == 0
+    assert client.get(f"/trades/{ids[0]}/attachments/{kept['id']}/download", headers=auth).content == b"%PDF-1.4 keep"
+    db.close()
@@ -0,0 +1,118 @@
+import tempfile
+import time
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _client(monkeypatch, email):
+    from app.main import app
+    import app.routes_journal as routes_journal
+    import app.routes_trades as routes_trades
+
+    base = tempfile.mkdtemp(prefix="ej_usage_")
+    monkeypatch.setattr(routes_trades, "ATTACH_BASE_DIR", base)
+    monkeypatch.setattr(routes_journal, "ATTACH_BASE_DIR", base)
+    client = TestClient(app)
+    pwd = "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    auth = {"Authorization": f"Bearer {tok}"}
+    return client, auth
+
+
+def _trade(client, auth, account, when):
+    return client.post("/trades", json={"account_name": account, "symbol": "EURUSD", "side": "Buy", "open_time": when,
+                                        "qty_units": 1, "entry_price": 1.1, "tz": "UTC"}, headers=auth).json()["id"]
+
+
+def _pdf(client, auth, prefix, body):
+    r = client.post(f"{prefix}/attachments", headers=auth, files={"file": ("s.pdf", body, "application/pdf")})
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def test_usage_counters_follow_uploads_and_deletes(monkeypatch):
+    from app.db import SessionLocal
+    from app import storage_usage
+    from app.models import User
+    from app.report_jobs import record_artifact
+    from app.schemas import ReportGenerateRequest
+
+    client, auth = _client(monkeypatch, "usage@example.com")
+    t1 = _trade(client, auth, "USAGE-A", "2025-04-01 10:00:00")
+    t2 = _trade(client, auth, "USAGE-B", "2025-04-02 10:00:00")
+    jid = client.put("/journal/2025-04-01", json={"title": "u", "notes_md": ""}, headers=auth).json()["id"]
+    a1 = _pdf(client, auth, f"/trades/{t1}", b"%PDF-1.4 " + b"a" * 91)   # 100 bytes
+    _pdf(client, auth, f"/trades/{t1}", b"%PDF-1.4 " + b"b" * 191)       # 200
+    _pdf(client, auth, f"/trades/{t2}", b"%PDF-1.4 " + b"a" * 91)        # same content as a1: still counted
+    _pdf(client, auth, f"/journal/{jid}", b"%PDF-1.4 " + b"c" * 41)      # 50, no account
+
+    u = client.get("/storage/usage", headers=auth).json()
+    assert (u["files"], u["bytes"], u["quota_bytes"]) == (4, 450, None)
+    assert u["by_kind"]["attachments"] == {"files": 4, "bytes": 450}
+    assert u["by_kind"]["reports"] == {"files": 0, "bytes": 0}
+    per_account = {a["account_name"]: (a["files"], a["bytes"]) for a in u["by_account"]}
+    assert per_account == {"USAGE-A": (2, 300), "USAGE-B": (1, 100), None: (1, 50)}
+
+    # Single delete, trade delete
+    client.delete(f"/trades/{t1}/attachments/{a1}", headers=auth)
+    client.delete(f"/trades/{t2}", headers=auth)
+    u = client.get("/storage/usage", headers=auth).json()
+    assert (u["files"], u["bytes"]) == (2, 250)
+    assert {a["account_name"]: a["bytes"] for a in u["by_account"]} == {"USAGE-A": 200, None: 50}
+
+    # Reports: a re-render of the same file replaces its size; deleting it uncounts it
+    db = SessionLocal()
+    uid = db.query(User.id).filter(User.email == "usage@example.com").scalar()
+    body = ReportGenerateRequest(type="monthly", period={"year": 2025, "month": 4})
+    record_artifact(uid, body, "monthly_report_2025_04.pdf", "application/pdf", 700, "0" * 64)
+    art = record_artifact(uid, body, "monthly_report_2025_04.pdf", "application/pdf", 900, "1" * 64)
+    assert client.get("/storage/usage", headers=auth).json()["by_kind"]["reports"] == {"files": 1, "bytes": 900}
+    client.delete(f"/api/reports/history/{art}", headers=auth)
+    u = client.get("/storage/usage", headers=auth).json()
+    assert u["by_kind"]["reports"] == {"files": 0, "bytes": 0} and u["bytes"] == 250
+
+    # The incremental counters agree with a recount from the rows
+    storage_usage.rebuild(db, [uid])
+    db.commit()
+    recounted = client.get("/storage/usage", headers=auth).json()
+    assert recounted == u
+    db.close()
+
+
+def test_image_thumbnails_are_counted(monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    client, auth = _client(monkeypatch, "usage-img@example.com")
+    t = _trade(client, auth, "USAGE-IMG", "2025-04-03 10:00:00")
+    buf = BytesIO()
+    Image.new("RGB", (600, 400), (10, 120, 200)).save(buf, format="PNG")
+    client.post(f"/trades/{t}/attachments", headers=auth, files={"file": ("chart.png", buf.getvalue(), "image/png")})
+    for _ in range(50):
+        att = client.get(f"/trades/{t}/attachments", headers=auth).json()[0]
+        if att["thumb_available"]:
+            break
+        time.sleep(0.1)
+    u = client.get("/storage/usage", headers=auth).json()
+    assert u["by_kind"]["thumbnails"]["files"] == 1 and u["by_kind"]["thumbnails"]["bytes"] > 0
+    # The original is counted at its stored (normalised) size
+    assert u["by_kind"]["attachments"] == {"files": 1, "bytes": att["size_bytes"]}
+
+
+def test_quota_refuses_uploads_without_scanning(monkeypatch):
+    from app import storage_usage
+
+    client, auth = _client(monkeypatch, "usage-quota@example.com")
+    t = _trade(client, auth, "USAGE-Q", "2025-04-04 10:00:00")
+    monkeypatch.setattr(storage_usage, "STORAGE_QUOTA_MB", 300 / (1024 * 1024))  # 300 bytes
+    _pdf(client, auth, f"/trades/{t}", b"%PDF-1.4 " + b"q" * 191)  # 200
+    r = client.post(f"/trades/{t}/attachments", headers=auth, files={"file": ("big.pdf", b"%PDF-1.4 " + b"x" * 191, "application/pdf")})
+    assert r.status_code == 413 and "quota" in r.json()["detail"]
+    r = client.post(f"/trades/{t}/attachments/uploads", json={"filename": "big.pdf", "size_bytes": 101}, headers=auth)
+    assert r.status_code == 413
+    # Exactly filling the quota is allowed; after that even report renders are refused
+    _pdf(client, auth, f"/trades/{t}", b"%PDF-1.4 " + b"y" * 91)
+    u = client.get("/storage/usage", headers=auth).json()
+    assert (u["bytes"], u["quota_bytes"]) == (300, 300)
+    assert client.post("/api/reports/jobs", json={"type": "monthly", "period": {"year": 2025, "month": 4}}, headers=auth).status_code == 413
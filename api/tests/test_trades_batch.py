@@ -0,0 +1,111 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def auth_pair(email: str):
+    pwd = "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    return {"Authorization": f"Bearer {tok}"}
+
+
+def make_trade(auth, hour: int, symbol: str = "EURUSD", day: str = "2025-08-04"):
+    body = {
+        "account_name": "B-ACC",
+        "symbol": symbol,
+        "side": "Buy",
+        "open_time": f"{day} {hour:02d}:00:00",
+        "close_time": f"{day} {hour:02d}:30:00",
+        "qty_units": 1.0,
+        "entry_price": 1.1,
+        "exit_price": 1.2,
+        "fees": 1.0,
+        "net_pnl": 10.0,
+        "tz": "UTC",
+    }
+    r = client.post("/trades", json=body, headers=auth)
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def test_batch_update_items_and_undo():
+    auth = auth_pair("batch_update@example.com")
+    t1, t2 = make_trade(auth, 8), make_trade(auth, 9)
+    other = auth_pair("batch_other@example.com")
+    foreign = make_trade(other, 10, day="2025-08-05")
+
+    r = client.post("/trades/batch", json={"items": [
+        {"id": t1, "patch": {"reviewed": True, "fees": 2.5}},
+        {"id": t2, "patch": {"reviewed": True, "fees": 2.5}},
+        {"id": foreign, "patch": {"reviewed": True}},
+    ]}, headers=auth)
+    assert r.status_code == 200, r.text
+    out = r.json()
+    assert (out["updated"], out["not_found"]) == (2, 1)
+    by_id = {x["id"]: x for x in out["results"]}
+    assert by_id[foreign]["status"] == "not_found"
+    assert by_id[t1]["undo"] == {"id": t1, "patch": {"reviewed": False, "fees": 1.0}}
+
+    d = client.get(f"/trades/{t1}", headers=auth).json()
+    assert d["reviewed"] is True
+    # Other user's trade untouched
+    assert client.get(f"/trades/{foreign}", headers=other).json()["reviewed"] is False
+
+    # Undo payloads feed straight back into the batch endpoint
+    undo = [x["undo"] for x in out["results"] if x["status"] == "updated"]
+    r = client.post("/trades/batch", json={"items": undo}, headers=auth)
+    assert r.status_code == 200 and r.json()["updated"] == 2
+    assert client.get(f"/trades/{t1}", headers=auth).json()["reviewed"] is False
+
+
+def test_batch_filter_update_and_delete():
+    auth = auth_pair("batch_filter@example.com")
+    ids = [make_trade(auth, h, symbol="GBPUSD") for h in range(3)]
+    keep = make_trade(auth, 5, symbol="USDJPY")
+    dsl = {"operator": "AND", "conditions": [{"field": "symbol", "op": "eq", "value": "GBPUSD"}]}
+
+    r = client.post("/trades/batch", json={"filters": dsl, "patch": {"reviewed": True}}, headers=auth)
+    assert r.status_code == 200, r.text
+    assert r.json()["updated"] == 3
+
+    r = client.post("/trades/batch", json={"action": "delete", "filters": dsl}, headers=auth)
+    assert r.status_code == 200, r.text
+    out = r.json()
+    assert out["deleted"] == 3
+    assert all(x["undo"]["symbol"] == "GBPUSD" for x in out["results"])
+    remaining = [t["id"] for t in client.get("/trades", headers=auth).json()]
+    assert keep in remaining and not set(ids) & set(remaining)
+
+    # Restore payload recreates the trade
+    r = client.post("/trades", json=out["results"][0]["undo"], headers=auth)
+    assert r.status_code == 200, r.text
+
+    assert client.post("/trades/batch", json={"patch": {"reviewed": True}}, headers=auth).status_code == 400
+    # A filter that matches everything is refused, never "all trades"
+    for empty in ({}, {"conditions": []}, {"operator": "OR", "conditions": [{"operator": "AND", "conditions": []}]}):
+        r = client.post("/trades/batch", json={"action": "delete", "filters": empty}, headers=auth)
+        assert r.status_code == 400, r.text
+    assert keep in [t["id"] for t in client.get("/trades", headers=auth).json()]
+    assert client.post("/trades/batch", json={"items": [{"id": keep}]}, headers=auth).status_code == 400
+
+
+def test_batch_enforcement_once_per_account_day():
+    auth = auth_pair("batch_enforce@example.com")
+    client.put("/settings/trading-rules", headers=auth, json={
+        "max_losses_row_day": 2,
+        "max_losing_days_streak_week": 5,
+        "max_losing_weeks_streak_month": 5,
+        "alerts_enabled": True,
+        "enforcement_mode": "block",
+    })
+    ids = [make_trade(auth, h, day="2025-08-06") for h in (8, 9, 10)]
+    r = client.post("/trades/batch", json={"items": [{"id": i, "patch": {"net_pnl": -5.0}} for i in ids]}, headers=auth)
+    assert r.status_code == 200, r.text
+    out = r.json()
+    # The edit is retroactive: applied, with one breach for the single account-day
+    assert out["updated"] == 3
+    assert out["breaches"] == ["max_losses_row_day"]
+    breaches = client.get("/breaches", headers=auth).json()
+    assert len([b for b in breaches if b["rule_key"] == "loss_streak_day"]) == 1
@@ -102,3 +102,63 @@ def test_trades_list_with_filters():
     assert r4.status_code == 200, r4.text
     items = r4.json()
     assert len(items) >= 2  # At least Demo trades or high pnl trades
+
+
+def test_trades_typeahead_ranked_by_prefix_and_frequency():
+    email = "typeahead_user@example.com"; pwd = "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    auth = {"Authorization": f"Bearer {tok}"}
+    rows = [
+        ["Account","Symbol","Side","Open Time","Close Time","Volume","Entry Price","Exit Price","Commission","Profit","Ticket","Comment"],
+        ["TA-Main","EURUSD","Buy","2025-05-01 08:00:00","2025-05-01 09:00:00","1.00","1.10000","1.10100","-2.00","80.00","TA1",""],
+        ["TA-Main","GBPUSD","Buy","2025-05-02 08:00:00","2025-05-02 09:00:00","1.00","1.25000","1.25100","-2.00","80.00","TA2",""],
+        ["TA-Main","GBPUSD","Sell","2025-05-03 08:00:00","2025-05-03 09:00:00","1.00","1.25000","1.24900","-2.00","80.00","TA3",""],
+        ["TA-Side","USDJPY","Buy","2025-05-04 08:00:00","2025-05-04 09:00:00","1.00","150.000","150.100","-2.00","80.00","TA4",""],
+    ]
+    r = client.post("/uploads/commit", files={"file": ("ta.csv", make_csv(rows), "text/csv")}, headers=auth)
+    assert r.status_code == 200, r.text
+
+    # No query: most traded first
+    r = client.get("/trades/typeahead", params={"field": "symbol"}, headers=auth)
+    assert r.status_code == 200, r.text
+    items = r.json()
+    assert items[0] == {"value": "GBPUSD", "trade_count": 2}
+    # Prefix match outranks a more frequent substring match
+    r = client.get("/trades/typeahead", params={"field": "symbol", "q": "usd"}, headers=auth)
+    assert [i["value"] for i in r.json()] == ["USDJPY", "GBPUSD", "EURUSD"]
+    r = client.get("/trades/typeahead", params={"field": "symbol", "q": "usd", "limit": 2}, headers=auth)
+    assert [i["value"] for i in r.json()] == ["USDJPY", "GBPUSD"]
+    r = client.get("/trades/typeahead", params={"field": "account", "q": "ta-", "limit": 1}, headers=auth)
+    assert r.json() == [{"value": "TA-Main", "trade_count": 3}]
+    # Punctuation in the prefix; the last code point has no successor
+    r = client.get("/trades/typeahead", params={"field": "account", "q": "ta-s"}, headers=auth)
+    assert [i["value"] for i in r.json()] == ["TA-Side"]
+    r = client.get("/trades/typeahead", params={"field": "symbol", "q": "usd" + chr(0x10FFFF)}, headers=auth)
+    assert r.status_code == 200 and r.json() == []
+    # LIKE wildcards are matched literally
+    r = client.get("/trades/typeahead", params={"field": "symbol", "q": "%"}, headers=auth)
+    assert r.json() == []
+    r = client.get("/trades/typeahead", params={"field": "nope"}, headers=auth)
+    assert r.status_code == 400
+
+
+def test_trades_list_fast_path_matches_trade_out_schema():
+    from app.schemas import TradeOut
+    email = "list_shape_user@example.com"; pwd = "S3cretPwd!"
+    client.post("/auth/register", json={"email": email, "password": pwd})
+    tok = client.post("/auth/login", data={"username": email, "password": pwd}, headers={"Content-Type": "application/x-www-form-urlencoded"}).json()["access_token"]
+    auth = {"Authorization": f"Bearer {tok}"}
+    body = {"account_name": "Shape", "symbol": "EURUSD", "side": "Buy", "open_time": "2025-05-01 08:00:00",
+            "close_time": "2025-05-01 09:00:00", "qty_units": 1, "entry_price": 1.1, "exit_price": 1.101, "net_pnl": 10, "tz": "UTC"}
+    r = client.post("/trades", json=body, headers=auth)
+    assert r.status_code == 200, r.text
+
+    r = client.get("/trades", headers=auth)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    item = r.json()[0]
+    # Same keys, order and values as the documented response model
+    assert list(item) == list(TradeOut.model_fields)
+    assert TradeOut.model_validate(item).model_dump() == item
+    assert isinstance(item["qty_units"], float) and item["open_time_utc"].startswith("2025-05-01T08:00:00")
@@ -0,0 +1,48 @@
+import io
+import zipfile
+
+from app.zipstream import iter_zip, iter_zip_files, unique_arcnames
+
+
+def test_iter_zip_yields_per_member_and_builds_valid_archive():
+    produced = []
+
+    def members():
+        for i in range(3):
+            produced.append(i)
+            yield f"acct_{i}.pdf", b"%PDF-" + bytes([i]) * 1000
+
+    chunks = []
+    for chunk in iter_zip(members(), compression=zipfile.ZIP_STORED):
+        # Each member is flushed before the next one is produced
+        chunks.append((len(produced), chunk))
+    assert [n for n, _ in chunks[:3]] == [1, 2, 3]
+
+    zf = zipfile.ZipFile(io.BytesIO(b"".join(c for _, c in chunks)))
+    assert zf.testzip() is None
+    assert zf.namelist() == ["acct_0.pdf", "acct_1.pdf", "acct_2.pdf"]
+    assert zf.read("acct_2.pdf") == b"%PDF-" + b"\x02" * 1000
+
+
+def test_iter_zip_files_streams_chunks_and_stores_images(tmp_path):
+    png = tmp_path / "chart.png"
+    png.write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 400)
+    notes = tmp_path / "notes.txt"
+    notes.write_bytes(b"entry\n" * 5000)
+
+    files = [("chart.png", str(png)), ("missing.png", str(tmp_path / "gone.png")), ("notes.txt", str(notes))]
+    chunks = list(iter_zip_files(files, chunk_size=4096))
+    # Output is produced while members are read, not once at the end
+    assert len(chunks) > 10
+
+    zf = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert zf.testzip() is None
+    assert zf.namelist() == ["chart.png", "notes.txt"]
+    assert zf.getinfo("chart.png").compress_type == zipfile.ZIP_STORED
+    assert zf.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert zf.read("chart.png") == png.read_bytes()
+
+
+def test_unique_arcnames():
+    names = list(unique_arcnames(["a.png", None, "a.png", "a.png"], ["att-1", "att-2", "att-3", "att-4"]))
+    assert names == ["a.png", "att-2", "a (2).png", "a (3).png"]
@@ -7,7 +7,8 @@ interface ReportHistoryItem {
   filename: string;
   report_type: string;
   created_at: string;
-  file_size: number;
+  file_size_bytes: number;
+  download_url: string;
 }
 
 export default function ReportsPage() {
@@ -15,7 +16,7 @@ export default function ReportsPage() {
   const [token, setToken] = useState<string>("");
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
-  const [deleteConfirm, setDeleteConfirm] = useState<string | null>(null);
+  const [deleteConfirm, setDeleteConfirm] = useState<number | null>(null);
 
   const API_BASE = process.env.NEXT_PUBLIC_API_BASE || "http://localhost:8000";
 
@@ -55,10 +56,10 @@ export default function ReportsPage() {
     }
   };
 
-  const downloadReport = async (filename: string) => {
+  const downloadReport = async (report: ReportHistoryItem) => {
     try {
       const response = await fetch(
-        `${API_BASE}/api/reports/download/${filename}`,
+        `${API_BASE}${report.download_url}`,
         {
           headers: {
             Authorization: `Bearer ${token}`,
@@ -71,7 +72,7 @@ export default function ReportsPage() {
         const url = window.URL.createObjectURL(blob);
         const a = document.createElement("a");
         a.href = url;
-        a.download = filename;
+        a.download = report.filename;
         document.body.appendChild(a);
         a.click();
         window.URL.revokeObjectURL(url);
@@ -84,9 +85,9 @@ export default function ReportsPage() {
     }
   };
 
-  const deleteReport = async (filename: string) => {
+  const deleteReport = async (id: number) => {
     try {
-      const response = await fetch(`${API_BASE}/api/reports/${filename}`, {
+      const response = await fetch(`${API_BASE}/api/reports/history/${id}`, {
         method: "DELETE",
         headers: {
           Authorization: `Bearer ${token}`,
@@ -94,7 +95,7 @@ export default function ReportsPage() {
       });
 
       if (response.ok) {
-        setReports((prev) => prev.filter((r) => r.filename !== filename));
+        setReports((prev) => prev.filter((r) => r.id !== id));
         setDeleteConfirm(null);
       } else {
         alert("Failed to delete report");
@@ -191,21 +192,21 @@ export default function ReportsPage() {
                     {formatDate(report.created_at)}
                   </td>
                   <td className="px-4 py-3 text-subtext0 text-sm">
-                    {formatFileSize(report.file_size)}
+                    {formatFileSize(report.file_size_bytes)}
                   </td>
                   <td className="px-4 py-3 text-right">
                     <div className="flex justify-end space-x-2">
                       <button
-                        onClick={() => downloadReport(report.filename)}
+                        onClick={() => downloadReport(report)}
                         className="px-3 py-1 bg-blue hover:bg-blue/90 text-base rounded transition-colors text-sm"
                         title="Download"
                       >
                         ⬇ Download
                       </button>
-                      {deleteConfirm === report.filename ? (
+                      {deleteConfirm === report.id ? (
                         <div className="flex space-x-1">
                           <button
-                            onClick={() => deleteReport(report.filename)}
+                            onClick={() => deleteReport(report.id)}
                             className="px-3 py-1 bg-red hover:bg-red/90 text-base rounded transition-colors text-sm"
                           >
                             ✓ Confirm
@@ -219,7 +220,7 @@ export default function ReportsPage() {
                         </div>
                       ) : (
                         <button
-                          onClick={() => setDeleteConfirm(report.filename)}
+                          onClick={() => setDeleteConfirm(report.id)}
                           className="px-3 py-1 bg-surface2 hover:bg-red/20 text-text hover:text-red rounded transition-colors text-sm"
                           title="Delete"
                         >